@@ -0,0 +1,89 @@
+"""Сериализация постов и комментариев из строк .values().
+
+Объекты моделей не создаются: база отдаёт словарь с полями, которые
+попросил клиент (fields[posts]=id,text), и каждое поле переводится
+в JSON своей функцией. Связанные автор и группа приходят тем же
+запросом через JOIN, как имя и адрес.
+"""
+import json
+from collections import namedtuple
+
+from posts.models import Post
+
+Field = namedtuple('Field', ('lookup', 'convert'))
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+def empty_to_none(value):
+    return value or None
+
+
+POST_FIELDS = {
+    'id': Field('id', None),
+    'text': Field('text', None),
+    'pub_date': Field('pub_date', isoformat),
+    'author': Field('author__username', None),
+    'group': Field('group__slug', None),
+    'image': Field('image', image_url),
+    'thumbnail': Field('thumbnail_url', empty_to_none),
+    'comments_count': Field('comments_count', None),
+}
+COMMENT_FIELDS = {
+    'id': Field('id', None),
+    'text': Field('text', None),
+    'pub_date': Field('pub_date', isoformat),
+    'author': Field('author__username', None),
+}
+# Без них не построить курсор страницы.
+KEY_LOOKUPS = ('pub_date', 'id')
+
+
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def requested_fields(request, resource, available):
+    """Поля resource из параметра fields[resource], по умолчанию все."""
+    raw = request.GET.get(f'fields[{resource}]')
+    if raw is None:
+        return list(available)
+    names = [name for name in raw.split(',') if name]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(
+            400, f'Неизвестные поля {resource}: {", ".join(unknown)}'
+        )
+    return names
+
+
+class Serializer:
+    def __init__(self, available, names):
+        self.fields = [(name, *available[name]) for name in names]
+
+    def values(self, queryset):
+        lookups = dict.fromkeys(
+            [lookup for _, lookup, _ in self.fields] + list(KEY_LOOKUPS)
+        )
+        return queryset.values(*lookups)
+
+    def row(self, values):
+        return {
+            name: convert(values[lookup]) if convert else values[lookup]
+            for name, lookup, convert in self.fields
+        }
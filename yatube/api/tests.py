@@ -0,0 +1,141 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import FORWARD, encode_cursor
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_feed_pages(self):
+        """Лента отдаётся страницами по курсору, от новых к старым"""
+        url = reverse('api:v1:post_list')
+        with self.assertNumQueries(1):
+            status, first = self.get(url, limit=10)
+        self.assertEqual(status, 200)
+        self.assertEqual(first['results'][0], {
+            'id': self.posts[-1].id, 'text': 'Пост 14',
+            'pub_date': self.posts[-1].pub_date.isoformat(),
+            'author': 'author', 'group': None, 'image': None,
+            'thumbnail': None, 'comments_count': 0,
+        })
+        _, second = self.get(first['next'])
+        texts = [
+            post['text'] for post in first['results'] + second['results']
+        ]
+        self.assertEqual(texts, [f'Пост {n}' for n in range(14, -1, -1)])
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        """fields[posts] ограничивает поля, неизвестное поле — ошибка 400"""
+        url = reverse('api:v1:group_posts', kwargs={'slug': 'group'})
+        _, page = self.get(url, **{'fields[posts]': 'id,group'})
+        self.assertEqual(len(page['results']), 7)
+        self.assertIsNone(page['next'])
+        self.assertEqual(
+            page['results'][0], {'id': self.posts[13].id, 'group': 'group'}
+        )
+        status, error = self.get(url, **{'fields[posts]': 'id,password'})
+        self.assertEqual(status, 400)
+        self.assertIn('password', error['error'])
+
+    def test_ndjson_stream(self):
+        """format=ndjson выгружает всю ленту построчно"""
+        response = self.client.get(
+            reverse('api:v1:profile_posts', kwargs={'username': 'author'}),
+            {'format': 'ndjson', 'fields[posts]': 'text'},
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 15)
+        self.assertEqual(json.loads(lines[-1]), {'text': 'Пост 0'})
+
+    def test_post_detail(self):
+        """Пост отдаётся с комментариями, отсутствующий — ошибка 404"""
+        status, post = self.get(
+            reverse('api:v1:post_detail', args=[self.posts[0].id]),
+            **{'fields[posts]': 'text', 'fields[comments]': 'author,text'},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(post, {
+            'text': 'Пост 0',
+            'comments': [{'author': 'reader', 'text': 'Комментарий'}],
+            'comments_next': None,
+        })
+        status, error = self.get(reverse('api:v1:post_detail', args=[0]))
+        self.assertEqual((status, error), (404, {'error': 'Не найдено'}))
+
+    def test_post_comments(self):
+        """Комментарии листаются курсором в выбранном порядке"""
+        post = self.posts[1]
+        for number in range(3):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Ответ {number}'
+            )
+        url = reverse('api:v1:post_comments', args=[post.id])
+        params = {'order': 'old', 'limit': 2, 'fields[comments]': 'text'}
+        _, first = self.get(url, **params)
+        _, second = self.get(first['next'])
+        self.assertEqual(
+            first['results'] + second['results'],
+            [{'text': f'Ответ {number}'} for number in range(3)],
+        )
+        self.assertIsNone(second['next'])
+
+    def test_follow_posts(self):
+        """Лента подписок только для авторизованных"""
+        url = reverse('api:v1:follow_posts')
+        self.assertEqual(self.get(url)[0], 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        _, page = self.get(url, **{'fields[posts]': 'author'})
+        self.assertEqual(len(page['results']), 10)
+
+    def test_bad_parameters(self):
+        """Неверные limit и курсор — ошибка 400"""
+        url = reverse('api:v1:post_list')
+        for params in ({'limit': 0}, {'limit': 'x'}, {'cursor': 'мусор'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(url, **params)[0], 400)
+
+    def test_bad_cursor_date(self):
+        """Курсор с несуществующей датой — JSON с ошибкой 400"""
+        cursor = encode_cursor(FORWARD, '2020-13-45T00:00:00', 1)
+        urls = (
+            reverse('api:v1:post_list'),
+            reverse('api:v1:post_comments', args=[self.posts[0].id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('error', json.loads(response.content))
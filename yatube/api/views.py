@@ -0,0 +1,170 @@
+from functools import wraps
+
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_safe
+
+from posts.feeds import NEWEST, comments_order, follow_feed
+from posts.models import Comment, Group, Post, User
+from posts.paginators import InvalidCursor, KeysetPaginator
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, ApiError, Serializer,
+                          dumps, requested_fields)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# Сколько строк читать из курсора базы за раз при выгрузке NDJSON.
+STREAM_CHUNK = 2000
+NDJSON = 'application/x-ndjson'
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        dumps(data), status=status, content_type='application/json'
+    )
+
+
+def api_view(view):
+    """GET-обработчик API: ошибки отдаются JSON, а не HTML."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'error': 'Не найдено'}, status=404)
+        except ApiError as error:
+            return json_response({'error': error.message}, error.status)
+    return wrapper
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError(400, 'limit должен быть числом')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(400, f'limit должен быть от 1 до {MAX_LIMIT}')
+    return limit
+
+
+def wants_ndjson(request):
+    return (
+        request.GET.get('format') == 'ndjson'
+        or NDJSON in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def stream(serializer, rows):
+    """Вся лента построчно, без загрузки в память."""
+    lines = (
+        dumps(serializer.row(values)) + '\n'
+        for values in rows.order_by('-pub_date', '-id').iterator(
+            chunk_size=STREAM_CHUNK
+        )
+    )
+    return StreamingHttpResponse(lines, content_type=NDJSON)
+
+
+def paginate(request, rows, descending=True):
+    paginator = KeysetPaginator(
+        rows, page_limit(request), descending=descending
+    )
+    cursor = request.GET.get('cursor')
+    try:
+        return (
+            paginator.cursor_page(cursor) if cursor
+            else paginator.offset_page(1)
+        )
+    except InvalidCursor:
+        raise ApiError(400, 'Неверный курсор')
+
+
+def next_url(request, page, path=None):
+    if not page.next_cursor:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = page.next_cursor
+    return f'{path or request.path}?{query.urlencode(safe="[],")}'
+
+
+def feed(request, queryset):
+    """Страница ленты по курсору или вся лента в NDJSON."""
+    serializer = Serializer(
+        POST_FIELDS, requested_fields(request, 'posts', POST_FIELDS)
+    )
+    rows = serializer.values(queryset)
+    if wants_ndjson(request):
+        return stream(serializer, rows)
+    page = paginate(request, rows)
+    return json_response({
+        'results': [serializer.row(values) for values in page.object_list],
+        'next': next_url(request, page),
+    })
+
+
+def comments_page(request, post_id):
+    serializer = Serializer(
+        COMMENT_FIELDS,
+        requested_fields(request, 'comments', COMMENT_FIELDS),
+    )
+    page = paginate(
+        request,
+        serializer.values(Comment.objects.filter(post_id=post_id)),
+        descending=comments_order(request) == NEWEST,
+    )
+    return (
+        [serializer.row(values) for values in page.object_list],
+        next_url(
+            request, page,
+            reverse('api:v1:post_comments', kwargs={'post_id': post_id}),
+        ),
+    )
+
+
+@api_view
+def post_list(request):
+    return feed(request, Post.objects.all())
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('id'), slug=slug)
+    return feed(request, Post.objects.filter(group=group))
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('id'), username=username)
+    return feed(request, Post.objects.filter(author=author))
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация')
+    return feed(request, follow_feed(request.user))
+
+
+@api_view
+def post_detail(request, post_id):
+    serializer = Serializer(
+        POST_FIELDS, requested_fields(request, 'posts', POST_FIELDS)
+    )
+    values = serializer.values(Post.objects.filter(id=post_id)).first()
+    if values is None:
+        raise Http404
+    comments, comments_next = comments_page(request, post_id)
+    return json_response({
+        **serializer.row(values),
+        'comments': comments,
+        'comments_next': comments_next,
+    })
+
+
+@api_view
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments, next_page = comments_page(request, post_id)
+    return json_response({'results': comments, 'next': next_page})
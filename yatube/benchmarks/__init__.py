@@ -0,0 +1,11 @@
+"""Нагрузочные замеры страниц posts.
+
+bench_seed заполняет базу тестовыми данными, bench_load гоняет запросы
+ко всем адресам posts.urls и сравнивает задержки с сохранённым базовым
+замером. Запускать на отдельной базе: нагрузка пишет посты,
+комментарии и подписки.
+
+seed быстро заполняет базу данными размером с работающий сайт
+(сотни тысяч постов и больше), bench_sqlite сравнивает настройки
+SQLite под конкурентной нагрузкой.
+"""
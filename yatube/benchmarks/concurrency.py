@@ -0,0 +1,124 @@
+"""Конкурентное чтение и запись в SQLite.
+
+Потоки-читатели выбирают первую страницу ленты, писатели добавляют
+комментарий так же, как add_comment: читают пост, создают
+комментарий и увеличивают счётчик в одной транзакции. После каждой
+операции соединение закрывается так же, как в конце запроса: без
+CONN_MAX_AGE оно открывается заново.
+
+Каждая конфигурация из CONFIGURATIONS замеряется на своей копии
+текущей базы, поэтому стандартный бэкенд и core.backends.sqlite3
+сравниваются на одних и тех же данных.
+"""
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from posts.models import Comment, Post
+
+from .results import summarize
+
+CONFIGURATIONS = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0},
+    'tuned': {'ENGINE': 'core.backends.sqlite3', 'CONN_MAX_AGE': 600},
+}
+ALIAS = 'concurrency_{}'
+PAGE = 10
+# Посты, которые комментируют писатели.
+TARGETS = 100
+
+
+def copy_database(path):
+    """Копия основной базы в файле path в обычном режиме журнала."""
+    primary = connections['default']
+    primary.ensure_connection()
+    target = sqlite3.connect(path)
+    primary.connection.backup(target)
+    target.execute('PRAGMA journal_mode = DELETE')
+    target.close()
+
+
+def read(alias, targets, rng):
+    list(Post.objects.using(alias).select_related('author', 'group')[:PAGE])
+
+
+def write(alias, targets, rng):
+    post_id, author_id = rng.choice(targets)
+    with transaction.atomic(using=alias):
+        post = Post.objects.using(alias).get(pk=post_id)
+        Comment.objects.using(alias).bulk_create([Comment(
+            post=post, author_id=author_id, text='Комментарий под нагрузкой',
+        )])
+        Post.objects.using(alias).filter(pk=post_id).update(
+            comments_count=F('comments_count') + 1
+        )
+
+
+def run_configuration(alias, operations, seconds, targets):
+    """Задержки и ошибки по видам операций за seconds секунд."""
+    barrier = threading.Barrier(len(operations))
+
+    def worker(number, operation):
+        rng = random.Random(number)
+        connection = connections[alias]
+        latencies, errors = [], 0
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                sent = time.perf_counter()
+                try:
+                    operation(alias, targets, rng)
+                except OperationalError:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - sent)
+                connection.close_if_unusable_or_obsolete()
+            return operation.__name__, latencies, errors
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(len(operations)) as pool:
+        runs = list(pool.map(worker, range(len(operations)), operations))
+    measured = {}
+    for name in sorted({run[0] for run in runs}):
+        own = [run for run in runs if run[0] == name]
+        measured[name] = summarize(
+            [latency for run in own for latency in run[1]],
+            sum(run[2] for run in own), seconds,
+        )
+    return measured
+
+
+def run(threads, writers, seconds, configurations=CONFIGURATIONS):
+    """Замер каждой конфигурации; результат — словарь для JSON."""
+    targets = list(Post.objects.values_list('id', 'author_id')[:TARGETS])
+    operations = [write] * writers + [read] * (threads - writers)
+    directory = tempfile.mkdtemp()
+    measured = {}
+    try:
+        for name, configuration in configurations.items():
+            alias = ALIAS.format(name)
+            path = os.path.join(directory, f'{name}.sqlite3')
+            copy_database(path)
+            connections.databases[alias] = {**configuration, 'NAME': path}
+            try:
+                measured[name] = run_configuration(
+                    alias, operations, seconds, targets
+                )
+            finally:
+                if hasattr(connections._connections, alias):
+                    connections[alias].close()
+                    delattr(connections._connections, alias)
+                del connections.databases[alias]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {'configurations': measured}
@@ -0,0 +1,211 @@
+"""Генератор нагрузки на адреса posts.urls.
+
+Запросы идут либо в этом же процессе через django.test.Client, либо
+по HTTP к запущенному серверу через requests. У каждого потока свой
+клиент; задержка меряется от отправки запроса до получения ответа.
+"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Post
+
+from .results import summarize
+from .seed import USERNAME, bench_groups, bench_users
+
+Endpoint = namedtuple(
+    'Endpoint', ('name', 'method', 'path', 'data', 'user', 'status')
+)
+
+
+def endpoints():
+    """Адреса posts.urls на данных bench_seed.
+
+    Пишущие адреса вызываются от имени первого тестового пользователя
+    и правят другой его пост, не тот, что читает post_detail: иначе
+    страница поста росла бы от прогона к прогону.
+    """
+    user = bench_users().get(username=USERNAME.format(0))
+    author = bench_users().get(username=USERNAME.format(1))
+    group = bench_groups().order_by('id').first()
+    posts = Post.objects.filter(author=user).order_by('id')
+    post, scratch = posts.first(), posts.last()
+    word = post.text.split()[0].lower()
+    return [
+        Endpoint('index', 'GET', reverse('posts:index'), None, None, 200),
+        Endpoint(
+            'group_posts', 'GET',
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            None, None, 200,
+        ),
+        Endpoint(
+            'profile', 'GET',
+            reverse('posts:profile', kwargs={'username': user.username}),
+            None, None, 200,
+        ),
+        Endpoint(
+            'post_detail', 'GET',
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+            None, None, 200,
+        ),
+        Endpoint(
+            'post_comments', 'GET',
+            reverse('posts:post_comments', kwargs={'post_id': post.id}),
+            {'order': 'old'}, None, 200,
+        ),
+        Endpoint(
+            'search', 'GET', reverse('posts:search'), {'q': word},
+            None, 200,
+        ),
+        Endpoint(
+            'follow_index', 'GET', reverse('posts:follow_index'), None,
+            user, 200,
+        ),
+        Endpoint(
+            'post_create', 'POST', reverse('posts:post_create'),
+            {'text': 'Пост под нагрузкой', 'group': group.id}, user, 302,
+        ),
+        Endpoint(
+            'post_edit', 'POST',
+            reverse('posts:post_edit', kwargs={'post_id': scratch.id}),
+            {'text': scratch.text, 'group': group.id}, user, 302,
+        ),
+        Endpoint(
+            'add_comment', 'POST',
+            reverse('posts:add_comment', kwargs={'post_id': scratch.id}),
+            {'text': 'Комментарий под нагрузкой'}, user, 302,
+        ),
+        Endpoint(
+            'profile_follow', 'GET',
+            reverse('posts:profile_follow', kwargs={
+                'username': author.username
+            }),
+            None, user, 302,
+        ),
+        Endpoint(
+            'profile_unfollow', 'GET',
+            reverse('posts:profile_unfollow', kwargs={
+                'username': author.username
+            }),
+            None, user, 302,
+        ),
+    ]
+
+
+class ClientTransport:
+    """Запросы в этом же процессе, без сети."""
+
+    def __init__(self, user=None):
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, endpoint):
+        send = getattr(self.client, endpoint.method.lower())
+        return send(endpoint.path, endpoint.data).status_code
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """Запросы к серверу base_url, который работает с той же базой."""
+
+    def __init__(self, base_url, user=None):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        if user is not None:
+            # Сессию создаёт этот процесс: сервер найдёт её в общей базе.
+            client = Client()
+            client.force_login(user)
+            self.session.cookies.set(
+                settings.SESSION_COOKIE_NAME,
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+            )
+            self.session.get(self.base_url + reverse('posts:post_create'))
+            self.session.headers['X-CSRFToken'] = self.session.cookies.get(
+                settings.CSRF_COOKIE_NAME, ''
+            )
+
+    def request(self, endpoint):
+        return self.session.request(
+            endpoint.method, self.base_url + endpoint.path,
+            params=endpoint.data if endpoint.method == 'GET' else None,
+            data=endpoint.data if endpoint.method != 'GET' else None,
+            allow_redirects=False, timeout=30,
+        ).status_code
+
+    def close(self):
+        self.session.close()
+
+
+def split(total, parts):
+    return [total // parts + (index < total % parts) for index in range(
+        parts
+    )]
+
+
+def attempt(client, endpoint):
+    """Ответил ли адрес ожидаемым кодом; исключение — тоже ошибка."""
+    try:
+        return client.request(endpoint) == endpoint.status
+    except Exception:
+        return False
+
+
+def run_endpoint(endpoint, transport, requests_count, concurrency, warmup):
+    """Сводка задержек endpoint под нагрузкой concurrency потоков."""
+    barrier = threading.Barrier(concurrency)
+
+    def worker(count):
+        try:
+            client = transport(endpoint.user)
+        except BaseException:
+            # Иначе остальные потоки навсегда останутся у барьера.
+            barrier.abort()
+            raise
+        latencies, errors = [], 0
+        try:
+            for _ in range(warmup):
+                attempt(client, endpoint)
+            barrier.wait()
+            started = time.perf_counter()
+            for _ in range(count):
+                sent = time.perf_counter()
+                if attempt(client, endpoint):
+                    latencies.append(time.perf_counter() - sent)
+                else:
+                    errors += 1
+            return latencies, errors, started, time.perf_counter()
+        finally:
+            client.close()
+            # Соединения потоков пула иначе остаются открытыми.
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+    counts = split(requests_count, concurrency)
+    if concurrency == 1:
+        runs = [worker(counts[0])]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            runs = list(pool.map(worker, counts))
+    latencies = [latency for run in runs for latency in run[0]]
+    seconds = max(run[3] for run in runs) - min(run[2] for run in runs)
+    return latencies, sum(run[1] for run in runs), seconds
+
+
+def run(selected, transport, requests_count, concurrency, warmup=5):
+    """Прогоняет адреса по очереди; результат — словарь для JSON."""
+    return {'endpoints': {
+        endpoint.name: summarize(*run_endpoint(
+            endpoint, transport, requests_count, concurrency, warmup
+        ))
+        for endpoint in selected
+    }}
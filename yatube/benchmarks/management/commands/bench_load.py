@@ -0,0 +1,162 @@
+import platform
+from functools import partial
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks import load, results
+from benchmarks.seed import bench_users
+from posts.models import Comment, Follow, Post, User
+
+# Замер сравним с базовым, только если совпадают эти условия.
+COMPARABLE = ('mode', 'concurrency')
+BASELINE = Path(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает адреса posts.urls и сравнивает задержки с базовым '
+        'замером. Прогон пишет в базу, поэтому перед каждым нужен '
+        'свежий bench_seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов к каждому адресу.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Сколько потоков шлют запросы одновременно.',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Запросов на поток до начала замера.',
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера; без него запросы идут '
+                 'через тестовый клиент в этом процессе.',
+        )
+        parser.add_argument(
+            '--endpoint', action='append', dest='names',
+            help='Замерить только этот адрес; можно повторять.',
+        )
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON.',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=str(BASELINE),
+            help='Файл базового замера.',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить замер как базовый вместо сравнения.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимое ухудшение, доля от базового замера.',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Нужен хотя бы один запрос и один поток.')
+        selected = self.select(options['names'])
+        if options['url']:
+            transport = partial(load.HTTPTransport, options['url'])
+            measured = load.run(
+                selected, transport, options['requests'],
+                options['concurrency'], options['warmup'],
+            )
+        else:
+            # При DEBUG каждый SQL-запрос копится в connection.queries.
+            with override_settings(DEBUG=False):
+                measured = load.run(
+                    selected, load.ClientTransport, options['requests'],
+                    options['concurrency'], options['warmup'],
+                )
+        measured['meta'] = self.meta(options)
+        self.report(measured)
+        if options['output']:
+            results.save(measured, options['output'])
+        baseline = Path(options['baseline'])
+        if options['save_baseline']:
+            results.save(measured, baseline)
+            self.stdout.write(f'Базовый замер сохранён в {baseline}.')
+            return
+        if not baseline.exists():
+            self.stdout.write(
+                f'Базового замера {baseline} нет: сохраните его '
+                f'с --save-baseline.'
+            )
+            return
+        self.check_regressions(
+            measured, results.load(baseline), options['tolerance']
+        )
+
+    def select(self, names):
+        try:
+            available = load.endpoints()
+        except (User.DoesNotExist, AttributeError):
+            raise CommandError('Нет тестовых данных: запустите bench_seed.')
+        if not names:
+            return available
+        by_name = {endpoint.name: endpoint for endpoint in available}
+        unknown = set(names) - set(by_name)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные адреса: {", ".join(sorted(unknown))}. '
+                f'Есть: {", ".join(by_name)}.'
+            )
+        return [by_name[name] for name in names]
+
+    def meta(self, options):
+        return {
+            'created': timezone.now().isoformat(),
+            'mode': 'http' if options['url'] else 'client',
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'data': {
+                'users': bench_users().count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+        }
+
+    def report(self, measured):
+        self.stdout.write(
+            f'{"адрес":<18}{"rps":>8}{"p50, мс":>10}{"p90, мс":>10}'
+            f'{"p99, мс":>10}{"ошибок":>8}'
+        )
+        for name, row in measured['endpoints'].items():
+            self.stdout.write(
+                f'{name:<18}{row["rps"]:>8.1f}{row["p50_ms"]:>10.1f}'
+                f'{row["p90_ms"]:>10.1f}{row["p99_ms"]:>10.1f}'
+                f'{row["errors"]:>8}'
+            )
+
+    def check_regressions(self, measured, baseline, tolerance):
+        for key in COMPARABLE:
+            if measured['meta'][key] != baseline['meta'][key]:
+                raise CommandError(
+                    f'Базовый замер снят при {key}='
+                    f'{baseline["meta"][key]}, а этот — при '
+                    f'{measured["meta"][key]}.'
+                )
+        regressions = results.compare(measured, baseline, tolerance)
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базового замера:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import SCALES, Scale, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново заполняет базу тестовыми пользователями, группами, '
+        'постами, комментариями и подписками для bench_load.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=SCALES, default='small',
+            help='Готовый размер данных.',
+        )
+        for field in Scale._fields:
+            parser.add_argument(
+                f'--{field}', type=int,
+                help='Переопределить число объектов этого вида.',
+            )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        scale = SCALES[options['scale']]._replace(**{
+            field: options[field] for field in Scale._fields
+            if options[field] is not None
+        })
+        try:
+            seed(scale, options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + ', '.join(
+                f'{field} {count}' for field, count in scale._asdict().items()
+            ) + '.'
+        ))
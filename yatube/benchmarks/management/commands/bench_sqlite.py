@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import concurrency, results
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет конкурентное чтение и запись на копиях базы со '
+        'стандартным бэкендом SQLite и с core.backends.sqlite3.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Сколько потоков работают одновременно.',
+        )
+        parser.add_argument(
+            '--writers', type=int, default=2,
+            help='Сколько из них пишут, остальные читают.',
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5.0,
+            help='Сколько секунд замерять каждую конфигурацию.',
+        )
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        threads, writers = options['threads'], options['writers']
+        if threads < 1 or not 0 <= writers <= threads:
+            raise CommandError(
+                'Нужен хотя бы один поток, а писателей не больше потоков.'
+            )
+        if not Post.objects.exists():
+            raise CommandError('Нет тестовых данных: запустите bench_seed.')
+        measured = concurrency.run(threads, writers, options['seconds'])
+        self.report(measured)
+        if options['output']:
+            results.save(measured, options['output'])
+
+    def report(self, measured):
+        self.stdout.write(
+            f'{"конфигурация":<14}{"операция":<10}{"в секунду":>11}'
+            f'{"p50, мс":>10}{"p99, мс":>10}{"ошибок":>8}'
+        )
+        for name, operations in measured['configurations'].items():
+            for operation, row in operations.items():
+                self.stdout.write(
+                    f'{name:<14}{operation:<10}{row["rps"]:>11.1f}'
+                    f'{row["p50_ms"]:>10.1f}{row["p99_ms"]:>10.1f}'
+                    f'{row["errors"]:>8}'
+                )
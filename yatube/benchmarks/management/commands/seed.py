@@ -0,0 +1,95 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import SCALES, Scale
+from benchmarks.synthetic import Seeder, clear, seed_users
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует большие синтетические данные: пользователей, группы, '
+        'посты с авторством по Ципфу, комментарии и подписки со '
+        'степенным распределением. Одинаковый --seed даёт одинаковые '
+        'данные при любом числе воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=SCALES, default='xlarge',
+            help='Готовый размер данных.',
+        )
+        for field in Scale._fields:
+            parser.add_argument(
+                f'--{field}', type=int,
+                help='Переопределить число объектов этого вида.',
+            )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Процессов, генерирующих тексты; 1 — в этом процессе.',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.0,
+            help='Показатель распределения Ципфа.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены посты.',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить данные прошлого запуска; на больших объёмах '
+                 'быстрее начать с пустой базы.',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты подписок.',
+        )
+
+    def handle(self, *args, **options):
+        scale = SCALES[options['scale']]._replace(**{
+            field: options[field] for field in Scale._fields
+            if options[field] is not None
+        })
+        if min(scale) < 0 or scale.users < 1 or options['days'] < 1:
+            raise CommandError(
+                'Нужен хотя бы один пользователь и один день, а чисел '
+                'объектов меньше нуля не бывает.'
+            )
+        try:
+            if seed_users().exists():
+                if not options['clear']:
+                    raise CommandError(
+                        'В базе уже есть данные seed: добавьте --clear.'
+                    )
+                clear()
+            started = time.monotonic()
+            self.reported = {}
+            seeder = Seeder(
+                scale, options['seed'], options['zipf'], options['days'],
+                progress=self.progress,
+            )
+            seeder.run(max(options['workers'], 1))
+        except ValueError as error:
+            raise CommandError(error)
+        if not options['skip_rebuild']:
+            self.stderr.write('Пересчёт счётчиков, поиска и лент...')
+            transfer.rebuild_derived()
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + ', '.join(
+                f'{field} {count}' for field, count in scale._asdict().items()
+            ) + f' за {seconds:.1f} с.'
+        ))
+
+    def progress(self, kind, inserted):
+        now = time.monotonic()
+        started, reported = self.reported.setdefault(kind, (now, now))
+        if now - reported < 1:
+            return
+        self.reported[kind] = (started, now)
+        rate = inserted / (now - started) if now > started else 0
+        self.stderr.write(f'{kind}: {inserted}, {rate:.0f} в секунду')
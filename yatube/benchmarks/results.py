@@ -0,0 +1,75 @@
+"""Сводка замеров и сравнение с базовым замером."""
+import json
+import math
+import statistics
+
+# Задержки, по которым ищутся регрессии. p99 из сотни запросов — это
+# почти максимум, он слишком шумный для автоматической проверки.
+LATENCY_KEYS = ('p50_ms', 'p90_ms')
+# Рост задержки меньше этого не считается регрессией: шум таймера.
+MIN_DELTA_MS = 1.0
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу из отсортированных значений."""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(share * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(latencies, errors, seconds):
+    """Сводка по одному адресу: задержки в миллисекундах и пропускная
+    способность в запросах в секунду."""
+    latencies = sorted(latency * 1000 for latency in latencies)
+    total = len(latencies)
+    return {
+        'requests': total,
+        'errors': errors,
+        'rps': total / seconds if seconds else 0.0,
+        'mean_ms': statistics.mean(latencies) if latencies else 0.0,
+        'p50_ms': percentile(latencies, 0.5),
+        'p90_ms': percentile(latencies, 0.9),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else 0.0,
+    }
+
+
+def compare(current, baseline, tolerance=0.2):
+    """Регрессии замера current относительно baseline.
+
+    Задержка хуже, если выросла больше чем на долю tolerance, пропускная
+    способность — если на столько же упала. Появление ошибок — всегда
+    регрессия.
+    """
+    regressions = []
+    for name, base in baseline['endpoints'].items():
+        now = current['endpoints'].get(name)
+        if now is None:
+            continue
+        for key in LATENCY_KEYS:
+            limit = base[key] * (1 + tolerance)
+            if now[key] > limit and now[key] - base[key] > MIN_DELTA_MS:
+                regressions.append(
+                    f'{name}: {key} {now[key]:.1f} > {base[key]:.1f}'
+                )
+        if now['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(
+                f'{name}: rps {now["rps"]:.1f} < {base["rps"]:.1f}'
+            )
+        if now['errors'] > base['errors']:
+            regressions.append(
+                f'{name}: ошибок {now["errors"]}, было {base["errors"]}'
+            )
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2, ensure_ascii=False)
+        file.write('\n')
@@ -0,0 +1,147 @@
+"""Тестовые данные для нагрузочных замеров.
+
+Объекты создаются через mixer по одному, с текстами Faker, поэтому
+срабатывают все сигналы posts: счётчики, ленты подписок и поисковый
+индекс заполняются так же, как на работающем сайте. Данные зависят
+только от seed.
+"""
+import random
+import re
+from collections import namedtuple
+from itertools import accumulate
+
+from django.db import transaction
+from faker import Faker
+from mixer.backend.django import Mixer
+
+from posts.models import Comment, Follow, Group, Post, User
+
+USERNAME = 'bench-{}'
+GROUP_SLUG = 'bench-{}'
+
+Scale = namedtuple(
+    'Scale', ('users', 'groups', 'posts', 'comments', 'follows')
+)
+# Размеры от замеров по одному объекту (bench_seed) до данных размером
+# с работающий сайт (seed, через synthetic); один набор на обе команды.
+SCALES = {
+    'small': Scale(users=20, groups=5, posts=200, comments=400, follows=60),
+    'medium': Scale(
+        users=200, groups=20, posts=5000, comments=10000, follows=2000
+    ),
+    'large': Scale(
+        users=2000, groups=50, posts=50000, comments=100000, follows=20000
+    ),
+    'xlarge': Scale(
+        users=10_000, groups=100, posts=100_000, comments=300_000,
+        follows=100_000,
+    ),
+    'xxlarge': Scale(
+        users=100_000, groups=1000, posts=1_000_000, comments=3_000_000,
+        follows=1_000_000,
+    ),
+}
+
+
+def generated(queryset, field, template):
+    """Строки queryset, чьё поле field создано по шаблону template.
+
+    Шаблон вида 'bench-{}' заполняется номером. Если под тот же
+    префикс попала чужая строка, например пользователь bench-admin,
+    это ValueError: иначе её удалил бы clear().
+    """
+    prefix = template.format('')
+    rows = queryset.filter(**{field + '__startswith': prefix})
+    foreign = rows.exclude(**{
+        field + '__regex': rf'^{re.escape(prefix)}[0-9]+$'
+    }).values_list(field, flat=True).first()
+    if foreign is not None:
+        raise ValueError(
+            f'{foreign} не создан генератором тестовых данных: '
+            f'переименуйте его, иначе он удалится вместе с ними.'
+        )
+    return rows
+
+
+def bench_users():
+    return generated(User.objects.all(), 'username', USERNAME)
+
+
+def bench_groups():
+    return generated(Group.objects.all(), 'slug', GROUP_SLUG)
+
+
+def clear():
+    """Удаляет прошлые тестовые данные вместе с постами и подписками."""
+    bench_users().delete()
+    bench_groups().delete()
+
+
+def popularity(count):
+    """Накопленные веса по Ципфу: первые пользователи пишут больше."""
+    return list(accumulate(1 / rank for rank in range(1, count + 1)))
+
+
+def follow_pairs(rng, users, count, weights):
+    """Неповторяющиеся пары (подписчик, автор) без подписок на себя."""
+    count = min(count, len(users) * (len(users) - 1))
+    pairs = set()
+    while len(pairs) < count:
+        user = rng.choice(users)
+        author = rng.choices(users, cum_weights=weights)[0]
+        if user != author:
+            pairs.add((user, author))
+    return sorted(pairs, key=lambda pair: (pair[0].pk, pair[1].pk))
+
+
+def seed(scale, seed=0):
+    """Заново создаёт тестовые данные размера scale."""
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    mixer = Mixer(locale='ru_RU')
+    with transaction.atomic():
+        clear()
+        users = mixer.cycle(scale.users).blend(
+            User,
+            username=(USERNAME.format(number) for number in range(
+                scale.users
+            )),
+            first_name=lambda: fake.first_name(),
+            last_name=lambda: fake.last_name(),
+            email='',
+            is_staff=False,
+            is_superuser=False,
+            is_active=True,
+        )
+        groups = mixer.cycle(scale.groups).blend(
+            Group,
+            title=lambda: fake.sentence(nb_words=3).rstrip('.'),
+            slug=(GROUP_SLUG.format(number) for number in range(
+                scale.groups
+            )),
+            description=lambda: fake.paragraph(nb_sentences=2),
+        )
+        weights = popularity(len(users))
+        posts = mixer.cycle(scale.posts).blend(
+            Post,
+            author=lambda: rng.choices(users, cum_weights=weights)[0],
+            # Каждый пятый пост без группы.
+            group=lambda: rng.choice(groups) if rng.random() < 0.8 else None,
+            text=lambda: fake.paragraph(nb_sentences=rng.randint(1, 8)),
+            image='',
+            thumbnail_url='',
+            image_variants='',
+            comments_count=0,
+        )
+        post_weights = popularity(len(posts))
+        mixer.cycle(scale.comments).blend(
+            Comment,
+            post=lambda: rng.choices(posts, cum_weights=post_weights)[0],
+            author=lambda: rng.choice(users),
+            text=lambda: fake.sentence(nb_words=rng.randint(3, 20)),
+        )
+        for user, author in follow_pairs(
+            rng, users, scale.follows, weights
+        ):
+            Follow.objects.create(user=user, author=author)
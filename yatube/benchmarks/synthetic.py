@@ -0,0 +1,295 @@
+"""Синтетические данные размером с работающий сайт.
+
+В отличие от seed.seed, строки вставляются пачками через bulk_create
+в обход сигналов, а счётчики, поисковый индекс и ленты подписок
+пересчитываются один раз в конце (posts.transfer.rebuild_derived).
+Тексты Faker генерируют процессы-воркеры, пока основной процесс
+вставляет готовые куски.
+
+Данные делятся на куски по CHUNK строк. Генератор случайных чисел
+куска зависит только от seed, вида данных и номера куска, поэтому
+результат не зависит от числа воркеров. Авторы постов выбираются по
+Ципфу: немногие пишут почти всё. Подписки тоже идут к авторам по
+Ципфу, поэтому число подписчиков распределено по степенному закону.
+Комментарии достаются постам по Ципфу от старых к новым, даты идут
+равномерно за days дней до начала текущих суток.
+"""
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts import transfer
+from posts.models import Comment, Follow, Group, Post, User
+
+from .seed import generated
+
+USERNAME = 'seed-{}'
+GROUP_SLUG = 'seed-{}'
+CHUNK = 5000
+# Доля постов вне групп.
+NO_GROUP = 0.2
+# Средняя задержка комментария после поста, в секундах.
+COMMENT_DELAY = 60 * 60
+
+Job = namedtuple('Job', (
+    'kind', 'number', 'start', 'count', 'scale', 'seed', 'exponent',
+))
+
+_fake = None
+
+
+def seed_users():
+    return generated(User.objects.all(), 'username', USERNAME)
+
+
+def seed_groups():
+    return generated(Group.objects.all(), 'slug', GROUP_SLUG)
+
+
+def clear():
+    """Удаляет прошлые данные seed; на больших объёмах это долго."""
+    seed_users().delete()
+    seed_groups().delete()
+
+
+@lru_cache(maxsize=4)
+def zipf(count, exponent):
+    """Накопленные веса по Ципфу для rng.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def chunk_random(job):
+    global _fake
+    if _fake is None:
+        _fake = Faker('ru_RU')
+    rng = random.Random(f'{job.seed}:{job.kind}:{job.number}')
+    _fake.seed_instance(rng.getrandbits(32))
+    return rng, _fake
+
+
+def make_users(job, rng, fake):
+    return [(fake.first_name(), fake.last_name()) for _ in range(job.count)]
+
+
+def make_groups(job, rng, fake):
+    return [
+        (fake.sentence(nb_words=3).rstrip('.'), fake.paragraph(nb_sentences=2))
+        for _ in range(job.count)
+    ]
+
+
+def make_posts(job, rng, fake):
+    scale = job.scale
+    authors = rng.choices(
+        range(scale.users), cum_weights=zipf(scale.users, job.exponent),
+        k=job.count,
+    )
+    return [
+        (
+            author,
+            rng.randrange(scale.groups)
+            if scale.groups and rng.random() >= NO_GROUP else None,
+            fake.paragraph(nb_sentences=rng.randint(1, 8)),
+        )
+        for author in authors
+    ]
+
+
+def make_comments(job, rng, fake):
+    scale = job.scale
+    posts = rng.choices(
+        range(scale.posts), cum_weights=zipf(scale.posts, job.exponent),
+        k=job.count,
+    )
+    return [
+        (
+            post, rng.randrange(scale.users),
+            fake.sentence(nb_words=rng.randint(3, 20)),
+            rng.expovariate(1 / COMMENT_DELAY),
+        )
+        for post in posts
+    ]
+
+
+def make_follows(job, rng, fake):
+    """Подписки пользователей куска; job.start — первый из них."""
+    scale = job.scale
+    weights = zipf(scale.users, job.exponent)
+    share, rest = divmod(scale.follows, scale.users)
+    pairs = []
+    for user in range(job.start, job.start + job.count):
+        degree = min(share + (user < rest), scale.users - 1)
+        authors = set()
+        attempts = 0
+        while len(authors) < degree and attempts < degree * 20:
+            attempts += 1
+            author = rng.choices(range(scale.users), cum_weights=weights)[0]
+            if author != user:
+                authors.add(author)
+        # Популярных авторов выбирают чаще всего: если подписок почти
+        # столько, сколько пользователей, остаток добирается по порядку.
+        for author in range(scale.users):
+            if len(authors) >= degree:
+                break
+            if author != user:
+                authors.add(author)
+        pairs.extend((user, author) for author in sorted(authors))
+    return pairs
+
+
+MAKERS = {
+    'users': make_users,
+    'groups': make_groups,
+    'posts': make_posts,
+    'comments': make_comments,
+    'follows': make_follows,
+}
+
+
+def make_chunk(job):
+    rng, fake = chunk_random(job)
+    return job, MAKERS[job.kind](job, rng, fake)
+
+
+def jobs(kind, total, scale, seed, exponent):
+    return [
+        Job(kind, number, start, min(CHUNK, total - start), scale, seed,
+            exponent)
+        for number, start in enumerate(range(0, total, CHUNK))
+    ]
+
+
+class Seeder:
+    """Вставляет куски данных по мере того, как их генерируют воркеры."""
+
+    def __init__(self, scale, seed=0, exponent=1.0, days=365,
+                 progress=None):
+        self.scale = scale
+        self.seed = seed
+        self.exponent = exponent
+        self.end = timezone.make_aware(
+            datetime.combine(timezone.now().date(), time())
+        )
+        self.span = timedelta(days=days)
+        self.progress = progress
+        self.password = make_password(None)
+
+    def run(self, workers=1):
+        if workers > 1:
+            # Открытые соединения с БД не должны достаться воркерам.
+            connections.close_all()
+            with ProcessPoolExecutor(workers) as pool:
+                self.insert_all(pool.map)
+        else:
+            self.insert_all(map)
+
+    def insert_all(self, run_jobs):
+        scale = self.scale
+        totals = {
+            'users': scale.users, 'groups': scale.groups,
+            'posts': scale.posts, 'comments': scale.comments,
+            # Подписки делятся на куски по подписчикам.
+            'follows': scale.users if scale.follows else 0,
+        }
+        with transfer.keep_dates():
+            for kind, total in totals.items():
+                inserted = 0
+                if self.progress:
+                    self.progress(kind, inserted)
+                for job, rows in run_jobs(make_chunk, jobs(
+                    kind, total, scale, self.seed, self.exponent
+                )):
+                    with transaction.atomic():
+                        getattr(self, f'insert_{kind}')(job, rows)
+                    inserted += len(rows)
+                    if self.progress:
+                        self.progress(kind, inserted)
+                self.loaded(kind)
+
+    def loaded(self, kind):
+        """Запоминает id вставленных строк по номерам."""
+        if kind == 'users':
+            self.users = self.ids(seed_users(), 'username', USERNAME)
+        elif kind == 'groups':
+            self.groups = self.ids(seed_groups(), 'slug', GROUP_SLUG)
+        elif kind == 'posts':
+            self.posts = list(
+                Post.objects.filter(author__in=seed_users())
+                .order_by('id').values_list('id', flat=True)
+            )
+
+    def ids(self, queryset, field, template):
+        """id строк queryset (из generated()) по их номерам."""
+        prefix = len(template.format(''))
+        numbered = {
+            int(value[prefix:]): pk
+            for value, pk in queryset.values_list(field, 'id').iterator()
+        }
+        return [
+            numbered.get(number)
+            for number in range(max(numbered, default=-1) + 1)
+        ]
+
+    def post_date(self, number):
+        return self.end - self.span + self.span * (
+            (number + 1) / self.scale.posts
+        )
+
+    def insert_users(self, job, rows):
+        User.objects.bulk_create([
+            User(
+                username=USERNAME.format(job.start + offset),
+                first_name=first_name, last_name=last_name,
+                password=self.password,
+            )
+            for offset, (first_name, last_name) in enumerate(rows)
+        ])
+
+    def insert_groups(self, job, rows):
+        Group.objects.bulk_create([
+            Group(
+                slug=GROUP_SLUG.format(job.start + offset),
+                title=title, description=description,
+            )
+            for offset, (title, description) in enumerate(rows)
+        ])
+
+    def insert_posts(self, job, rows):
+        Post.objects.bulk_create([
+            Post(
+                author_id=self.users[author],
+                group_id=self.groups[group] if group is not None else None,
+                text=text,
+                pub_date=self.post_date(job.start + offset),
+            )
+            for offset, (author, group, text) in enumerate(rows)
+        ])
+
+    def insert_comments(self, job, rows):
+        Comment.objects.bulk_create([
+            Comment(
+                post_id=self.posts[post], author_id=self.users[author],
+                text=text,
+                pub_date=min(
+                    self.post_date(post) + timedelta(seconds=delay),
+                    self.end,
+                ),
+            )
+            for post, author, text, delay in rows
+        ])
+
+    def insert_follows(self, job, rows):
+        Follow.objects.bulk_create([
+            Follow(user_id=self.users[user], author_id=self.users[author])
+            for user, author in rows
+        ])
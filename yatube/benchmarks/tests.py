@@ -0,0 +1,233 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase
+
+from posts.models import Comment, Follow, Post, User, UserCounters
+
+from . import concurrency, load, synthetic
+from .results import compare, percentile, summarize
+from .seed import Scale, bench_users, seed
+
+SCALE = Scale(users=6, groups=2, posts=30, comments=40, follows=8)
+
+
+class SeedTests(TestCase):
+    def test_seed(self):
+        """Создаются объекты нужного числа, сигналы отрабатывают"""
+        seed(SCALE)
+        self.assertEqual(bench_users().count(), SCALE.users)
+        self.assertEqual(Post.objects.count(), SCALE.posts)
+        self.assertEqual(Follow.objects.count(), SCALE.follows)
+        self.assertEqual(
+            sum(UserCounters.objects.values_list('posts_count', flat=True)),
+            SCALE.posts,
+        )
+
+    def test_foreign_user_kept(self):
+        """Чужой пользователь с префиксом останавливает пересев"""
+        seed(SCALE)
+        User.objects.create_user(username='bench-foo')
+        with self.assertRaisesMessage(CommandError, 'bench-foo'):
+            call_command('bench_seed', **SCALE._asdict(), stdout=StringIO())
+        self.assertTrue(User.objects.filter(username='bench-foo').exists())
+        self.assertEqual(Post.objects.count(), SCALE.posts)
+
+    def test_deterministic(self):
+        """Одинаковый seed даёт одинаковые данные, повтор их заменяет"""
+        seed(SCALE, seed=3)
+        first = list(Post.objects.order_by('id').values_list(
+            'author__username', 'text'
+        ))
+        seed(SCALE, seed=3)
+        second = list(Post.objects.order_by('id').values_list(
+            'author__username', 'text'
+        ))
+        self.assertEqual(first, second)
+
+
+SYNTHETIC = Scale(users=12, groups=3, posts=60, comments=80, follows=30)
+
+
+@mock.patch.object(synthetic, 'CHUNK', 25)
+class SyntheticTests(TestCase):
+    def rows(self):
+        return (
+            list(Post.objects.order_by('id').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date'
+            )),
+            list(Comment.objects.order_by('id').values_list(
+                'post__text', 'author__username', 'text', 'pub_date'
+            )),
+            list(Follow.objects.order_by('id').values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_seed_command(self):
+        """seed создаёт данные нужного размера и пересчитывает счётчики"""
+        out = StringIO()
+        options = {
+            **SYNTHETIC._asdict(), 'workers': 1, 'stdout': out,
+            'stderr': StringIO(),
+        }
+        call_command('seed', **options)
+        self.assertIn('posts 60', out.getvalue())
+        self.assertEqual(synthetic.seed_users().count(), SYNTHETIC.users)
+        self.assertEqual(Post.objects.count(), SYNTHETIC.posts)
+        self.assertEqual(Comment.objects.count(), SYNTHETIC.comments)
+        self.assertEqual(Follow.objects.count(), SYNTHETIC.follows)
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)),
+            SYNTHETIC.comments,
+        )
+        counters = UserCounters.objects.get(user__username='seed-0')
+        self.assertEqual(
+            counters.posts_count,
+            Post.objects.filter(author__username='seed-0').count(),
+        )
+        # Первые по Ципфу пишут больше последних.
+        self.assertGreater(
+            counters.posts_count,
+            Post.objects.filter(author__username='seed-11').count(),
+        )
+        with self.assertRaisesMessage(CommandError, '--clear'):
+            call_command('seed', **options)
+        call_command('seed', clear=True, **options)
+        self.assertEqual(Post.objects.count(), SYNTHETIC.posts)
+
+    def test_foreign_user_kept(self):
+        """Чужой пользователь seed-foo не удаляется и не ломает номера"""
+        seeder = synthetic.Seeder(SYNTHETIC)
+        seeder.run(workers=1)
+        self.assertEqual(len(seeder.users), SYNTHETIC.users)
+        User.objects.create_user(username='seed-foo')
+        with self.assertRaisesMessage(ValueError, 'seed-foo'):
+            synthetic.clear()
+        with self.assertRaisesMessage(ValueError, 'seed-foo'):
+            seeder.loaded('users')
+        with self.assertRaisesMessage(CommandError, 'seed-foo'):
+            call_command(
+                'seed', **SYNTHETIC._asdict(), workers=1, clear=True,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        self.assertTrue(User.objects.filter(username='seed-foo').exists())
+        self.assertEqual(Post.objects.count(), SYNTHETIC.posts)
+
+    def test_deterministic(self):
+        """Данные зависят только от seed, а не от числа воркеров"""
+        synthetic.Seeder(SYNTHETIC, seed=5).run(workers=1)
+        first = self.rows()
+        synthetic.clear()
+        synthetic.Seeder(SYNTHETIC, seed=5).run(workers=2)
+        self.assertEqual(self.rows(), first)
+        synthetic.clear()
+        synthetic.Seeder(SYNTHETIC, seed=6).run(workers=1)
+        self.assertNotEqual(self.rows(), first)
+
+
+class LoadTests(TestCase):
+    def test_all_endpoints(self):
+        """Все адреса posts.urls отвечают под нагрузкой без ошибок"""
+        seed(SCALE)
+        measured = load.run(load.endpoints(), load.ClientTransport, 3, 1, 1)
+        self.assertEqual(set(measured['endpoints']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'post_comments', 'search',
+            'follow_index', 'post_create', 'post_edit', 'add_comment',
+            'profile_follow', 'profile_unfollow',
+        })
+        for name, row in measured['endpoints'].items():
+            with self.subTest(name=name):
+                self.assertEqual((row['requests'], row['errors']), (3, 0))
+
+    def test_bench_load_baseline(self):
+        """bench_load сохраняет базовый замер и сверяется с ним"""
+        seed(SCALE)
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = os.path.join(directory, 'baseline.json')
+            options = {
+                'requests': 2, 'concurrency': 1, 'warmup': 0,
+                'names': ['index'], 'baseline': baseline,
+                'stdout': StringIO(),
+            }
+            call_command('bench_load', save_baseline=True, **options)
+            with open(baseline) as file:
+                saved = json.load(file)
+            self.assertEqual(list(saved['endpoints']), ['index'])
+            out = StringIO()
+            call_command(
+                'bench_load', tolerance=1000, **{**options, 'stdout': out}
+            )
+            self.assertIn('Регрессий нет', out.getvalue())
+            with self.assertRaisesMessage(CommandError, 'concurrency'):
+                call_command('bench_load', **{**options, 'concurrency': 2})
+
+    def test_bench_load_without_data(self):
+        """Без bench_seed команда объясняет, чего не хватает"""
+        with self.assertRaisesMessage(CommandError, 'bench_seed'):
+            call_command('bench_load', stdout=StringIO())
+
+
+class ConcurrencyTests(TransactionTestCase):
+    def test_bench_sqlite(self):
+        """Обе конфигурации читают и пишут, настроенная — без ошибок"""
+        seed(SCALE)
+        measured = concurrency.run(threads=3, writers=1, seconds=0.3)
+        self.assertEqual(
+            set(measured['configurations']), set(concurrency.CONFIGURATIONS)
+        )
+        for name, operations in measured['configurations'].items():
+            with self.subTest(name=name):
+                self.assertEqual(set(operations), {'read', 'write'})
+                self.assertGreater(operations['read']['requests'], 0)
+                self.assertGreater(operations['write']['requests'], 0)
+        tuned = measured['configurations']['tuned']
+        self.assertEqual(tuned['write']['errors'], 0)
+        out = StringIO()
+        call_command(
+            'bench_sqlite', threads=2, writers=1, seconds=0.1, stdout=out
+        )
+        self.assertIn('tuned', out.getvalue())
+
+    def test_bench_sqlite_without_data(self):
+        """Без данных bench_sqlite просит запустить bench_seed"""
+        with self.assertRaisesMessage(CommandError, 'bench_seed'):
+            call_command('bench_sqlite', stdout=StringIO())
+
+
+class ResultsTests(TestCase):
+    def test_summarize(self):
+        """Перцентили считаются по ближайшему рангу"""
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.99), 4)
+        row = summarize([0.001 * n for n in range(1, 101)], 2, 2.0)
+        self.assertEqual(row['requests'], 100)
+        self.assertEqual(row['rps'], 50)
+        self.assertAlmostEqual(row['p90_ms'], 90)
+
+    def test_compare(self):
+        """Регрессией считается рост задержки, падение rps и ошибки"""
+        base = {'endpoints': {'index': {
+            'rps': 100, 'p50_ms': 10, 'p90_ms': 20, 'errors': 0,
+        }}}
+
+        def run(**changes):
+            return {'endpoints': {'index': {
+                **base['endpoints']['index'], **changes
+            }}}
+
+        self.assertEqual(compare(run(p50_ms=11), base), [])
+        self.assertEqual(compare(run(p90_ms=25), base), [
+            'index: p90_ms 25.0 > 20.0'
+        ])
+        self.assertEqual(len(compare(run(rps=70), base)), 1)
+        self.assertEqual(len(compare(run(errors=1), base)), 1)
+        small = {'endpoints': {'index': {
+            **base['endpoints']['index'], 'p50_ms': 0.5
+        }}}
+        self.assertEqual(compare(run(p50_ms=0.9), small), [])
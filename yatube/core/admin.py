@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'available_at', 'created',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,105 @@
+"""SQLite для нескольких процессов и потоков сразу.
+
+Стандартный бэкенд с настройками под конкурентную нагрузку:
+
+- журнал WAL: читатели не ждут писателя, а писатель — читателей;
+- synchronous = NORMAL: в режиме WAL база не портится при сбое,
+  теряются только последние транзакции, зато fsync на каждую
+  фиксацию не нужен;
+- mmap_size и cache_size: страницы читаются из общей памяти и
+  собственного кеша соединения, а не системными вызовами;
+- transaction.atomic начинает транзакцию с BEGIN IMMEDIATE. Иначе
+  транзакция, которая сначала читает, а потом пишет, при занятой
+  блокировке записи сразу получает «database is locked»: SQLite не
+  ждёт, чтобы не допустить взаимной блокировки. Так транзакция ждёт
+  блокировку в самом начале, пока ещё ничего не прочитала.
+
+Если блокировка не освободилась за timeout, оператор вне транзакции
+повторяется с растущей паузой, но не больше BUSY_RETRIES раз.
+Внутри транзакции повтор не поможет, и ошибка уходит наверх.
+
+Соединение держится открытым CONN_MAX_AGE секунд, а не
+открывается заново на каждый запрос. Прагмы переопределяются в
+OPTIONS['pragmas'] (None отключает прагму). У реплик с mode=ro
+журнал не трогается, а транзакции начинаются обычным BEGIN.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+Database = base.Database
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в килобайтах, а не в страницах.
+    'cache_size': -64 * 1024,
+}
+# Сколько секунд SQLite сам ждёт блокировку, прежде чем вернуть ошибку.
+BUSY_TIMEOUT = 1.0
+BUSY_RETRIES = 4
+BUSY_BACKOFF = 0.05
+MAX_BUSY_BACKOFF = 1.0
+BUSY_ERRORS = ('database is locked', 'database table is locked')
+
+
+def busy_delay(attempt):
+    # Случайная доля паузы разводит потоки, упавшие одновременно.
+    delay = min(BUSY_BACKOFF * 2 ** attempt, MAX_BUSY_BACKOFF)
+    return delay * random.uniform(0.5, 1)
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    def execute(self, query, params=None):
+        return self.retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self.retry(super().executemany, query, list(param_list))
+
+    def retry(self, method, *args):
+        for attempt in range(BUSY_RETRIES):
+            try:
+                return method(*args)
+            except Database.OperationalError as error:
+                if (not str(error).startswith(BUSY_ERRORS)
+                        or self.connection.in_transaction):
+                    raise
+            time.sleep(busy_delay(attempt))
+        return method(*args)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def read_only(self):
+        return 'mode=ro' in str(self.settings_dict['NAME'])
+
+    def pragmas(self):
+        pragmas = {
+            **PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})
+        }
+        if self.read_only:
+            pragmas.pop('journal_mode')
+        return {
+            name: value for name, value in pragmas.items()
+            if value is not None
+        }
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.setdefault('timeout', BUSY_TIMEOUT)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=SQLiteCursorWrapper)
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN' if self.read_only else 'BEGIN IMMEDIATE')
@@ -0,0 +1,193 @@
+"""Общий для всех процессов кеш на Redis.
+
+LOCATION — адрес вида redis://host:6379/0. Адрес memory:// включает
+Redis в памяти процесса (core.fakeredis): с ним тесты и разработка
+обходятся без отдельного сервера.
+
+Пул соединений один на адрес и общий для всех потоков процесса.
+get_many и set_many укладываются в одно обращение к серверу.
+Большие значения перед записью сжимаются.
+"""
+import pickle
+import threading
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+from . import fakeredis
+
+MEMORY_SCHEME = 'memory://'
+# Значения хранятся с однобайтовой меткой формата. Целые числа пишутся
+# как есть, чтобы incr выполнял сам сервер.
+PICKLED = b'p'
+COMPRESSED = b'z'
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(location, max_connections=None, socket_timeout=None):
+    """Клиент Redis с общим для процесса пулом соединений."""
+    with _clients_lock:
+        if location not in _clients:
+            _clients[location] = _connect(
+                location, max_connections, socket_timeout
+            )
+        return _clients[location]
+
+
+def _connect(location, max_connections, socket_timeout):
+    if location.startswith(MEMORY_SCHEME):
+        return fakeredis.FakeRedis()
+    try:
+        import redis
+    except ImportError:
+        raise ImproperlyConfigured(
+            'Для кеша на Redis установите пакет redis '
+            'или укажите LOCATION memory://.'
+        )
+    pool = redis.ConnectionPool.from_url(
+        location,
+        max_connections=max_connections,
+        socket_timeout=socket_timeout,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def _response_errors():
+    try:
+        from redis.exceptions import ResponseError
+    except ImportError:
+        return (fakeredis.ResponseError,)
+    return (fakeredis.ResponseError, ResponseError)
+
+
+class RedisCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._location = server
+        options = params.get('OPTIONS', {})
+        self._max_connections = options.get('MAX_CONNECTIONS')
+        self._socket_timeout = options.get('SOCKET_TIMEOUT')
+        self._compress_min_length = options.get('COMPRESS_MIN_LENGTH', 1024)
+        self._compress_level = options.get('COMPRESS_LEVEL', 6)
+
+    @property
+    def client(self):
+        return get_client(
+            self._location, self._max_connections, self._socket_timeout
+        )
+
+    def encode(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self._compress_min_length:
+            return COMPRESSED + zlib.compress(data, self._compress_level)
+        return PICKLED + data
+
+    def decode(self, data):
+        marker, payload = data[:1], data[1:]
+        if marker == COMPRESSED:
+            return pickle.loads(zlib.decompress(payload))
+        if marker == PICKLED:
+            return pickle.loads(payload)
+        return int(data)
+
+    def _expiry(self, timeout):
+        """Время жизни в миллисекундах; None — бессрочно."""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            return not self.client.exists(key)
+        return bool(self.client.set(
+            key, self.encode(value), px=expiry, nx=True
+        ))
+
+    def get(self, key, default=None, version=None):
+        data = self.client.get(self._key(key, version))
+        return default if data is None else self.decode(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            self.client.delete(key)
+            return
+        self.client.set(key, self.encode(value), px=expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self.client.persist(key) or self.client.exists(key))
+        if expiry == 0:
+            return bool(self.client.delete(key))
+        return bool(self.client.pexpire(key, expiry))
+
+    def delete(self, key, version=None):
+        self.client.delete(self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        names = [self._key(key, version) for key in keys]
+        return {
+            key: self.decode(data)
+            for key, data in zip(keys, self.client.mget(names))
+            if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        expiry = self._expiry(timeout)
+        with self.client.pipeline(transaction=False) as pipe:
+            for key, value in data.items():
+                key = self._key(key, version)
+                if expiry == 0:
+                    pipe.delete(key)
+                else:
+                    pipe.set(key, self.encode(value), px=expiry)
+            pipe.execute()
+        return []
+
+    def delete_many(self, keys, version=None):
+        names = [self._key(key, version) for key in keys]
+        if names:
+            self.client.delete(*names)
+
+    def has_key(self, key, version=None):
+        return bool(self.client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self.client.exists(key):
+            raise ValueError("Key '%s' not found" % key)
+        try:
+            return self.client.incrby(key, delta)
+        except _response_errors():
+            # Хранится не целое число: считаем как базовый класс.
+            value = self.decode(self.client.get(key)) + delta
+            expiry = self.client.pttl(key)
+            self.client.set(
+                key, self.encode(value), px=expiry if expiry > 0 else None
+            )
+            return value
+
+    def clear(self):
+        self.client.flushdb()
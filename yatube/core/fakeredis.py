@@ -0,0 +1,134 @@
+"""Redis в памяти процесса для тестов и локальной разработки.
+
+Реализует только те команды redis-py, которыми пользуется
+core.cache.RedisCache, с теми же сигнатурами и ответами. Конвейер
+выполняется за одно обращение, как у настоящего Redis; число
+обращений считается в round_trips.
+"""
+import threading
+import time
+
+from django.utils.encoding import force_bytes
+
+
+class ResponseError(Exception):
+    pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+        self.round_trips = 0
+
+    def _alive(self, name):
+        deadline = self._expires.get(name)
+        if deadline is not None and deadline <= time.monotonic():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return name in self._data
+
+    def _call(self, command, *args, **kwargs):
+        with self._lock:
+            self.round_trips += 1
+            return getattr(self, '_' + command)(*args, **kwargs)
+
+    def _get(self, name):
+        return self._data[name] if self._alive(name) else None
+
+    def _mget(self, names):
+        return [self._get(name) for name in names]
+
+    def _set(self, name, value, px=None, nx=False):
+        if nx and self._alive(name):
+            return None
+        self._data[name] = force_bytes(value)
+        self._expires.pop(name, None)
+        if px is not None:
+            self._expires[name] = time.monotonic() + px / 1000
+        return True
+
+    def _delete(self, *names):
+        deleted = 0
+        for name in names:
+            if self._alive(name):
+                deleted += 1
+                del self._data[name]
+                self._expires.pop(name, None)
+        return deleted
+
+    def _exists(self, *names):
+        return sum(self._alive(name) for name in names)
+
+    def _incrby(self, name, amount=1):
+        try:
+            value = int(self._get(name) or 0) + amount
+        except ValueError:
+            raise ResponseError(
+                'value is not an integer or out of range'
+            ) from None
+        self._data[name] = str(value).encode()
+        return value
+
+    def _pexpire(self, name, time_ms):
+        if not self._alive(name):
+            return False
+        self._expires[name] = time.monotonic() + time_ms / 1000
+        return True
+
+    def _persist(self, name):
+        if not self._alive(name):
+            return False
+        return self._expires.pop(name, None) is not None
+
+    def _pttl(self, name):
+        if not self._alive(name):
+            return -2
+        deadline = self._expires.get(name)
+        if deadline is None:
+            return -1
+        return int((deadline - time.monotonic()) * 1000)
+
+    def _flushdb(self):
+        self._data.clear()
+        self._expires.clear()
+        return True
+
+    def __getattr__(self, command):
+        if not hasattr(type(self), '_' + command):
+            raise AttributeError(command)
+        return lambda *args, **kwargs: self._call(command, *args, **kwargs)
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+
+class Pipeline:
+    def __init__(self, server):
+        self._server = server
+        self._commands = []
+
+    def __getattr__(self, command):
+        if not hasattr(FakeRedis, '_' + command):
+            raise AttributeError(command)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self._commands = self._commands, []
+        with self._server._lock:
+            self._server.round_trips += 1
+            return [
+                getattr(self._server, '_' + command)(*args, **kwargs)
+                for command, args, kwargs in commands
+            ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._commands = []
@@ -0,0 +1,58 @@
+"""Отправка писем фоновой задачей.
+
+TaskEmailBackend — значение EMAIL_BACKEND при EMAIL_QUEUE=1 (без него
+письма отправляются сразу). Вместо отправки он ставит каждое письмо в
+очередь core.tasks, и запрос (например, сброс пароля) не ждёт
+почтовый сервер. Задача отправляет письмо через настоящий бэкенд из
+CORE_EMAIL_BACKEND. Письма с вложениями в JSON не укладываются и
+отправляются сразу.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import task
+
+MESSAGE_FIELDS = (
+    'subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+)
+
+
+def delivery_backend():
+    return getattr(
+        settings, 'CORE_EMAIL_BACKEND',
+        'django.core.mail.backends.smtp.EmailBackend',
+    )
+
+
+def serialize(message):
+    data = {field: getattr(message, field) for field in MESSAGE_FIELDS}
+    data['headers'] = message.extra_headers
+    data['alternatives'] = getattr(message, 'alternatives', [])
+    return data
+
+
+@task
+def send_message(data):
+    alternatives = data.pop('alternatives')
+    message = EmailMultiAlternatives(
+        connection=get_connection(delivery_backend()), **data
+    )
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    message.send()
+
+
+class TaskEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        attached = []
+        for message in email_messages:
+            if message.attachments:
+                attached.append(message)
+            else:
+                send_message.delay(serialize(message))
+        if attached:
+            get_connection(
+                delivery_backend(), fail_silently=self.fail_silently
+            ).send_messages(attached)
+        return len(email_messages)
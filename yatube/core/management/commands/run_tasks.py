@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import work
+
+
+def init_worker():
+    # При запуске процессов через spawn Django нужно настроить заново.
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди core.tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Число воркеров; 1 — выполнять в текущем процессе.',
+        )
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread',
+            help='Воркеры-потоки (для ввода-вывода) или процессы '
+                 '(для работы на процессоре, например миниатюр).',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Сколько секунд ждать, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда очередь опустеет.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        arguments = (options['poll_interval'], options['burst'])
+        if workers <= 1:
+            done = work(*arguments)
+        elif options['pool'] == 'process':
+            # Открытые соединения с БД не должны достаться дочерним
+            # процессам.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                workers, initializer=init_worker
+            ) as pool:
+                done = sum(pool.map(work, *zip(*[arguments] * workers)))
+        else:
+            stop = threading.Event()
+            with ThreadPoolExecutor(
+                workers, thread_name_prefix='tasks'
+            ) as pool:
+                futures = [
+                    pool.submit(work, *arguments, stop)
+                    for _ in range(workers)
+                ]
+                try:
+                    done = sum(future.result() for future in futures)
+                except KeyboardInterrupt:
+                    stop.set()
+                    done = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {done}.'
+        ))
@@ -0,0 +1,43 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Задача фоновой очереди (см. core.tasks)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=200, verbose_name='Функция')
+    arguments = models.TextField(verbose_name='Аргументы')
+    status = models.CharField(
+        max_length=10, choices=STATUSES, default=QUEUED,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveIntegerField(verbose_name='Всего попыток')
+    # Для задачи в очереди — когда её можно взять, для выполняемой —
+    # когда она снова станет видна, если воркер пропадёт.
+    available_at = models.DateTimeField(verbose_name='Доступна с')
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Создана'
+    )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'available_at'], name='task_available_idx'
+            ),
+        ]
@@ -0,0 +1,273 @@
+"""Профилирование запросов: SQL, шаблоны, кеш и миниатюры.
+
+ProfilingMiddleware включается настройкой CORE_PROFILING. Выключенный,
+он отказывается работать ещё при сборке цепочки middleware
+(MiddlewareNotUsed), и запросы проходят без единой лишней проверки.
+
+Включённый, он отдаёт разбивку времени в заголовке Server-Timing и
+пишет в лог core.profiling JSON по доле запросов
+CORE_PROFILING_SAMPLE_RATE и по всем запросам медленнее
+CORE_PROFILING_SLOW_MS. Время шаблона включает время вложенных в него
+шаблонов, миниатюр, кеша и SQL.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from sorl.thumbnail.base import ThumbnailBackend
+
+logger = logging.getLogger(__name__)
+
+# Сколько повторяющихся запросов показывать в логе.
+TOP_QUERIES = 5
+
+_state = threading.local()
+_installed = False
+_install_lock = threading.Lock()
+_missing = object()
+
+
+def current():
+    """Профиль запроса, который обрабатывается в этом потоке."""
+    return getattr(_state, 'profile', None)
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.templates = defaultdict(lambda: [0, 0.0])
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = self.cache_misses = 0
+        self.cache_seconds = 0.0
+        self.thumbnails = 0
+        self.thumbnail_seconds = 0.0
+
+    @property
+    def sql_seconds(self):
+        return sum(seconds for _, _, seconds in self.queries)
+
+    def repeated(self):
+        """Одинаковые запросы (с теми же параметрами) и похожие (тот же
+        SQL с другими параметрами, обычно N+1)."""
+        duplicates = Counter(
+            (sql, params) for sql, params, _ in self.queries
+        )
+        similar = Counter(sql for sql, _, _ in self.queries)
+        return (
+            {key: count for key, count in duplicates.items() if count > 1},
+            {sql: count for sql, count in similar.items() if count > 1},
+        )
+
+    def server_timing(self, total):
+        duplicates, _ = self.repeated()
+        metrics = [
+            ('sql', self.sql_seconds,
+             f'{len(self.queries)} queries / '
+             f'{sum(duplicates.values())} duplicated'),
+            ('tpl', self.template_seconds,
+             f'{sum(count for count, _ in self.templates.values())} '
+             f'templates'),
+            ('cache', self.cache_seconds,
+             f'{self.cache_hits} hits / {self.cache_misses} misses'),
+            ('thumb', self.thumbnail_seconds, f'{self.thumbnails} lookups'),
+            ('total', total, ''),
+        ]
+        return ', '.join(
+            f'{name};dur={seconds * 1000:.1f}'
+            + (f';desc="{description}"' if description else '')
+            for name, seconds, description in metrics
+        )
+
+    def as_dict(self, request, response, total):
+        duplicates, similar = self.repeated()
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': total * 1000,
+            'sql': {
+                'count': len(self.queries),
+                'ms': self.sql_seconds * 1000,
+                'duplicates': [
+                    {'sql': sql, 'count': count}
+                    for (sql, _), count in Counter(duplicates).most_common(
+                        TOP_QUERIES
+                    )
+                ],
+                'similar': [
+                    {'sql': sql, 'count': count}
+                    for sql, count in Counter(similar).most_common(
+                        TOP_QUERIES
+                    )
+                ],
+            },
+            'templates': {
+                'ms': self.template_seconds * 1000,
+                'by_name': {
+                    name: {'count': count, 'ms': seconds * 1000}
+                    for name, (count, seconds) in sorted(
+                        self.templates.items(),
+                        key=lambda item: -item[1][1],
+                    )
+                },
+            },
+            'cache': {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'ms': self.cache_seconds * 1000,
+            },
+            'thumbnails': {
+                'count': self.thumbnails,
+                'ms': self.thumbnail_seconds * 1000,
+            },
+        }
+
+
+def record_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile = current()
+        if profile is not None:
+            profile.queries.append(
+                (sql, repr(params), time.perf_counter() - started)
+            )
+
+
+def timed_template(render):
+    @wraps(render)
+    def wrapper(self, context):
+        profile = current()
+        if profile is None:
+            return render(self, context)
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            seconds = time.perf_counter() - started
+            profile.template_depth -= 1
+            # Вложенные шаблоны уже учтены во времени внешнего.
+            if not profile.template_depth:
+                profile.template_seconds += seconds
+            stats = profile.templates[self.name or '<string>']
+            stats[0] += 1
+            stats[1] += seconds
+    return wrapper
+
+
+def timed_thumbnail(get_thumbnail):
+    @wraps(get_thumbnail)
+    def wrapper(*args, **kwargs):
+        profile = current()
+        if profile is None:
+            return get_thumbnail(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return get_thumbnail(*args, **kwargs)
+        finally:
+            profile.thumbnails += 1
+            profile.thumbnail_seconds += time.perf_counter() - started
+    return wrapper
+
+
+def timed_cache_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        profile = current()
+        if profile is None:
+            return get(self, key, default, version)
+        started = time.perf_counter()
+        value = get(self, key, _missing, version)
+        profile.cache_seconds += time.perf_counter() - started
+        if value is _missing:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+    return wrapper
+
+
+def timed_cache_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        profile = current()
+        if profile is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        started = time.perf_counter()
+        found = get_many(self, keys, version)
+        profile.cache_seconds += time.perf_counter() - started
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def install():
+    """Оборачивает рендер шаблонов, миниатюры и чтение из кешей.
+
+    Обёртки ставятся один раз на процесс и вне профилируемого запроса
+    сразу вызывают исходный метод.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        Template.render = timed_template(Template.render)
+        ThumbnailBackend.get_thumbnail = timed_thumbnail(
+            ThumbnailBackend.get_thumbnail
+        )
+        for backend in {type(caches[alias]) for alias in settings.CACHES}:
+            backend.get = timed_cache_get(backend.get)
+            backend.get_many = timed_cache_get_many(backend.get_many)
+        _installed = True
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'CORE_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'CORE_PROFILING_SAMPLE_RATE', 0)
+        self.slow_seconds = getattr(
+            settings, 'CORE_PROFILING_SLOW_MS', None
+        )
+        if self.slow_seconds is not None:
+            self.slow_seconds /= 1000
+        install()
+
+    def __call__(self, request):
+        profile = _state.profile = Profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _state.profile = None
+        total = time.perf_counter() - profile.started
+        response['Server-Timing'] = profile.server_timing(total)
+        if random.random() < self.sample_rate or (
+            self.slow_seconds is not None and total >= self.slow_seconds
+        ):
+            logger.info(json.dumps(
+                profile.as_dict(request, response, total),
+                ensure_ascii=False,
+            ))
+        return response
@@ -0,0 +1,143 @@
+"""Бюджеты SQL-запросов для страниц в тестах.
+
+Пока подключён (install), каждый запрос тестового клиента записывает
+SQL, который выполнила страница, и сверяет его с настройками:
+
+- CORE_QUERY_BUDGETS — сколько запросов можно странице, по имени адреса
+  ('posts:index'). Если для пространства имён задан хоть один бюджет,
+  бюджет нужен каждой его странице: новая страница без бюджета тоже
+  ошибка.
+- CORE_QUERY_BUDGET_EXCLUDE — регулярные выражения запросов, которые
+  в бюджет не входят (но в CORE_QUERY_REPEAT_LIMIT входят).
+- CORE_QUERY_REPEAT_LIMIT — сколько раз страница может выполнить
+  запрос одной формы (тот же SQL с другими параметрами). Больше —
+  почти всегда N+1: запрос в цикле по объектам.
+
+Превышение роняет тест, который обратился к странице, с
+QueryBudgetExceeded. Подключается BudgetTestRunner для manage.py test
+и плагином core.querybudget для pytest (см. conftest.py в корне).
+"""
+import re
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.urls import Resolver404
+
+# Список параметров IN (%s, %s, …) любой длины — одна форма запроса.
+PARAMETER_LIST = re.compile(r'\(%s(?:, %s)*\)')
+
+_original_request = None
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_shape(sql):
+    return PARAMETER_LIST.sub('(%s, …)', sql)
+
+
+def counted(queries):
+    """Запросы, которые входят в бюджет страницы."""
+    excluded = [
+        re.compile(pattern)
+        for pattern in getattr(settings, 'CORE_QUERY_BUDGET_EXCLUDE', ())
+    ]
+    return [
+        sql for sql in queries
+        if not any(pattern.search(sql) for pattern in excluded)
+    ]
+
+
+def problems(view_name, queries):
+    """Нарушения бюджета страницы view_name с запросами queries."""
+    budgets = getattr(settings, 'CORE_QUERY_BUDGETS', {})
+    namespaces = {name.partition(':')[0] for name in budgets}
+    found = []
+    budget = budgets.get(view_name)
+    if budget is None:
+        if view_name.partition(':')[0] in namespaces:
+            found.append(
+                f'{view_name}: бюджет не задан в CORE_QUERY_BUDGETS'
+            )
+    elif len(counted(queries)) > budget:
+        found.append(
+            f'{view_name}: {len(counted(queries))} запросов при бюджете '
+            f'{budget}'
+        )
+    limit = getattr(settings, 'CORE_QUERY_REPEAT_LIMIT', None)
+    if limit is not None:
+        for shape, count in Counter(map(query_shape, queries)).items():
+            if count > limit:
+                found.append(
+                    f'{view_name}: {count} раз один запрос (N+1?): {shape}'
+                )
+    return found
+
+
+def view_name(response):
+    try:
+        return response.resolver_match.view_name
+    except (AttributeError, Resolver404):
+        return None
+
+
+def budgeted(request):
+    @wraps(request)
+    def wrapper(self, **environ):
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            response = request(self, **environ)
+        name = view_name(response)
+        found = problems(name, queries) if name else []
+        if found:
+            raise QueryBudgetExceeded(
+                '\n'.join(found) + '\nЗапросы:\n' + '\n'.join(queries)
+            )
+        return response
+    return wrapper
+
+
+def install():
+    """Включает проверку бюджетов для всех тестовых клиентов."""
+    global _original_request
+    if _original_request is None:
+        _original_request = Client.request
+        Client.request = budgeted(Client.request)
+
+
+def uninstall():
+    global _original_request
+    if _original_request is not None:
+        Client.request = _original_request
+        _original_request = None
+
+
+class BudgetTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        install()
+
+    def teardown_test_environment(self, **kwargs):
+        uninstall()
+        super().teardown_test_environment(**kwargs)
+
+
+def pytest_configure(config):
+    install()
+
+
+def pytest_unconfigure(config):
+    uninstall()
@@ -0,0 +1,142 @@
+"""Чтение страниц с реплик базы.
+
+ReplicaRouter отправляет чтения GET-запросов к страницам из
+CORE_REPLICA_NAMESPACES на одну из реплик CORE_DATABASE_REPLICAS
+(одну на весь запрос, чтобы страница видела согласованные данные).
+Запись, запросы с телом, остальные страницы, команды и воркеры
+работают с основной базой.
+
+Реплика отстаёт, поэтому основная база читается ещё в двух случаях:
+
+- зритель сам недавно писал: ответ на запрос с записью ставит cookie
+  на CORE_REPLICA_PIN_SECONDS, и его новый пост или комментарий
+  виден сразу;
+- страница недавно изменилась (primary_if_recent): иначе её
+  устаревшая копия с реплики попала бы в кеш страниц и фрагментов
+  под новым поколением и осталась бы там до следующего изменения.
+
+Без реплик в настройках ReplicaMiddleware отключается
+(MiddlewareNotUsed), а маршрутизатор всё отправляет в default.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404
+
+PRIMARY = 'default'
+PIN_COOKIE = 'primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+def replicas():
+    return list(getattr(settings, 'CORE_DATABASE_REPLICAS', []))
+
+
+def replica_namespaces():
+    return getattr(settings, 'CORE_REPLICA_NAMESPACES', ('posts',))
+
+
+def pin_seconds():
+    return getattr(settings, 'CORE_REPLICA_PIN_SECONDS', 5)
+
+
+def current_replica():
+    """Реплика, с которой читает текущий запрос, или None."""
+    return getattr(_state, 'replica', None)
+
+
+def use_primary():
+    """До конца запроса читать основную базу."""
+    _state.replica = None
+
+
+def primary_if_recent(changed_ns):
+    """Читать основную базу, если данные менялись (time_ns) так
+    недавно, что реплика могла их ещё не получить.
+
+    Возвращает True, если запрос читал с реплики и переключён: то,
+    что уже прочитано, стоит прочитать заново.
+    """
+    if current_replica() is None:
+        return False
+    if time.time_ns() - changed_ns < pin_seconds() * 10 ** 9:
+        use_primary()
+        return True
+    return False
+
+
+def get_fresh_or_404(queryset, **lookup):
+    """get_object_or_404, который не верит отсутствию на реплике.
+
+    Объект могли создать только что: его нет на реплике, но есть в
+    основной базе.
+    """
+    try:
+        return queryset.get(**lookup)
+    except queryset.model.DoesNotExist:
+        if current_replica() is None:
+            raise Http404
+    use_primary()
+    try:
+        return queryset.using(PRIMARY).get(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же строки, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с данными.
+        return db not in replicas()
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica = None
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            if _state.wrote and request.method not in SAFE_METHODS:
+                until = int(time.time()) + pin_seconds()
+                response.set_cookie(
+                    PIN_COOKIE, str(until), max_age=pin_seconds(),
+                    httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            _state.replica = None
+            _state.wrote = False
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if (request.method in SAFE_METHODS and match.namespaces
+                and match.namespaces[0] in replica_namespaces()
+                and not self.pinned(request)):
+            _state.replica = random.choice(replicas())
+
+    def pinned(self, request):
+        try:
+            until = int(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return until > time.time()
@@ -0,0 +1,194 @@
+"""Фоновые задачи с очередью в таблице базы.
+
+Функция с декоратором @task ставится в очередь вызовом .delay(...):
+в таблицу core_task пишется её путь и аргументы в JSON. Запись
+делается в текущей транзакции, поэтому задача видна воркеру только
+вместе с данными, ради которых её поставили, а при откате исчезает.
+
+Задачи выполняет команда run_tasks. Воркер забирает задачу
+условным UPDATE (без SELECT FOR UPDATE, которого нет в SQLite) и
+прячет её на visibility_timeout секунд: если воркер пропадёт, не
+закончив, задачу возьмёт другой. Выполненная задача удаляется.
+Упавшая возвращается в очередь с растущей задержкой
+(RETRY_BACKOFF * 2 ** (попытка - 1)), после max_attempts попыток
+остаётся в таблице со статусом failed и текстом ошибки.
+
+С CORE_TASKS_EAGER задачи не ставятся в очередь, а выполняются в том
+же процессе после фиксации транзакции.
+"""
+import json
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_VISIBILITY_TIMEOUT = 300
+RETRY_BACKOFF = 10
+MAX_RETRY_DELAY = 60 * 60
+# Сколько кандидатов читать за раз: остальные воркеры разберут
+# соседние, если первый уже забрали.
+CLAIM_BATCH = 10
+
+
+def tasks_eager():
+    return getattr(settings, 'CORE_TASKS_EAGER', False)
+
+
+def retry_delay(attempt):
+    return min(RETRY_BACKOFF * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+
+
+class TaskFunction:
+    def __init__(self, function, max_attempts, visibility_timeout):
+        self.function = function
+        self.name = f'{function.__module__}.{function.__qualname__}'
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.__doc__ = function.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.function(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов в очередь; аргументы должны быть JSON."""
+        arguments = json.dumps({'args': args, 'kwargs': kwargs})
+        if tasks_eager():
+            transaction.on_commit(lambda: self.function(*args, **kwargs))
+            return None
+        return Task.objects.create(
+            name=self.name, arguments=arguments,
+            max_attempts=self.max_attempts, available_at=timezone.now(),
+        )
+
+
+def task(function=None, *, max_attempts=DEFAULT_MAX_ATTEMPTS,
+         visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+    """Декоратор фоновой задачи: @task или @task(max_attempts=3)."""
+    def decorator(function):
+        return TaskFunction(function, max_attempts, visibility_timeout)
+    if function is not None:
+        return decorator(function)
+    return decorator
+
+
+def claim():
+    """Забирает задачу, которую можно выполнять, или возвращает None.
+
+    Задача в очереди и выполняемая с истёкшим временем видимости
+    одинаково доступны. Забрать её значит сдвинуть available_at:
+    UPDATE пройдёт только у одного воркера из тех, кто её прочитал.
+    """
+    now = timezone.now()
+    available = Task.objects.filter(
+        status__in=(Task.QUEUED, Task.RUNNING), available_at__lte=now,
+    )
+    # Воркер пропал на последней попытке: повторять больше нельзя.
+    available.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED,
+        last_error='Воркер не закончил задачу за время видимости',
+    )
+    candidates = available.filter(
+        attempts__lt=F('max_attempts')
+    ).order_by('available_at', 'id')[:CLAIM_BATCH]
+    for candidate in candidates:
+        function = resolve(candidate.name)
+        timeout = (
+            function.visibility_timeout if function is not None
+            else DEFAULT_VISIBILITY_TIMEOUT
+        )
+        claimed = Task.objects.filter(
+            pk=candidate.pk, available_at=candidate.available_at,
+            status=candidate.status,
+        ).update(
+            status=Task.RUNNING, attempts=F('attempts') + 1,
+            available_at=now + timedelta(seconds=timeout),
+        )
+        if claimed:
+            candidate.refresh_from_db()
+            return candidate
+    return None
+
+
+def resolve(name):
+    try:
+        function = import_string(name)
+    except ImportError:
+        return None
+    return function if isinstance(function, TaskFunction) else None
+
+
+def execute(task_row):
+    """Выполняет забранную задачу и отмечает результат."""
+    function = resolve(task_row.name)
+    try:
+        if function is None:
+            raise LookupError(f'Задача {task_row.name} не найдена')
+        arguments = json.loads(task_row.arguments)
+        function(*arguments['args'], **arguments['kwargs'])
+    except Exception:
+        error = traceback.format_exc()
+        if task_row.attempts < task_row.max_attempts and function:
+            delay = retry_delay(task_row.attempts)
+            logger.warning(
+                'Задача %s упала, повтор через %s с', task_row, delay
+            )
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.QUEUED, last_error=error,
+                available_at=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            logger.error('Задача %s не выполнена:\n%s', task_row, error)
+            Task.objects.filter(pk=task_row.pk).update(
+                status=Task.FAILED, last_error=error,
+            )
+        return False
+    Task.objects.filter(pk=task_row.pk).delete()
+    return True
+
+
+def run_pending(limit=None):
+    """Выполняет задачи, пока они есть; возвращает число выполненных."""
+    done = 0
+    while limit is None or done < limit:
+        task_row = claim()
+        if task_row is None:
+            break
+        execute(task_row)
+        done += 1
+    return done
+
+
+def work(poll_interval, burst=False, stop=None):
+    """Цикл воркера: берёт задачи, а без них ждёт poll_interval.
+
+    burst — выйти, когда очередь опустеет. stop — threading.Event
+    для остановки воркера-потока.
+    """
+    stop = stop or threading.Event()
+    done = 0
+    try:
+        while not stop.is_set():
+            done += run_pending()
+            if burst:
+                break
+            stop.wait(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Соединения с БД у каждого потока и процесса свои.
+        connections.close_all()
+    return done
@@ -1,5 +1,49 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core import mail
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import OperationalError, connections, transaction
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import fragments
+from posts.models import Post
+
+from . import routers, tasks
+from .backends.sqlite3 import base
+from .cache import COMPRESSED, RedisCache
+from .models import Task
+from .profiling import Profile, ProfilingMiddleware
+from .querybudget import QueryBudgetExceeded, install, problems
+
+User = get_user_model()
+
+CALLS = []
+
+
+@tasks.task(max_attempts=2)
+def remember(value):
+    CALLS.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise ValueError('Не вышло')
 
 
 class CustomPagesErr(TestCase):
@@ -8,3 +52,426 @@ class CustomPagesErr(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class RedisCacheTests(TestCase):
+    def setUp(self):
+        self.cache = RedisCache('memory://tests', {
+            'OPTIONS': {'COMPRESS_MIN_LENGTH': 100},
+        })
+        self.cache.clear()
+        self.server = self.cache.client
+
+    def test_values_round_trip(self):
+        """Значения разных типов читаются такими же, какими записаны"""
+        values = {
+            'int': 5, 'negative': -3, 'bool': True, 'none': None,
+            'text': 'строка', 'list': [1, 'два'], 'big': 'x' * 1000,
+        }
+        for key, value in values.items():
+            with self.subTest(key=key):
+                self.cache.set(key, value)
+                self.assertEqual(self.cache.get(key, 'нет'), value)
+        self.assertEqual(self.cache.get('missing', 'нет'), 'нет')
+
+    def test_large_values_compressed(self):
+        """Большие значения хранятся сжатыми"""
+        self.cache.set('big', 'x' * 1000)
+        stored = self.server.get(self.cache.make_key('big'))
+        self.assertTrue(stored.startswith(COMPRESSED))
+        self.assertLess(len(stored), 100)
+
+    def test_many_in_one_round_trip(self):
+        """get_many и set_many обращаются к серверу один раз"""
+        data = {f'key_{i}': i for i in range(20)}
+        round_trips = self.server.round_trips
+        self.cache.set_many(data)
+        self.assertEqual(self.server.round_trips, round_trips + 1)
+        self.assertEqual(self.cache.get_many([*data, 'missing']), data)
+        self.assertEqual(self.server.round_trips, round_trips + 2)
+
+    def test_add_incr_delete(self):
+        """add не перезаписывает, incr требует существующий ключ"""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.incr('key', 10), 11)
+        self.assertEqual(self.cache.get('key'), 11)
+        self.cache.set('float', 1.5)
+        self.assertEqual(self.cache.incr('float'), 2.5)
+        self.cache.delete('key')
+        with self.assertRaises(ValueError):
+            self.cache.incr('key')
+
+    def test_timeouts(self):
+        """Нулевое время жизни удаляет ключ, touch его продлевает"""
+        self.cache.set('key', 'value', 0)
+        self.assertFalse(self.cache.has_key('key'))
+        self.cache.set('key', 'value', 60)
+        self.assertTrue(self.cache.touch('key', None))
+        self.assertEqual(self.server.pttl(self.cache.make_key('key')), -1)
+        self.assertTrue(self.cache.touch('key', 0))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_shared_between_instances(self):
+        """Экземпляры с одним адресом работают с одними данными"""
+        other = RedisCache('memory://tests', {})
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        self.assertIs(other.client, self.server)
+
+
+@override_settings(CORE_PROFILING=True, CORE_PROFILING_SAMPLE_RATE=0)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def timings(self, response):
+        return dict(
+            metric.split(';', 1)
+            for metric in response['Server-Timing'].split(', ')
+        )
+
+    def test_disabled(self):
+        """Выключенный middleware не встаёт в цепочку"""
+        with override_settings(CORE_PROFILING=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+            response = self.client.get('/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_server_timing(self):
+        """Заголовок Server-Timing разбивает время по частям"""
+        response = self.client.get('/')
+        timings = self.timings(response)
+        self.assertEqual(
+            list(timings), ['sql', 'tpl', 'cache', 'thumb', 'total']
+        )
+        self.assertRegex(timings['sql'], r'dur=[\d.]+;desc="\d+ queries')
+        self.assertIn('misses', timings['cache'])
+
+    def test_cache_hits(self):
+        """Повторный показ страницы читает фрагменты из кеша"""
+        self.client.get('/')
+        timings = self.timings(self.client.get('/'))
+        self.assertNotIn('desc="0 hits', timings['cache'])
+
+    @override_settings(CORE_PROFILING_SAMPLE_RATE=1)
+    def test_sampled_log(self):
+        """Выбранный запрос пишется в лог одной строкой JSON"""
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['path'], record['status']), ('/', 200))
+        self.assertGreater(record['sql']['count'], 0)
+        self.assertIn('posts/index.html', record['templates']['by_name'])
+        self.assertIn(
+            'posts/includes/author_post.html', record['templates']['by_name']
+        )
+
+    @override_settings(CORE_PROFILING_SLOW_MS=0)
+    def test_slow_requests_logged(self):
+        """Медленные запросы пишутся в лог всегда"""
+        with self.assertLogs('core.profiling', 'INFO'):
+            self.client.get('/')
+
+    def test_repeated_queries(self):
+        """Одинаковые и похожие запросы находятся по SQL и параметрам"""
+        profile = Profile()
+        profile.queries = [
+            ('SELECT 1 WHERE id = %s', '(1,)', 0.001),
+            ('SELECT 1 WHERE id = %s', '(1,)', 0.001),
+            ('SELECT 1 WHERE id = %s', '(2,)', 0.001),
+            ('SELECT 2', '()', 0.001),
+        ]
+        duplicates, similar = profile.repeated()
+        self.assertEqual(duplicates, {('SELECT 1 WHERE id = %s', '(1,)'): 2})
+        self.assertEqual(similar, {'SELECT 1 WHERE id = %s': 3})
+
+
+@override_settings(
+    CORE_QUERY_BUDGETS={'posts:index': 5, 'posts:profile': 5},
+    CORE_QUERY_REPEAT_LIMIT=2,
+)
+class QueryBudgetTests(TestCase):
+    def test_budget(self):
+        """Страница укладывается в бюджет или нарушение описано"""
+        self.assertEqual(problems('posts:index', ['SELECT 1'] * 2), [])
+        self.assertEqual(
+            problems('posts:index', [f'SELECT {i}' for i in range(6)]),
+            ['posts:index: 6 запросов при бюджете 5'],
+        )
+
+    @override_settings(CORE_QUERY_BUDGET_EXCLUDE=[r'^SAVEPOINT '])
+    def test_excluded(self):
+        """Исключённые запросы не входят в бюджет"""
+        queries = ['SAVEPOINT "s1"'] * 2 + [f'SELECT {i}' for i in range(5)]
+        self.assertEqual(problems('posts:index', queries), [])
+
+    def test_missing_budget(self):
+        """Страница без бюджета в пространстве имён с бюджетами — ошибка"""
+        self.assertEqual(problems('posts:search', []), [
+            'posts:search: бюджет не задан в CORE_QUERY_BUDGETS'
+        ])
+        self.assertEqual(problems('about:tech', []), [])
+
+    def test_repeated_shape(self):
+        """Запрос одной формы в цикле находится и со списками IN"""
+        queries = [
+            'SELECT * FROM t WHERE id IN (%s)',
+            'SELECT * FROM t WHERE id IN (%s, %s)',
+            'SELECT * FROM t WHERE id IN (%s, %s, %s)',
+        ]
+        self.assertEqual(problems('about:tech', queries), [
+            'about:tech: 3 раз один запрос (N+1?): '
+            'SELECT * FROM t WHERE id IN (%s, …)'
+        ])
+
+    def test_client_fails_test(self):
+        """Тестовый клиент роняет тест при превышении бюджета"""
+        install()
+        with override_settings(
+            CORE_QUERY_BUDGETS={'posts:index': 0},
+            POSTS_PAGE_CACHE_TIMEOUT=0,
+        ):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'бюджете 0'):
+                self.client.get('/')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_and_run(self):
+        """Задача ждёт в таблице и выполняется воркером"""
+        remember.delay('значение')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(Task.objects.get().name, 'core.tests.remember')
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(CALLS, ['значение'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retries_with_backoff(self):
+        """Упавшая задача повторяется позже, потом помечается failed"""
+        explode.delay()
+        with self.assertLogs('core.tasks', 'WARNING'):
+            tasks.run_pending()
+        task = Task.objects.get()
+        self.assertEqual((task.status, task.attempts), (Task.QUEUED, 1))
+        self.assertIn('Не вышло', task.last_error)
+        self.assertGreater(
+            task.available_at,
+            timezone.now() + timedelta(seconds=tasks.RETRY_BACKOFF - 1),
+        )
+        self.assertEqual(tasks.run_pending(), 0)
+        Task.objects.update(available_at=timezone.now())
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_visibility_timeout(self):
+        """Задачу пропавшего воркера забирает другой"""
+        remember.delay(1)
+        claimed = tasks.claim()
+        self.assertEqual(claimed.status, Task.RUNNING)
+        self.assertIsNone(tasks.claim())
+        Task.objects.update(available_at=timezone.now())
+        self.assertEqual(tasks.claim().pk, claimed.pk)
+        Task.objects.update(available_at=timezone.now())
+        self.assertIsNone(tasks.claim())
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    @override_settings(CORE_TASKS_EAGER=True)
+    def test_eager(self):
+        """CORE_TASKS_EAGER не ставит задачу в очередь"""
+        self.assertIsNone(remember.delay(1))
+        self.assertFalse(Task.objects.exists())
+
+    def test_run_tasks_command(self):
+        """run_tasks --burst выполняет очередь и выходит"""
+        for value in range(3):
+            remember.delay(value)
+        out = StringIO()
+        call_command('run_tasks', workers=1, burst=True, stdout=out)
+        self.assertEqual(CALLS, [0, 1, 2])
+        self.assertIn('Выполнено задач: 3', out.getvalue())
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.TaskEmailBackend',
+        CORE_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_email_queued(self):
+        """Письмо уходит фоновой задачей"""
+        mail.send_mail('Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'])
+        self.assertEqual(mail.outbox, [])
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    """Соединения core.backends.sqlite3 с базой во временном файле"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+        database = sqlite3.connect(self.path)
+        database.execute('CREATE TABLE note (text TEXT)')
+        database.close()
+        self.aliases = []
+
+    def tearDown(self):
+        for alias in self.aliases:
+            if hasattr(connections._connections, alias):
+                connections[alias].close()
+                delattr(connections._connections, alias)
+            del connections.databases[alias]
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def connect(self, name=None, **options):
+        alias = f'sqlite_{len(self.aliases)}'
+        self.aliases.append(alias)
+        connections.databases[alias] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': name or self.path,
+            'OPTIONS': options,
+        }
+        return connections[alias]
+
+    def query(self, connection, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Включаются WAL и прагмы, OPTIONS их переопределяет"""
+        connection = self.connect()
+        self.assertEqual(
+            self.query(connection, 'PRAGMA journal_mode'), 'wal'
+        )
+        self.assertEqual(self.query(connection, 'PRAGMA synchronous'), 1)
+        self.assertEqual(
+            self.query(connection, 'PRAGMA cache_size'), -64 * 1024
+        )
+        full = self.connect(pragmas={'synchronous': 'FULL'})
+        self.assertEqual(self.query(full, 'PRAGMA synchronous'), 2)
+
+    def test_busy_retry(self):
+        """Запись вне транзакции дожидается чужой блокировки"""
+        connection = self.connect(timeout=0.01)
+        connection.ensure_connection()
+        holder = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        holder.execute('BEGIN IMMEDIATE')
+        with self.assertRaises(OperationalError):
+            with mock.patch.object(base, 'BUSY_RETRIES', 0):
+                connection.cursor().execute(
+                    'INSERT INTO note VALUES (%s)', ['без повтора']
+                )
+        release = threading.Timer(0.1, holder.commit)
+        release.start()
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO note VALUES (%s)', ['после'])
+        release.join()
+        holder.close()
+        self.assertEqual(
+            self.query(connection, 'SELECT text FROM note'), 'после'
+        )
+
+    def test_read_only(self):
+        """Реплика с mode=ro открывается и читает в транзакции"""
+        self.connect()
+        replica = self.connect(f'file:{self.path}?mode=ro')
+        with transaction.atomic(using=replica.alias):
+            self.assertEqual(
+                self.query(replica, 'SELECT count(*) FROM note'), 0
+            )
+
+
+REPLICAS = ['replica_0', 'replica_1']
+
+
+@override_settings(CORE_DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(TransactionTestCase):
+    """Реплики — копии тестовой базы в файлах SQLite"""
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Старый')
+        self.client.force_login(self.author)
+        self.paths = {}
+        for alias in REPLICAS:
+            self.paths[alias] = os.path.join(self.directory, alias)
+            connections.databases[alias] = {
+                'ENGINE': 'core.backends.sqlite3',
+                'NAME': f'file:{self.paths[alias]}?mode=ro',
+            }
+        self.replicate()
+
+    def tearDown(self):
+        for alias in REPLICAS:
+            connections[alias].close()
+            delattr(connections._connections, alias)
+            del connections.databases[alias]
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def replicate(self):
+        primary = connections['default']
+        primary.ensure_connection()
+        for path in self.paths.values():
+            replica = sqlite3.connect(path)
+            primary.connection.backup(replica)
+            replica.close()
+
+    def lag(self, text):
+        """Пост есть только в основной базе, изменение не недавнее"""
+        post = Post.objects.create(author=self.author, text=text)
+        old = time.time_ns() - 60 * 10 ** 9
+        for scope in fragments.post_scopes(post) + [fragments.SITE]:
+            cache.set(fragments.GENERATION_KEY.format(scope), old, None)
+        return post
+
+    def test_reads_from_replica(self):
+        """Страницы posts читаются с реплики, остальное — с основной"""
+        self.lag('Новый')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Старый')
+        self.assertNotContains(response, 'Новый')
+        self.assertIsNone(routers.ReplicaRouter().db_for_read(Post))
+
+    def test_writer_pinned_to_primary(self):
+        """После записи автор сразу видит свой пост"""
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свой'}
+        )
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.lag('Чужой')
+        self.assertContains(self.client.get(reverse('posts:index')), 'Свой')
+        middleware = routers.ReplicaMiddleware(lambda request: None)
+        request = RequestFactory().get('/')
+        request.COOKIES[routers.PIN_COOKIE] = str(int(time.time()) - 1)
+        self.assertFalse(middleware.pinned(request))
+
+    def test_recent_change_from_primary(self):
+        """Недавно изменившаяся страница не читается с реплики"""
+        Post.objects.create(author=self.author, text='Только что')
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Только что'
+        )
+
+    def test_missing_on_replica(self):
+        """Объект, которого ещё нет на реплике, ищется в основной базе"""
+        post = self.lag('Новый')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, 'Новый')
@@ -0,0 +1,69 @@
+"""Счётчики ссылок постов на файлы картинок.
+
+Одну картинку могут использовать несколько постов (см. posts.storage),
+поэтому файл удаляется вместе с миниатюрами, только когда на него
+не ссылается ни один пост.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .images import delete_variants
+from .models import ImageBlob, Post
+from .storage import is_content_name, post_images_storage
+
+
+def retain(name):
+    updated = ImageBlob.objects.filter(name=name).update(
+        refcount=F('refcount') + 1
+    )
+    if not updated:
+        blob, created = ImageBlob.objects.get_or_create(
+            name=name, defaults={'refcount': 1}
+        )
+        if not created:
+            retain(name)
+
+
+def release(name):
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1
+    )
+    if ImageBlob.objects.filter(name=name, refcount=0).exists():
+        transaction.on_commit(lambda: delete_files(name))
+
+
+def delete_files(name):
+    """Удаляет файл name, его миниатюры и варианты, если он не нужен."""
+    if not is_content_name(name):
+        return
+    with transaction.atomic():
+        # Пока транзакция фиксировалась, ту же картинку могли загрузить
+        # снова. Строка заблокирована до конца удаления: retain() из
+        # хранилища дождётся его, создаст строку заново и запишет файл.
+        # SQLite select_for_update() не поддерживает: там блокировку
+        # даёт BEGIN IMMEDIATE бэкенда core.backends.sqlite3, со
+        # стандартным бэкендом гонка вернётся.
+        blob = ImageBlob.objects.select_for_update().filter(
+            name=name
+        ).first()
+        if blob is None or blob.refcount:
+            return
+        blob.delete()
+        delete_thumbnails(ImageFile(name, post_images_storage))
+        delete_variants(name)
+
+
+def recount():
+    """Пересобирает счётчики по ссылкам из постов."""
+    counts = (
+        Post.objects.exclude(image='').order_by().values('image')
+        .annotate(total=Count('id')).values_list('image', 'total')
+    )
+    with transaction.atomic():
+        ImageBlob.objects.all().delete()
+        ImageBlob.objects.bulk_create(
+            [ImageBlob(name=name, refcount=total) for name, total in counts],
+            batch_size=1000,
+        )
@@ -0,0 +1,84 @@
+"""Условные GET для лент и страницы поста.
+
+Валидаторы строятся из поколений фрагментов (posts.fragments): они
+меняются при каждом изменении постов, комментариев, групп и подписок,
+которые видны на странице, и читаются одним обращением к кешу, без
+загрузки постов. ETag учитывает ещё и зрителя: его имя в шапке и
+CSRF-токен в формах. Совпали валидаторы — страница не рендерится,
+в ответ уходит 304.
+
+Анонимам отдаётся Cache-Control: public, их страницы может хранить
+и обратный прокси. Страницы пользователей — только private.
+
+Недавно изменившаяся страница читается из основной базы, а не с
+реплики (core.routers): её копия с отстающей реплики получила бы
+новый ETag и попала бы в кеши.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                quote_etag)
+from django.utils.http import http_date
+
+from core.routers import primary_if_recent
+
+from . import fragments
+
+
+def anonymous_max_age():
+    return getattr(settings, 'POSTS_ANONYMOUS_MAX_AGE', 0)
+
+
+class Validators:
+    """ETag и Last-Modified страницы, которая зависит от scopes."""
+
+    def __init__(self, request, *scopes):
+        self.request = request
+        self.generations = generations = fragments.generations(
+            fragments.SITE, *scopes
+        )
+        user = request.user
+        parts = [
+            *generations,
+            user.pk if user.is_authenticated else '',
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+        digest = hashlib.md5(
+            ':'.join(map(str, parts)).encode()
+        ).hexdigest()
+        # Слабый: токены CSRF в формах маскируются при каждом рендере.
+        self.etag = 'W/' + quote_etag(digest)
+        # Last-Modified точен до секунды: изменение в ту же секунду
+        # клиент с одним If-Modified-Since не заметил бы.
+        changed = max(generations)
+        self.recent = primary_if_recent(changed)
+        self.last_modified = None
+        if time.time_ns() - changed >= 10 ** 9:
+            self.last_modified = changed // 10 ** 9
+
+    def not_modified(self):
+        """Ответ 304 (или 412), если у клиента актуальная страница."""
+        response = get_conditional_response(
+            self.request, etag=self.etag, last_modified=self.last_modified
+        )
+        if response is not None:
+            self.apply(response)
+        return response
+
+    def apply(self, response):
+        """Добавляет валидаторы и Cache-Control к ответу страницы."""
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        if self.request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True, max_age=anonymous_max_age(),
+                must_revalidate=True,
+            )
+        return response
@@ -0,0 +1,123 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются одним UPDATE с F-выражением при создании и
+удалении строк, поэтому страницам не нужен COUNT(*). Так же ведётся
+сводка групп для каталога: число постов и дата последней
+активности. Если счётчики разошлись с данными, их пересчитывает
+команда repair_counters.
+"""
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, GroupStats, Post, User, UserCounters
+
+# SQLite вставляет пачку одним SELECT ... UNION ALL, а в нём не больше
+# 500 частей.
+BATCH_SIZE = 500
+
+
+def count_of(model, field):
+    """Подзапрос: число строк model, у которых field равен pk строки."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def bump_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя на deltas."""
+    # Счётчик не уходит ниже нуля, даже если успел разойтись с данными.
+    floor = {
+        field + '__gte': -delta for field, delta in deltas.items()
+        if delta < 0
+    }
+    updated = UserCounters.objects.filter(user_id=user_id, **floor).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if updated or min(deltas.values()) < 0:
+        # Без строки счётчиков уменьшать нечего: её создаст первое
+        # увеличение или repair_counters.
+        return
+    recount_users(User.objects.filter(pk=user_id))
+
+
+def bump_post(post_id, delta):
+    floor = {'comments_count__gte': -delta} if delta < 0 else {}
+    Post.objects.filter(pk=post_id, **floor).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def latest(moment):
+    """Выражение: last_activity, но не раньше moment."""
+    return Greatest(Coalesce('last_activity', Value(moment)), Value(moment))
+
+
+def bump_group(group_id, delta, moment=None):
+    """Сдвигает число постов группы; moment — дата новой активности."""
+    if not group_id:
+        return
+    floor = {'posts_count__gte': -delta} if delta < 0 else {}
+    changes = {'posts_count': F('posts_count') + delta}
+    if moment is not None:
+        changes['last_activity'] = latest(moment)
+    GroupStats.objects.filter(group_id=group_id, **floor).update(**changes)
+
+
+def touch_group(post_id, moment):
+    """Отмечает активность в группе поста, если он в группе."""
+    GroupStats.objects.filter(group__posts=post_id).update(
+        last_activity=latest(moment)
+    )
+
+
+def recount_users(users):
+    """Пересчитывает счётчики пользователей users."""
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in
+         users.values_list('pk', flat=True).iterator()],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    UserCounters.objects.filter(user__in=users).update(
+        posts_count=count_of(Post, 'author'),
+        followers_count=count_of(Follow, 'author'),
+        following_count=count_of(Follow, 'user'),
+    )
+
+
+def recount_posts(posts):
+    posts.update(comments_count=count_of(Comment, 'post'))
+
+
+def recount_groups(groups):
+    """Пересчитывает сводку групп groups."""
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in
+         groups.values_list('pk', flat=True).iterator()],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    last_post = Subquery(
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by('-pub_date').values('pub_date')[:1]
+    )
+    last_comment = Subquery(
+        Comment.objects.filter(post__group=OuterRef('pk'))
+        .order_by().values('post__group').annotate(last=Max('pub_date'))
+        .values('last')
+    )
+    GroupStats.objects.filter(group__in=groups).update(
+        posts_count=count_of(Post, 'group'),
+        last_activity=Greatest(
+            Coalesce(last_post, last_comment),
+            Coalesce(last_comment, last_post),
+        ),
+    )
+
+
+def recount_all():
+    """Пересчитывает все счётчики."""
+    recount_users(User.objects.all())
+    recount_posts(Post.objects.all())
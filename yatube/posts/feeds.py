@@ -0,0 +1,162 @@
+from django.core.cache import caches
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import Http404
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from .models import Comment, Follow, GroupStats, Post
+from .paginators import InvalidCursor, KeysetPaginator
+
+NUM_POSTS = 10
+NUM_COMMENTS = 20
+NUM_GROUPS = 50
+# Порядок комментариев поста: ?order=old — от старых к новым.
+NEWEST = 'new'
+OLDEST = 'old'
+# Порядок лент: ?sort=popular — по рейтингу (posts.ranking).
+RECENT = 'recent'
+POPULAR = 'popular'
+# Глубже этой страницы ?page=N не обслуживается: только курсоры.
+MAX_OFFSET_PAGE = 20
+# Должны совпадать с параметрами тега thumbnail в image_post.html.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+FEED_RELATED = ('author', 'group')
+
+
+def feed_queryset(queryset):
+    """Подтягивает автора и группу поста одним JOIN."""
+    return queryset.select_related(*FEED_RELATED)
+
+
+def follow_feed(user):
+    """Посты авторов, на которых подписан user.
+
+    Подписки читаются по индексу (user, author), посты каждого
+    автора — по индексу (author, pub_date, id): запрос стоит столько,
+    сколько постов у авторов из подписок, а не во всей таблице.
+    Читателю без подписок или с подписками на тихих авторов не
+    приходится обходить все посты сайта.
+    """
+    return Post.objects.filter(
+        author__in=Follow.objects.filter(user=user).values('author')
+    )
+
+
+def thumbnail_key(image):
+    """Ключ sorl для миниатюры, которую построит тег thumbnail."""
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(THUMBNAIL_OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(
+        source, THUMBNAIL_GEOMETRY, options
+    )
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def prefetch_thumbnails(posts):
+    """Загружает метаданные миниатюр страницы одним запросом.
+
+    Тег thumbnail ищет каждую миниатюру сначала в кеше, потом в БД.
+    Недостающие в кеше записи достаём разом (отсутствующие помечаем
+    пустыми, как это делает sorl), и шаблон обходится без запроса
+    на каждый пост. Посты с готовым thumbnail_url пропускаем.
+    """
+    kv_cache = caches[sorl_settings.THUMBNAIL_CACHE]
+    keys = {
+        thumbnail_key(post.image) for post in posts
+        if post.image and not post.thumbnail_url
+    }
+    if not keys:
+        return
+    missing = keys - set(kv_cache.get_many(keys))
+    if not missing:
+        return
+    found = dict.fromkeys(missing, EMPTY_VALUE)
+    found.update(
+        KVStore.objects.filter(key__in=missing).values_list('key', 'value')
+    )
+    kv_cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+
+def paginator_post(request, post_list, **kwargs):
+    paginator = KeysetPaginator(
+        post_list, NUM_POSTS, max_offset_page=MAX_OFFSET_PAGE, **kwargs
+    )
+    cursor = request.GET.get('cursor')
+    try:
+        if cursor:
+            return paginator.cursor_page(cursor)
+        return paginator.offset_page(request.GET.get('page', 1))
+    except (InvalidCursor, PageNotAnInteger):
+        return paginator.offset_page(1)
+    except EmptyPage:
+        raise Http404
+
+
+def load_feed(request, post_list):
+    """Страница ленты за фиксированное число запросов."""
+    page_obj = paginator_post(request, feed_queryset(post_list))
+    page_obj.object_list = list(page_obj.object_list)
+    prefetch_thumbnails(page_obj.object_list)
+    return page_obj
+
+
+def feed_sort(request):
+    return POPULAR if request.GET.get('sort') == POPULAR else RECENT
+
+
+def comments_order(request):
+    return OLDEST if request.GET.get('order') == OLDEST else NEWEST
+
+
+def load_comments(request, post_id):
+    """Страница комментариев поста с авторами одним запросом.
+
+    Листается курсором ?cursor= в порядке comments_order(); у страницы
+    есть атрибут order для ссылки на следующую.
+    """
+    order = comments_order(request)
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        NUM_COMMENTS, descending=order == NEWEST,
+    )
+    cursor = request.GET.get('cursor')
+    try:
+        page = (
+            paginator.cursor_page(cursor) if cursor
+            else paginator.offset_page(1)
+        )
+    except InvalidCursor:
+        page = paginator.offset_page(1)
+    page.object_list = list(page.object_list)
+    page.order = order
+    return page
+
+
+def load_groups(request):
+    """Страница каталога групп: самые активные первыми.
+
+    Число постов и последняя активность берутся из сводки GroupStats
+    (posts.counters), порядок — из её индекса.
+    """
+    paginator = Paginator(
+        GroupStats.objects.select_related('group').order_by(
+            '-last_activity', '-group_id'
+        ),
+        NUM_GROUPS,
+    )
+    return paginator.get_page(request.GET.get('page'))
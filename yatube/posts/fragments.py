@@ -0,0 +1,103 @@
+"""Кеш фрагментов лент с поколениями.
+
+Ключ фрагмента состоит из поколений и страницы (номер или курсор).
+При сохранении и удалении поста затронутые ленты получают новые
+поколения, старые фрагменты перестают находиться и доживают своё
+в кеше. Поэтому время жизни можно держать большим: устаревшая
+страница не будет показана.
+
+Поколение — время изменения в наносекундах, поэтому по нему же
+строятся валидаторы условных GET (см. posts.conditional).
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+
+GENERATION_KEY = 'posts:generation:{}'
+# Поколение всех лент: меняется вместе с тем, что видно в любой из них
+# (название группы, имя автора).
+SITE = 'site'
+INDEX = 'index'
+# Порядок популярных лент; меняется при пересчёте рейтинга.
+RANKING = 'ranking'
+# Каталог групп: меняется с постами и комментариями любой группы.
+GROUPS = 'groups'
+
+FeedCache = namedtuple('FeedCache', ('key', 'timeout'))
+
+
+def feed_cache_timeout():
+    return getattr(settings, 'POSTS_FEED_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def counters_scope(user_id):
+    """Счётчики подписок пользователя и подписки на него."""
+    return f'counters:{user_id}'
+
+
+def post_scopes(post):
+    """Ленты и страница, в которых показан пост."""
+    scopes = [INDEX, author_scope(post.author_id), post_scope(post.pk)]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def bump_post(post_id):
+    """Сбрасывает ленты поста, если он ещё существует."""
+    post = Post.objects.filter(pk=post_id).only('author', 'group').first()
+    if post is not None:
+        bump(*post_scopes(post))
+
+
+def new_generation():
+    # После вытеснения из кеша поколение не должно повториться,
+    # иначе снова найдутся старые фрагменты.
+    return time.time_ns()
+
+
+def generations(*scopes):
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: new_generation() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+    return [found.get(key) or missing[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает недействительными фрагменты лент scopes."""
+    generation = new_generation()
+    cache.set_many({
+        GENERATION_KEY.format(scope): generation for scope in scopes
+    }, None)
+
+
+def feed_scopes(scope, popular=False):
+    """Поколения ленты scope; популярная зависит ещё и от рейтинга."""
+    return (scope, RANKING) if popular else (scope,)
+
+
+def feed_cache(request, page_obj, *scopes):
+    """Ключ и время жизни фрагмента страницы ленты из scopes."""
+    page = page_obj.number or request.GET.get('cursor')
+    generation = '.'.join(map(str, generations(SITE, *scopes)))
+    return FeedCache(
+        f'{"+".join(scopes)}:{generation}:{page}', feed_cache_timeout()
+    )
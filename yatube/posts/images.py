@@ -0,0 +1,100 @@
+"""Адаптивные варианты картинок постов.
+
+Из картинки строятся кадры нескольких ширин с пропорциями миниатюры
+960x339 в современных форматах (AVIF, если его умеет Pillow, и WebP),
+а также в JPEG для браузеров без их поддержки. Шаблон собирает из них
+<picture> с srcset, и браузер сам выбирает подходящий файл.
+"""
+import hashlib
+import json
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .feeds import THUMBNAIL_GEOMETRY
+
+THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT = map(int, THUMBNAIL_GEOMETRY.split('x'))
+VARIANT_WIDTHS = (480, 720, 960)
+# Формат Pillow, MIME-тип, расширение и качество; порядок — порядок
+# <source> в разметке, от самого экономного формата.
+FORMATS = (
+    ('AVIF', 'image/avif', 'avif', 60),
+    ('WEBP', 'image/webp', 'webp', 80),
+    ('JPEG', 'image/jpeg', 'jpg', 85),
+)
+FALLBACK_TYPE = 'image/jpeg'
+VARIANTS_DIR = 'cache/variants'
+
+
+def supported_formats():
+    """Форматы из FORMATS, которые умеет записывать Pillow."""
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[0] in Image.SAVE]
+
+
+def variant_height(width):
+    return round(width * THUMBNAIL_HEIGHT / THUMBNAIL_WIDTH)
+
+
+def crop(image, width):
+    """Кадр по центру, как у тега thumbnail с crop="center"."""
+    return ImageOps.fit(
+        image, (width, variant_height(width)), Image.LANCZOS
+    )
+
+
+def encode(image, pil_format, quality):
+    if pil_format == 'JPEG':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, pil_format, quality=quality)
+    return buffer.getvalue()
+
+
+def variants_directory(source_name):
+    digest = hashlib.sha1(source_name.encode()).hexdigest()
+    return f'{VARIANTS_DIR}/{digest[:2]}/{digest}'
+
+
+def variant_name(source_name, width, extension):
+    return f'{variants_directory(source_name)}/{width}.{extension}'
+
+
+def delete_variants(source_name):
+    directory = variants_directory(source_name)
+    if not default_storage.exists(directory):
+        return
+    for name in default_storage.listdir(directory)[1]:
+        default_storage.delete(f'{directory}/{name}')
+
+
+def save(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    name = default_storage.save(name, ContentFile(content))
+    return default_storage.url(name)
+
+
+def build_variants(image_field):
+    """Строит и сохраняет варианты; возвращает их описание для Post."""
+    with image_field.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    frames = {width: crop(image, width) for width in VARIANT_WIDTHS}
+    picture = {'sources': [], 'srcset': ''}
+    for pil_format, mime_type, extension, quality in supported_formats():
+        srcset = ', '.join(
+            '{} {}w'.format(save(
+                variant_name(image_field.name, width, extension),
+                encode(frame, pil_format, quality),
+            ), width)
+            for width, frame in frames.items()
+        )
+        if mime_type == FALLBACK_TYPE:
+            picture['srcset'] = srcset
+        else:
+            picture['sources'].append({'type': mime_type, 'srcset': srcset})
+    return json.dumps(picture)
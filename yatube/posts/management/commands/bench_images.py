@@ -0,0 +1,122 @@
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageOps
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts.images import (THUMBNAIL_WIDTH, VARIANT_WIDTHS, crop, encode,
+                          supported_formats)
+from posts.models import Post
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает размер и время кодирования вариантов картинок '
+        'с нынешней миниатюрой JPEG 960x339.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='Файлы или каталоги с картинками; по умолчанию '
+                 'берутся картинки постов.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=50,
+            help='Сколько картинок взять в выборку.',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результаты в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        images = list(self.sample(options['paths'], options['limit']))
+        if not images:
+            raise CommandError('Нет картинок для замера.')
+        results = self.measure(images)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f'Картинок: {len(images)}. Базовая миниатюра: '
+            f'{results["baseline_bytes"]} байт в среднем.'
+        )
+        self.stdout.write(
+            f'{"формат":<8}{"ширина":>8}{"байт":>10}'
+            f'{"экономия":>10}{"мс":>8}'
+        )
+        for row in results['variants']:
+            self.stdout.write(
+                f'{row["format"]:<8}{row["width"]:>8}{row["bytes"]:>10}'
+                f'{row["saved"]:>9.0%}{row["encode_ms"]:>8.1f}'
+            )
+
+    def sample(self, paths, limit):
+        """Открытые картинки выборки, не больше limit."""
+        files = []
+        for path in map(Path, paths):
+            if path.is_dir():
+                files.extend(sorted(
+                    item for item in path.rglob('*')
+                    if item.suffix.lower() in IMAGE_SUFFIXES
+                ))
+            else:
+                files.append(path)
+        if not paths:
+            files = (
+                post.image for post in
+                Post.objects.exclude(image='').only('image')[:limit]
+            )
+        for count, file in enumerate(files):
+            if count >= limit:
+                return
+            try:
+                with (open(file, 'rb') if isinstance(file, Path)
+                      else file.open('rb')) as source:
+                    image = ImageOps.exif_transpose(Image.open(source))
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Пропущен {file}: {error}')
+                continue
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            yield image
+
+    def measure(self, images):
+        baseline = sum(
+            len(encode(
+                crop(image, THUMBNAIL_WIDTH), 'JPEG',
+                sorl_settings.THUMBNAIL_QUALITY,
+            ))
+            for image in images
+        ) / len(images)
+        totals = defaultdict(lambda: [0, 0.0])
+        for image in images:
+            for width in VARIANT_WIDTHS:
+                frame = crop(image, width)
+                for pil_format, _, _, quality in supported_formats():
+                    started = time.perf_counter()
+                    size = len(encode(frame, pil_format, quality))
+                    total = totals[pil_format, width]
+                    total[0] += size
+                    total[1] += time.perf_counter() - started
+        variants = []
+        for (pil_format, width), (size, seconds) in totals.items():
+            size /= len(images)
+            variants.append({
+                'format': pil_format,
+                'width': width,
+                'bytes': round(size),
+                'saved': 1 - size / baseline,
+                'encode_ms': seconds / len(images) * 1000,
+            })
+        return {
+            'images': len(images),
+            'baseline_bytes': round(baseline),
+            'variants': variants,
+        }
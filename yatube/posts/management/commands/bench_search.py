@@ -0,0 +1,159 @@
+import itertools
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.search import FTS_SCHEMA, match_expression
+
+SYLLABLES = (
+    'ба', 'ве', 'го', 'да', 'же', 'зи', 'ка', 'ло', 'ми', 'но',
+    'па', 'ре', 'са', 'ту', 'фи', 'ха', 'це', 'чу', 'ша', 'ю',
+)
+BATCH_SIZE = 10_000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск LIKE со сканированием и индекс FTS5 на '
+        'синтетических постах в отдельной базе SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=1_000_000,
+            help='Сколько постов сгенерировать.',
+        )
+        parser.add_argument(
+            '--words', type=int, default=30,
+            help='Слов в посте.',
+        )
+        parser.add_argument(
+            '--vocabulary', type=int, default=20_000,
+            help='Размер словаря; частоты слов распределены по Ципфу.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз повторить каждый запрос.',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результаты в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = self.vocabulary(rng, options['vocabulary'])
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'bench.sqlite3')
+        try:
+            with sqlite3.connect(path) as db:
+                results = self.measure(db, rng, vocabulary, options)
+            results['bytes'] = os.path.getsize(path)
+        finally:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f'Постов: {results["posts"]}. Запись: '
+            f'{results["insert_seconds"]:.1f} с, построение индекса: '
+            f'{results["index_seconds"]:.1f} с, размер базы: '
+            f'{results["bytes"]} байт (индекс {results["index_bytes"]}).'
+        )
+        self.stdout.write(
+            f'{"слово":<14}{"совпадений":>12}{"LIKE, мс":>12}{"FTS5, мс":>12}'
+        )
+        for row in results['queries']:
+            self.stdout.write(
+                f'{row["term"]:<14}{row["matches"]:>12}'
+                f'{row["like_ms"]:>12.2f}{row["fts_ms"]:>12.2f}'
+            )
+
+    def vocabulary(self, rng, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 5))))
+        return sorted(words)
+
+    def measure(self, db, rng, vocabulary, options):
+        total, words = options['posts'], options['words']
+        # Частота слова обратно пропорциональна его номеру.
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)
+        ))
+        db.execute('CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)')
+        started = time.perf_counter()
+        for start in range(0, total, BATCH_SIZE):
+            db.executemany('INSERT INTO post (text) VALUES (?)', (
+                (' '.join(rng.choices(vocabulary, cum_weights=weights,
+                                      k=words)),)
+                for _ in range(min(BATCH_SIZE, total - start))
+            ))
+        db.commit()
+        insert_seconds = time.perf_counter() - started
+        pages = db.execute('PRAGMA page_count').fetchone()[0]
+
+        started = time.perf_counter()
+        db.execute(f'CREATE VIRTUAL TABLE search USING fts5({FTS_SCHEMA})')
+        db.execute(
+            'INSERT INTO search (rowid, body, post_id, comment_id) '
+            'SELECT id * 2, text, id, NULL FROM post'
+        )
+        db.commit()
+        index_seconds = time.perf_counter() - started
+        page_size = db.execute('PRAGMA page_size').fetchone()[0]
+        index_pages = db.execute('PRAGMA page_count').fetchone()[0] - pages
+
+        queries = []
+        # Частое, среднее и редкое слово словаря.
+        for term in (vocabulary_term(vocabulary, share)
+                     for share in (0, 0.01, 0.5)):
+            like = self.timed(options['repeat'], lambda: db.execute(
+                'SELECT id FROM post WHERE text LIKE ? '
+                'ORDER BY id DESC LIMIT 10', [f'%{term}%']
+            ).fetchall())
+            fts = self.timed(options['repeat'], lambda: db.execute(
+                "SELECT rowid, snippet(search, 0, '', '', '…', 16) "
+                'FROM search WHERE search MATCH ? '
+                'ORDER BY rank, rowid LIMIT 10',
+                [match_expression([term])],
+            ).fetchall())
+            matches = db.execute(
+                'SELECT count(*) FROM search WHERE search MATCH ?',
+                [match_expression([term])],
+            ).fetchone()[0]
+            queries.append({
+                'term': term,
+                'matches': matches,
+                'like_ms': like,
+                'fts_ms': fts,
+            })
+        return {
+            'posts': total,
+            'insert_seconds': insert_seconds,
+            'index_seconds': index_seconds,
+            'index_bytes': index_pages * page_size,
+            'queries': queries,
+        }
+
+    def timed(self, repeat, query):
+        """Медиана времени запроса в миллисекундах."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+
+def vocabulary_term(vocabulary, share):
+    return vocabulary[int((len(vocabulary) - 1) * share)]
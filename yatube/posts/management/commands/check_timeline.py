@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import timeline
+from posts.feeds import follow_feed
+from posts.models import Follow, PulledAuthor, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает готовые ленты подписок с выборкой из подписок '
+        'и при необходимости пересобирает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Проверить только этих пользователей.',
+        )
+        parser.add_argument(
+            '--repair', action='store_true',
+            help='Пересобрать расходящиеся ленты.',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(
+            id__in=Follow.objects.values('user')
+        ).order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        length = timeline.timeline_length()
+        broken = 0
+        for user in users.iterator():
+            if timeline.reads_on_demand(user):
+                continue
+            stored = list(
+                TimelineEntry.objects.filter(user=user)
+                .order_by('-pub_date', '-post_id')
+                .values_list('post_id', flat=True)[:length]
+            )
+            # Хвост ленты может быть обрезан: недостающие страницы
+            # читаются из подписок, поэтому сравниваем только начало.
+            live = list(
+                follow_feed(user).order_by('-pub_date', '-id')
+                .values_list('id', flat=True)[:len(stored)]
+            )
+            if stored == live:
+                continue
+            broken += 1
+            missing = len(set(live) - set(stored))
+            extra = len(set(stored) - set(live))
+            self.stdout.write(
+                f'{user.username}: не хватает {missing}, лишних {extra}'
+            )
+            if options['repair']:
+                timeline.rebuild(user)
+        pulled = PulledAuthor.objects.count()
+        summary = (
+            f'Расходящихся лент: {broken}. '
+            f'Авторов, читаемых при показе: {pulled}.'
+        )
+        if broken and not options['repair']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
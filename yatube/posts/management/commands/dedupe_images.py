@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from posts import blobs, fragments
+from posts.images import delete_variants
+from posts.models import Post
+from posts.storage import file_digest, is_content_name, post_images_storage
+
+UPLOAD_DIRECTORY = 'posts'
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки из media/posts/ в хранилище по содержимому: '
+        'одинаковые файлы остаются в одном экземпляре.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, сколько места освободится.',
+        )
+
+    def handle(self, *args, **options):
+        storage = post_images_storage
+        root = Path(storage.path(UPLOAD_DIRECTORY))
+        names = sorted(
+            path.relative_to(root.parent).as_posix()
+            for path in root.rglob('*') if path.is_file()
+        ) if root.is_dir() else []
+        # Недописанные загрузки хранилища тоже не трогаем.
+        names = [
+            name for name in names
+            if not is_content_name(name) and not name.endswith('.upload')
+        ]
+        stored = set()
+        duplicates = freed = 0
+        for old_name in names:
+            path = storage.path(old_name)
+            with open(path, 'rb') as source:
+                new_name = storage.content_name(
+                    UPLOAD_DIRECTORY,
+                    file_digest(source),
+                    os.path.splitext(old_name)[1].lower(),
+                )
+            if new_name in stored or storage.exists(new_name):
+                duplicates += 1
+                freed += os.path.getsize(path)
+            stored.add(new_name)
+            if not options['dry_run']:
+                self.move(old_name, new_name)
+        if not options['dry_run']:
+            blobs.recount()
+            # Кешированные ленты ссылаются на удалённые миниатюры.
+            fragments.bump(fragments.SITE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {len(names)}, повторов: {duplicates}, '
+            f'освобождается байт: {freed}.'
+        ))
+        if names and not options['dry_run']:
+            self.stdout.write(
+                'Миниатюры перенесённых картинок построит warm_thumbnails.'
+            )
+
+    def move(self, old_name, new_name):
+        """Переносит файл под имя по содержимому вместе с постами."""
+        storage = post_images_storage
+        old_path, new_path = storage.path(old_name), storage.path(new_name)
+        if os.path.exists(new_path):
+            os.remove(old_path)
+        else:
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(old_path, new_path)
+        with transaction.atomic():
+            # Миниатюры и варианты строились от старого имени.
+            Post.objects.filter(image=old_name).update(
+                image=new_name, thumbnail_url='', image_variants=''
+            )
+        delete_thumbnails(ImageFile(old_name, storage), delete_file=False)
+        delete_variants(old_name)
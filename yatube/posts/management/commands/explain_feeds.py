@@ -0,0 +1,138 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.feeds import (NEWEST, NUM_POSTS, OLDEST, feed_queryset,
+                         follow_feed, load_comments)
+from posts.models import (Comment, Follow, Group, Post, PostRank,
+                          TimelineEntry, User)
+from posts.paginators import (BACKWARD, FORWARD, KeysetPaginator,
+                              encode_cursor)
+from posts.ranking import RANK_KEYS
+from posts.timeline import TIMELINE_KEYS
+
+# Признак сортировки вне индекса в выводе EXPLAIN QUERY PLAN.
+EXTRA_SORT = 'USE TEMP B-TREE'
+# Ленты, которым сортировка нужна по построению: посты авторов из
+# подписок читаются по индексу каждого автора и сливаются по дате.
+# Сортируются только эти посты, а не вся таблица.
+SORTED_FEEDS = ('follow_index',)
+
+
+class Command(BaseCommand):
+    help = 'Печатает план выполнения каждого запроса лент постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если запросу нужна сортировка.',
+        )
+
+    def handle(self, *args, **options):
+        problems = []
+        for title, sql, params in self.feed_queries():
+            plan = self.explain(sql, params)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {title}'))
+            self.stdout.write(sql % tuple(repr(p) for p in params))
+            for line in plan:
+                self.stdout.write(f'  {line}')
+            feed = title.rsplit(': ', 1)[0]
+            if (any(EXTRA_SORT in line for line in plan)
+                    and feed not in SORTED_FEEDS):
+                problems.append(title)
+        if not problems:
+            self.stdout.write(self.style.SUCCESS(
+                'Ни одному запросу лент не нужна отдельная сортировка.'
+            ))
+            return
+        message = 'Сортировка вне индекса: ' + ', '.join(problems)
+        if options['strict']:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message))
+
+    def explain(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+
+    def capture(self, func):
+        """SQL-запросы, которые выполняет func, без их результатов."""
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            queries.append((sql, tuple(params or ())))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            func()
+        return queries
+
+    def feed_queries(self):
+        user = User.objects.first() or User(id=1, username='')
+        group = Group.objects.first() or Group(id=1)
+        post = Post.objects.first() or Post(id=1)
+        now = timezone.now()
+        timeline = TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+        ranks = PostRank.objects.select_related(
+            'post__author', 'post__group'
+        )
+        feeds = (
+            ('index', feed_queryset(Post.objects.all()), None),
+            ('group_posts', feed_queryset(group.posts.all()), None),
+            ('profile', feed_queryset(user.posts.all()), None),
+            ('follow_index', feed_queryset(follow_feed(user)), None),
+            ('follow_index: готовая лента', timeline, TIMELINE_KEYS),
+            ('index: популярные', ranks, RANK_KEYS),
+            ('group_posts: популярные', ranks.filter(group=group), RANK_KEYS),
+        )
+        for name, queryset, keys in feeds:
+            # Рейтинг листается по числу, остальные ленты — по дате.
+            position = 0.0 if keys == RANK_KEYS else now
+            paginator = KeysetPaginator(
+                queryset, NUM_POSTS, keys=keys or ('pub_date', 'id'),
+                key_type=type(position),
+            )
+            pages = (
+                ('первая страница', lambda: paginator.offset_page(1)),
+                ('следующая страница', lambda: paginator.cursor_page(
+                    encode_cursor(FORWARD, position, post.id)
+                )),
+                ('предыдущая страница', lambda: paginator.cursor_page(
+                    encode_cursor(BACKWARD, position, post.id)
+                )),
+            )
+            for page, load in pages:
+                for sql, params in self.capture(load):
+                    yield f'{name}: {page}', sql, params
+        # Комментарии читаются так же, как их читает страница поста.
+        comment_id = Comment.objects.values_list('id', flat=True).first()
+        for order in (NEWEST, OLDEST):
+            pages = (
+                ('первая страница', {}),
+                ('следующая страница', {'cursor': encode_cursor(
+                    FORWARD, now, comment_id or 1
+                )}),
+                ('предыдущая страница', {'cursor': encode_cursor(
+                    BACKWARD, now, comment_id or 1
+                )}),
+            )
+            for page, params in pages:
+                request = RequestFactory().get('/', {'order': order, **params})
+                queries = self.capture(
+                    lambda: load_comments(request, post.id)
+                )
+                for sql, sql_params in queries:
+                    yield (
+                        f'post_detail: комментарии {order}, {page}',
+                        sql, sql_params,
+                    )
+        for sql, params in self.capture(
+            lambda: Follow.objects.filter(user=user, author=user).exists()
+        ):
+            yield 'profile: подписка', sql, params
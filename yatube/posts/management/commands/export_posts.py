@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии или подписки в NDJSON или CSV '
+        'для import_posts, не загружая их в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', choices=tuple(transfer.KINDS), required=True,
+            help='Что выгрузить.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, dest='file_format',
+            help='Формат; по умолчанию по расширению --output или NDJSON.',
+        )
+        parser.add_argument(
+            '--output', help='Куда писать; по умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        output, kind = options['output'], options['kind']
+        file_format = options['file_format'] or transfer.guess_format(
+            output or ''
+        )
+        started = reported = time.monotonic()
+
+        def progress(total):
+            nonlocal reported
+            if time.monotonic() - reported >= 1:
+                reported = time.monotonic()
+                self.progress(kind, total, started)
+
+        try:
+            if output is None:
+                total = transfer.export(
+                    kind, self.stdout, file_format, progress=progress
+                )
+            else:
+                with open(output, 'w', encoding='utf-8', newline='') as file:
+                    total = transfer.export(
+                        kind, file, file_format, progress=progress
+                    )
+        except OSError as error:
+            raise CommandError(error)
+        self.progress(kind, total, started)
+
+    def progress(self, kind, count, started):
+        seconds = time.monotonic() - started
+        rate = count / seconds if seconds else 0
+        self.stderr.write(f'{kind}: {count} записей, {rate:.0f} в секунду')
@@ -0,0 +1,98 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из NDJSON или CSV '
+        'пачками через bulk_create. Прерванную загрузку можно '
+        'продолжить: сохранённые записи отмечаются в контрольной точке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями; - — stdin.')
+        parser.add_argument(
+            '--kind', choices=tuple(transfer.KINDS), required=True,
+            help='Что в файле.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, dest='file_format',
+            help='Формат файла; по умолчанию по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE,
+            help='Записей в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию рядом с файлом '
+                 'записей, для stdin — без неё.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать с первой записи, не глядя на контрольную точку.',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты: например, '
+                 'если следом загружается ещё один файл.',
+        )
+
+    def handle(self, *args, **options):
+        path, kind = options['path'], options['kind']
+        if options['batch_size'] < 1:
+            raise CommandError('Пачка должна быть хотя бы из одной записи.')
+        file_format = options['file_format'] or transfer.guess_format(path)
+        checkpoint = options['checkpoint']
+        if checkpoint is None and path != '-':
+            checkpoint = f'{path}.checkpoint'
+        try:
+            skip = 0
+            if checkpoint and not options['restart']:
+                skip = transfer.load_checkpoint(checkpoint, kind)
+            importer = transfer.Importer(kind)
+            arguments = (
+                importer, file_format, skip, options['batch_size'],
+                checkpoint,
+            )
+            if path == '-':
+                done = self.load(sys.stdin, *arguments)
+            else:
+                with open(path, encoding='utf-8', newline='') as file:
+                    done = self.load(file, *arguments)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        finally:
+            transfer.reset_sequences(kind)
+        if not options['skip_rebuild']:
+            transfer.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей {kind}: {done - skip}, пропущено: '
+            f'{importer.skipped}, всего в файле: {done}.'
+        ))
+
+    def load(self, file, importer, file_format, skip, batch_size,
+             checkpoint):
+        records = transfer.read(file, file_format)
+        started = reported = time.monotonic()
+        done = skip
+        with transfer.keep_dates():
+            for batch in transfer.batches(records, batch_size, skip):
+                importer.save(batch)
+                done += len(batch)
+                if checkpoint:
+                    transfer.save_checkpoint(checkpoint, importer.kind, done)
+                if time.monotonic() - reported >= 1:
+                    reported = time.monotonic()
+                    self.progress(importer.kind, done - skip, started)
+        self.progress(importer.kind, done - skip, started)
+        return done
+
+    def progress(self, kind, count, started):
+        seconds = time.monotonic() - started
+        rate = count / seconds if seconds else 0
+        self.stderr.write(f'{kind}: {count} записей, {rate:.0f} в секунду')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг популярной ленты: охват авторов, '
+        'удалённые комментарии, посты вне окна. Запускается по '
+        'расписанию, например из cron раз в несколько минут.'
+    )
+
+    def handle(self, *args, **options):
+        ranked = ranking.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'В рейтинге постов: {ranked}.'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает поисковый индекс постов и комментариев, например '
+        'после bulk_create или правки базы в обход моделей.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_all, recount_groups
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов, комментариев и подписок '
+        'и сводку групп.'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_all()
+            recount_groups(Group.objects.all())
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -0,0 +1,56 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import warm
+
+
+def init_worker():
+    # При запуске процессов через spawn Django нужно настроить заново.
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры картинок постов в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Число процессов; 1 — строить в текущем процессе.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Сколько постов отдавать процессу за раз.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить и уже готовые миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail_url='')
+        post_ids = list(posts.order_by('id').values_list('id', flat=True))
+        size = options['batch_size']
+        batches = [
+            post_ids[start:start + size]
+            for start in range(0, len(post_ids), size)
+        ]
+        if options['processes'] <= 1:
+            built = sum(map(warm, batches))
+        else:
+            # Открытые соединения с БД не должны достаться дочерним
+            # процессам.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                options['processes'], initializer=init_worker
+            ) as pool:
+                built = sum(pool.map(warm, batches))
+        self.stdout.write(self.style.SUCCESS(
+            f'Построено миниатюр: {built} из {len(post_ids)}.'
+        ))
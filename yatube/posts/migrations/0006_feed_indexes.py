@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:00
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+def remove_invalid_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Follow.objects.filter(user=models.F('author')).delete()
+    seen = set()
+    duplicates = []
+    rows = Follow.objects.order_by('id').values_list(
+        'id', 'user_id', 'author_id'
+    )
+    for pk, user_id, author_id in rows.iterator():
+        if (user_id, author_id) in seen:
+            duplicates.append(pk)
+        seen.add((user_id, author_id))
+    Follow.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_auto_20221005_1640'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'pub_date'], name='comment_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pub_date', 'id'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date', 'id'], name='post_group_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date', 'id'], name='post_author_date_idx'),
+        ),
+        migrations.RunPython(
+            remove_invalid_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='no_self_follow'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:19
+
+from django.db import migrations, models
+import posts.storage
+
+
+def fill_blobs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    counts = (
+        Post.objects.exclude(image='').order_by().values('image')
+        .annotate(total=models.Count('id')).values_list('image', 'total')
+    )
+    ImageBlob.objects.bulk_create(
+        [ImageBlob(name=name, refcount=total) for name, total in counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_blobs, migrations.RunPython.noop),
+    ]
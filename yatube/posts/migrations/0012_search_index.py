@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    posts = apps.get_model('posts', 'Post')._meta.db_table
+    comments = apps.get_model('posts', 'Comment')._meta.db_table
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+        'body, post_id UNINDEXED, comment_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute('DELETE FROM posts_search')
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, body, post_id, comment_id) '
+        f'SELECT id * 2, text, id, NULL FROM {posts}'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, body, post_id, comment_id) '
+        f'SELECT id * 2 + 1, text, post_id, id FROM {comments}'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_image_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:23
+
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def fill_ranking(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    PostRank = apps.get_model('posts', 'PostRank')
+    epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    half_life = getattr(settings, 'POSTS_RANKING_HALF_LIFE', 6 * 60 * 60)
+    window = getattr(settings, 'POSTS_RANKING_WINDOW', 7)
+    comment_weight = getattr(settings, 'POSTS_RANKING_COMMENT_WEIGHT', 1.0)
+    reach_weight = getattr(settings, 'POSTS_RANKING_REACH_WEIGHT', 1.0)
+
+    def term(weight, moment):
+        seconds = (moment - epoch).total_seconds()
+        return math.log(weight) + seconds * math.log(2) / half_life
+
+    since = timezone.now() - timedelta(days=window)
+    posts = Post.objects.filter(pub_date__gte=since).values_list(
+        'id', 'group_id', 'pub_date', 'author__counters__followers_count'
+    )
+    ranks = {
+        pk: PostRank(
+            post_id=pk, group_id=group_id,
+            score=term(1 + reach_weight * math.log1p(followers or 0),
+                       pub_date),
+        )
+        for pk, group_id, pub_date, followers in posts.iterator()
+    }
+    ids = list(ranks)
+    for start in range(0, len(ids), 500):
+        comments = Comment.objects.filter(
+            post_id__in=ids[start:start + 500]
+        ).values_list('post_id', 'pub_date')
+        for post_id, pub_date in comments.iterator():
+            rank = ranks[post_id]
+            other = term(comment_weight, pub_date)
+            high, low = max(rank.score, other), min(rank.score, other)
+            rank.score = high + math.log1p(math.exp(low - high))
+    PostRank.objects.bulk_create(ranks.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRank',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank', serialize=False, to='posts.Post')),
+                ('score', models.FloatField()),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postrank',
+            index=models.Index(fields=['score', 'post'], name='rank_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postrank',
+            index=models.Index(fields=['group', 'score', 'post'], name='rank_group_score_idx'),
+        ),
+        migrations.RunPython(fill_ranking, migrations.RunPython.noop),
+    ]
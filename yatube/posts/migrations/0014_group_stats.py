@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:26
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in
+         Group.objects.values_list('pk', flat=True).iterator()],
+        batch_size=500,
+    )
+    posts_count = Coalesce(Subquery(
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by().values('group').annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+    last_post = Subquery(
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by('-pub_date').values('pub_date')[:1]
+    )
+    last_comment = Subquery(
+        Comment.objects.filter(post__group=OuterRef('pk'))
+        .order_by().values('post__group').annotate(last=Max('pub_date'))
+        .values('last')
+    )
+    GroupStats.objects.update(
+        posts_count=posts_count,
+        last_activity=Greatest(
+            Coalesce(last_post, last_comment),
+            Coalesce(last_comment, last_post),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['last_activity', 'group'], name='group_stats_activity_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
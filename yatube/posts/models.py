@@ -1,6 +1,10 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import post_images_storage
+
 User = get_user_model()
 TEXT_LEN = 15
 
@@ -36,16 +40,56 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_images_storage,
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+    # Адрес готовой миниатюры; пустой, пока её не построила очередь.
+    thumbnail_url = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюра'
+    )
+    # Варианты картинки для <picture> в JSON, см. posts.images.
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки'
+    )
 
     def __str__(self):
         return self.text[:TEXT_LEN]
 
+    @property
+    def picture(self):
+        """Источники и srcset для <picture>; пусто, пока не построены."""
+        try:
+            return json.loads(self.image_variants)
+        except ValueError:
+            return {'sources': [], 'srcset': ''}
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Ленты сортируются по (pub_date, id) и режутся по курсору.
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'], name='post_group_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_date_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -74,6 +118,11 @@ class Comment(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'pub_date'], name='comment_post_date_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -87,3 +136,139 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в готовой ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Копия post.pub_date: лента читается по индексу без JOIN.
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class PulledAuthor(models.Model):
+    """Автор, чьи посты не рассылаются по лентам подписчиков.
+
+    У таких авторов слишком много подписчиков, и их посты читаются
+    при показе ленты.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pulled'
+    )
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, которые иначе считались бы COUNT(*)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок'
+    )
+
+
+class GroupStats(models.Model):
+    """Сводка группы для каталога групп, см. posts.counters."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Постов'
+    )
+    # Дата последнего поста или комментария в группе.
+    last_activity = models.DateTimeField(
+        blank=True, null=True, verbose_name='Последняя активность'
+    )
+
+    class Meta:
+        # NULL меньше любой даты: группы без постов идут в конце.
+        indexes = [
+            models.Index(
+                fields=['last_activity', 'group'],
+                name='group_stats_activity_idx'
+            ),
+        ]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются."""
+    name = models.CharField(max_length=100, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class PostRank(models.Model):
+    """Место поста в популярной ленте, см. posts.ranking."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank'
+    )
+    # Копия post.group: лента группы читается по индексу без JOIN.
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True, null=True,
+        related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['score', 'post'], name='rank_score_idx'
+            ),
+            models.Index(
+                fields=['group', 'score', 'post'],
+                name='rank_group_score_idx'
+            ),
+        ]
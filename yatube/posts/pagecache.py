@@ -0,0 +1,153 @@
+"""Кеш целых страниц лент и постов для анонимов.
+
+Анонимная страница рендерится один раз как заготовка: вместо частей,
+которые зависят от зрителя (меню пользователя в шапке, кнопка
+подписки, ссылка на правку, форма комментария с CSRF-токеном), в ней
+стоят метки {% hole %}. Заготовка ложится в кеш, а метки при каждой
+выдаче заменяются выводом лёгких функций из HOLES — без запросов к
+базе для анонима.
+
+Ключ заготовки — адрес страницы и поколения фрагментов, из которых
+строится и её ETag (posts.conditional): страница выпадает из кеша
+от тех же изменений, что меняют её ETag.
+
+Пользователям страница рендерится как обычно, те же функции
+вызываются прямо из шаблона.
+"""
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django import shortcuts
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .forms import CommentForm
+from .models import Follow, User
+
+PAGE_KEY = 'posts:page:{}:{}'
+# Аргументы экранированы urlencode, поэтому '-->' внутри метки нет.
+HOLE = re.compile(r'<!--hole:(\w+)\?([^>]*)-->')
+
+HOLES = {}
+
+
+def page_cache_timeout():
+    return getattr(settings, 'POSTS_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def register(function):
+    HOLES[function.__name__] = function
+    return function
+
+
+def hole(request, name, arguments):
+    """Вывод части страницы name или метка на её месте в заготовке."""
+    if getattr(request, 'page_skeleton', False):
+        return mark_safe(f'<!--hole:{name}?{urlencode(arguments)}-->')
+    return HOLES[name](request, **arguments)
+
+
+def fill(request, content):
+    return HOLE.sub(
+        lambda match: HOLES[match[1]](request, **dict(parse_qsl(match[2]))),
+        content,
+    )
+
+
+def page_key(request, validators):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(
+        path, '.'.join(map(str, validators.generations))
+    )
+
+
+def cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and page_cache_timeout()
+    )
+
+
+def lookup(request, validators):
+    """Ответ без рендера: 304 или страница из кеша."""
+    response = validators.not_modified()
+    if response is not None or not cacheable(request):
+        return response
+    cached = cache.get(page_key(request, validators))
+    if cached is None:
+        return None
+    content, content_type = cached
+    return validators.apply(
+        HttpResponse(fill(request, content), content_type=content_type)
+    )
+
+
+def render(request, validators, template_name, context):
+    """Рендерит страницу после промаха lookup().
+
+    Анониму — заготовкой: она ложится в кеш, а метки в ответе
+    заполняются. Метки ставятся только на время этого рендера: если
+    вид упадёт раньше (например, с Http404), страница ошибки выйдет
+    с обычной шапкой.
+    """
+    if not cacheable(request):
+        return validators.apply(
+            shortcuts.render(request, template_name, context)
+        )
+    request.page_skeleton = True
+    try:
+        response = shortcuts.render(request, template_name, context)
+    finally:
+        request.page_skeleton = False
+    if response.status_code == 200:
+        content = response.content.decode(response.charset)
+        cache.set(
+            page_key(request, validators),
+            (content, response['Content-Type']),
+            page_cache_timeout(),
+        )
+        response.content = fill(request, content)
+    return validators.apply(response)
+
+
+@register
+def user_menu(request):
+    return render_to_string('includes/user_menu.html', request=request)
+
+
+@register
+def follow_button(request, author_id, username):
+    author = User(pk=int(author_id), username=username)
+    following = False
+    if request.user.is_authenticated and request.user != author:
+        following = Follow.objects.filter(
+            user=request.user, author=author
+        ).exists()
+    return render_to_string(
+        'posts/includes/following_author.html',
+        {'author': author, 'following': following},
+        request,
+    )
+
+
+@register
+def edit_link(request, post_id, author_id):
+    return render_to_string(
+        'posts/includes/edit_link.html',
+        {'post_id': int(post_id), 'author_id': int(author_id)},
+        request,
+    )
+
+
+@register
+def comment_form(request, post_id):
+    return render_to_string(
+        'posts/includes/comment_form.html',
+        {'form': CommentForm(), 'post_id': int(post_id)},
+        request,
+    )
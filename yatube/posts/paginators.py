@@ -0,0 +1,146 @@
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from django.core.paginator import (EmptyPage, Page, PageNotAnInteger,
+                                   Paginator)
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, value, pk):
+    """Курсор позиции (value, pk); value — дата или число."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([direction, value, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding)
+        direction, value, pk = json.loads(raw)
+        # Дата вида 2020-13-45 — ValueError, строка не в формате даты
+        # — None.
+        if isinstance(value, str):
+            value = parse_datetime(value)
+        elif not isinstance(value, float) or not math.isfinite(value):
+            value = None
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if (direction not in (FORWARD, BACKWARD) or value is None
+            or not isinstance(pk, int)):
+        raise InvalidCursor(cursor)
+    return direction, value, pk
+
+
+class KeysetPaginator(Paginator):
+    """Паджинатор по ключу (pub_date, id) без COUNT и OFFSET.
+
+    Страница ищется по индексу от позиции курсора, поэтому её
+    стоимость не зависит от глубины ленты. Старые ссылки ?page=N
+    обслуживаются через OFFSET, но не глубже max_offset_page.
+    keys — пара полей объектов ленты, играющих роль (pub_date, id);
+    объекты могут быть и словарями из .values(). Первое поле может
+    быть и числом, например рейтингом: тогда key_type=float, и курсор
+    с датой для такой ленты недействителен. descending=False — от
+    старых к новым.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, max_offset_page=20,
+                 keys=('pub_date', 'id'), descending=True,
+                 key_type=datetime, **kwargs):
+        self.keys = keys
+        self.key_type = key_type
+        self.descending = descending
+        prefix = '-' if descending else ''
+        super().__init__(
+            object_list.order_by(*(prefix + key for key in keys)),
+            per_page, **kwargs
+        )
+        self.max_offset_page = max_offset_page
+
+    def offset_page(self, number):
+        """Страница по номеру, как в классическом Paginator.
+
+        Номер вне ленты — EmptyPage, как и номер меньше 1: последнюю
+        страницу без COUNT не найти, а пустая страница без ссылок
+        была бы тупиком. Пустая лента — это одна пустая страница.
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return self._build_page(
+            rows[:self.per_page], number,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def cursor_page(self, cursor):
+        direction, value, pk = decode_cursor(cursor)
+        if not isinstance(value, self.key_type):
+            raise InvalidCursor(cursor)
+        value_key, id_key = self.keys
+        forward = direction == FORWARD
+        # Вперёд — по порядку ленты, назад — против него.
+        lookup = '__lt' if forward == self.descending else '__gt'
+        rows = self.object_list.filter(
+            Q(**{value_key + lookup: value})
+            | Q(**{value_key: value, id_key + lookup: pk})
+        )
+        if not forward:
+            rows = rows.reverse()
+        rows = list(rows[:self.per_page + 1])
+        if forward:
+            return self._build_page(
+                rows[:self.per_page], None,
+                has_next=len(rows) > self.per_page, has_previous=True,
+            )
+        return self._build_page(
+            rows[:self.per_page][::-1], None,
+            has_next=True, has_previous=len(rows) > self.per_page,
+        )
+
+    def validate_number(self, number):
+        # Проверяем только формат номера: общий COUNT не нужен.
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        if number > self.max_offset_page:
+            raise EmptyPage(_('That page contains no results'))
+        return number
+
+    def _build_page(self, object_list, number, has_next, has_previous):
+        page = Page(object_list, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if object_list and has_next:
+            page.next_cursor = self._cursor(FORWARD, object_list[-1])
+        if object_list and has_previous:
+            page.previous_cursor = self._cursor(BACKWARD, object_list[0])
+        return page
+
+    def _cursor(self, direction, obj):
+        value_key, id_key = self.keys
+        # Лента из .values() состоит из словарей.
+        if isinstance(obj, dict):
+            return encode_cursor(direction, obj[value_key], obj[id_key])
+        return encode_cursor(
+            direction, getattr(obj, value_key), getattr(obj, id_key)
+        )
@@ -0,0 +1,146 @@
+"""Популярная лента: рейтинг постов по комментариям и охвату автора.
+
+Вклад поста и каждого комментария к нему затухает вдвое за
+half_life() секунд. В момент t вес поста
+
+    w_p * 2 ** ((t_p - t) / T) + Σ w_c * 2 ** ((t_c - t) / T),
+
+где t_p и t_c — даты поста и комментариев, w_p растёт с логарифмом
+числа подписчиков автора (охват), w_c — вес комментария: недавние
+комментарии и есть скорость обсуждения. Все слагаемые затухают
+одинаково, поэтому порядок постов со временем не меняется и его
+можно хранить. PostRank.score — натуральный логарифм веса,
+приведённого к моменту EPOCH: так число не переполняется.
+
+Новый комментарий прибавляется к весу одним UPDATE (logaddexp на
+SQL), новый пост получает строку с вкладом охвата. Лента читается
+проходом по индексу (score, post) или (group, score, post).
+
+Охват меняется с подписками, а удалённые комментарии не вычитаются:
+это поправляет rebuild(), которую по расписанию запускает команда
+rank_posts. Она же убирает из рейтинга посты старше window() дней;
+комментарии к ним рейтинг не меняют.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from . import fragments
+from .feeds import POPULAR, paginator_post, prefetch_thumbnails
+from .models import Comment, Post, PostRank, UserCounters
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+RANK_KEYS = ('score', 'post_id')
+# Не больше параметров в одном запросе, чем позволяет SQLite.
+BATCH_SIZE = 500
+
+
+def half_life():
+    return getattr(settings, 'POSTS_RANKING_HALF_LIFE', 6 * 60 * 60)
+
+
+def window():
+    return getattr(settings, 'POSTS_RANKING_WINDOW', 7)
+
+
+def comment_weight():
+    return getattr(settings, 'POSTS_RANKING_COMMENT_WEIGHT', 1.0)
+
+
+def reach_weight():
+    return getattr(settings, 'POSTS_RANKING_REACH_WEIGHT', 1.0)
+
+
+def term(weight, moment):
+    """Логарифм вклада weight, сделанного в moment, на момент EPOCH."""
+    seconds = (moment - EPOCH).total_seconds()
+    return math.log(weight) + seconds * math.log(2) / half_life()
+
+
+def post_weight(followers):
+    return 1 + reach_weight() * math.log1p(followers or 0)
+
+
+def add(score, other):
+    """log(exp(score) + exp(other)) без переполнения."""
+    high, low = max(score, other), min(score, other)
+    return high + math.log1p(math.exp(low - high))
+
+
+def add_post(post):
+    """Ставит новый пост в рейтинг с вкладом охвата автора."""
+    followers = UserCounters.objects.filter(
+        user_id=post.author_id
+    ).values_list('followers_count', flat=True).first()
+    PostRank.objects.update_or_create(post=post, defaults={
+        'group_id': post.group_id,
+        'score': term(post_weight(followers), post.pub_date),
+    })
+
+
+def add_comment(comment):
+    """Прибавляет комментарий к весу поста, если пост в рейтинге."""
+    value = Value(term(comment_weight(), comment.pub_date))
+    high, low = Greatest('score', value), Least('score', value)
+    PostRank.objects.filter(post_id=comment.post_id).update(
+        score=high + Ln(Value(1.0) + Exp(low - high))
+    )
+
+
+def move_post(post):
+    """Переносит пост в ленту его новой группы."""
+    PostRank.objects.filter(post=post).update(group_id=post.group_id)
+
+
+def rebuild():
+    """Пересчитывает рейтинг за window() дней."""
+    since = timezone.now() - timedelta(days=window())
+    posts = Post.objects.filter(pub_date__gte=since).values_list(
+        'id', 'group_id', 'pub_date', 'author__counters__followers_count'
+    )
+    ranks = {
+        pk: PostRank(
+            post_id=pk, group_id=group_id,
+            score=term(post_weight(followers), pub_date),
+        )
+        for pk, group_id, pub_date, followers in posts.iterator()
+    }
+    ids = list(ranks)
+    weight = comment_weight()
+    for start in range(0, len(ids), BATCH_SIZE):
+        comments = Comment.objects.filter(
+            post_id__in=ids[start:start + BATCH_SIZE]
+        ).values_list('post_id', 'pub_date')
+        for post_id, pub_date in comments.iterator():
+            rank = ranks[post_id]
+            rank.score = add(rank.score, term(weight, pub_date))
+    PostRank.objects.all().delete()
+    PostRank.objects.bulk_create(ranks.values(), batch_size=BATCH_SIZE)
+    return len(ranks)
+
+
+def refresh():
+    """Пересчитывает рейтинг и сбрасывает популярные ленты."""
+    with transaction.atomic():
+        ranked = rebuild()
+    fragments.bump(fragments.RANKING)
+    return ranked
+
+
+def load_popular(request, group=None):
+    """Страница популярной ленты, всей или группы group."""
+    ranks = PostRank.objects.select_related('post__author', 'post__group')
+    if group is not None:
+        ranks = ranks.filter(group=group)
+    page_obj = paginator_post(
+        request, ranks, keys=RANK_KEYS, key_type=float
+    )
+    page_obj.object_list = [rank.post for rank in page_obj.object_list]
+    page_obj.sort = POPULAR
+    prefetch_thumbnails(page_obj.object_list)
+    return page_obj
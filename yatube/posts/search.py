@@ -0,0 +1,298 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Поисковый движок подключается настройкой POSTS_SEARCH_BACKEND. Основной
+движок — индекс SQLite FTS5, который обновляется сигналами при каждом
+сохранении и удалении поста или комментария. LikeBackend ищет
+сканированием LIKE и годится для других СУБД.
+
+Каждый пост и каждый комментарий — отдельный документ индекса с
+rowid = 2 * id поста или 2 * id комментария + 1. Результаты
+упорядочены по релевантности и листаются курсором (rank, rowid).
+"""
+import base64
+import binascii
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+
+SEARCH_TABLE = 'posts_search'
+NUM_HITS = 10
+# Границы подсветки в тексте фрагмента: управляющие символы, которых
+# нет в постах, чтобы экранировать текст и только потом вставить <mark>.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+
+# Столбцы и токенизатор индекса FTS5.
+FTS_SCHEMA = (
+    "body, post_id UNINDEXED, comment_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2'"
+)
+
+SearchHit = namedtuple(
+    'SearchHit', ('post_id', 'comment_id', 'rank', 'rowid', 'snippet')
+)
+SearchPage = namedtuple('SearchPage', ('hits', 'next_cursor'))
+
+
+class InvalidSearchCursor(Exception):
+    pass
+
+
+def post_rowid(post_id):
+    return post_id * 2
+
+
+def comment_rowid(comment_id):
+    return comment_id * 2 + 1
+
+
+def encode_cursor(rank, rowid):
+    raw = json.dumps([rank, rowid])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        rank, rowid = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidSearchCursor(cursor)
+    if not isinstance(rank, (int, float)) or not isinstance(rowid, int):
+        raise InvalidSearchCursor(cursor)
+    return rank, rowid
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и подсвечивает совпадения."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def match_expression(terms):
+    """Выражение MATCH для FTS5 из слов запроса."""
+    # Каждое слово в кавычках: синтаксис FTS5 из запроса не
+    # выполняется. Последнее слово ищется как префикс.
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+class SearchBackend:
+    """Интерфейс поискового движка."""
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def index_post(self, post):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def index_comment(self, comment):
+        raise NotImplementedError
+
+    def remove_comment(self, comment_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def search(self, query, after=None, limit=NUM_HITS):
+        """Документы по запросу, начиная после курсора (rank, rowid)."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    def create(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+                f'USING fts5({FTS_SCHEMA})'
+            )
+
+    def drop(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def _write(self, rowid, body, post_id, comment_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {SEARCH_TABLE} '
+                f'(rowid, body, post_id, comment_id) VALUES (%s, %s, %s, %s)',
+                [rowid, body, post_id, comment_id],
+            )
+
+    def _delete(self, rowid):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+            )
+
+    def index_post(self, post):
+        self._write(post_rowid(post.pk), post.text, post.pk, None)
+
+    def remove_post(self, post_id):
+        self._delete(post_rowid(post_id))
+
+    def index_comment(self, comment):
+        self._write(
+            comment_rowid(comment.pk), comment.text, comment.post_id,
+            comment.pk,
+        )
+
+    def remove_comment(self, comment_id):
+        self._delete(comment_rowid(comment_id))
+
+    def rebuild(self):
+        posts = Post._meta.db_table
+        comments = Comment._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, body, post_id, '
+                f'comment_id) SELECT id * 2, text, id, NULL FROM {posts}'
+            )
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, body, post_id, '
+                f'comment_id) SELECT id * 2 + 1, text, post_id, id '
+                f'FROM {comments}'
+            )
+
+    def search(self, query, after=None, limit=NUM_HITS):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        sql = (
+            f'SELECT post_id, comment_id, rank, rowid, snippet('
+            f'{SEARCH_TABLE}, 0, %s, %s, %s, %s) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [
+            MARK_START, MARK_END, '…', SNIPPET_TOKENS,
+            match_expression(terms),
+        ]
+        if after is not None:
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        params.append(limit)
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+class LikeBackend(SearchBackend):
+    """Поиск сканированием LIKE: без индекса, без ранжирования."""
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def snippet(self, text, terms):
+        pattern = re.compile(
+            '|'.join(re.escape(term) for term in terms), re.IGNORECASE
+        )
+        return pattern.sub(
+            lambda match: MARK_START + match.group() + MARK_END, text
+        )
+
+    def search(self, query, after=None, limit=NUM_HITS):
+        # Все документы равнозначны (rank = 0), новые — раньше:
+        # вместо rowid в курсоре хранится -rowid.
+        terms = search_terms(query)
+        if not terms:
+            return []
+        posts = Post.objects.using(self.using)
+        comments = Comment.objects.using(self.using)
+        for term in terms:
+            posts = posts.filter(text__icontains=term)
+            comments = comments.filter(text__icontains=term)
+        if after is not None:
+            last_rowid = -after[1]
+            posts = posts.filter(id__lte=(last_rowid - 1) // 2)
+            comments = comments.filter(id__lte=(last_rowid - 2) // 2)
+        hits = [
+            SearchHit(pk, None, 0, -post_rowid(pk), self.snippet(text, terms))
+            for pk, text in posts.order_by('-id').values_list(
+                'id', 'text'
+            )[:limit]
+        ] + [
+            SearchHit(
+                post_id, pk, 0, -comment_rowid(pk),
+                self.snippet(text, terms),
+            )
+            for pk, post_id, text in comments.order_by('-id').values_list(
+                'id', 'post_id', 'text'
+            )[:limit]
+        ]
+        return sorted(hits, key=lambda hit: hit.rowid)[:limit]
+
+
+@lru_cache()
+def load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return load_backend(getattr(
+        settings, 'POSTS_SEARCH_BACKEND', 'posts.search.SQLiteFTSBackend'
+    ))
+
+
+def search_page(query, cursor=None, limit=NUM_HITS):
+    """Страница результатов с постами; неверный курсор — с начала."""
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except InvalidSearchCursor:
+            pass
+    hits = get_backend().search(query, after, limit + 1)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1].rank, hits[-1].rowid)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        {hit.post_id for hit in hits}
+    )
+    results = []
+    for hit in hits:
+        if hit.post_id in posts:
+            results.append({
+                'post': posts[hit.post_id],
+                'is_comment': hit.comment_id is not None,
+                'snippet': highlight(hit.snippet),
+            })
+    return SearchPage(results, next_cursor)
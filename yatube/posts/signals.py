@@ -0,0 +1,228 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, counters, fragments, ranking, search, timeline
+from .models import (Comment, Follow, Group, GroupStats, Post, User,
+                     UserCounters)
+
+# Поля пользователя, которые видны в карточках постов.
+SHOWN_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timeline.timeline_enabled():
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and timeline.timeline_enabled():
+        timeline.backfill(instance.user, instance.author)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    if timeline.timeline_enabled():
+        timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def create_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if created or old_group_id != instance.group_id:
+        counters.bump_group(old_group_id, -1)
+        counters.bump_group(instance.group_id, 1, instance.pub_date)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_group_post(sender, instance, **kwargs):
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_group_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.touch_group(instance.post_id, instance.pub_date)
+
+
+@receiver(post_save, sender=Post)
+def rank_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        ranking.add_post(instance)
+    elif getattr(instance, '_old_group_id', None) != instance.group_id:
+        ranking.move_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def rank_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        ranking.add_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.user_id, following_count=1)
+        counters.bump_user(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, following_count=-1)
+    counters.bump_user(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def refresh_follow_pages(sender, instance, raw=False, **kwargs):
+    # Профили показывают счётчики подписок и кнопку подписки.
+    if not raw:
+        fragments.bump(
+            fragments.counters_scope(instance.user_id),
+            fragments.counters_scope(instance.author_id),
+        )
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, raw=False, **kwargs):
+    # Пост мог уйти из группы или сменить картинку: старую ленту
+    # нужно сбросить, а старую картинку — освободить.
+    instance._old_group_id, instance._old_image = None, ''
+    # Ссылку на загружаемую картинку возьмёт хранилище, см. posts.storage.
+    instance._image_uploaded = (
+        bool(instance.image) and not instance.image._committed
+    )
+    if instance.pk and not raw:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def refresh_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = fragments.post_scopes(instance)
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id:
+        scopes.append(fragments.group_scope(old_group_id))
+    fragments.bump(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def drop_from_feeds(sender, instance, **kwargs):
+    fragments.bump(*fragments.post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_comment_feeds(sender, instance, raw=False, **kwargs):
+    # В карточках поста показано число комментариев.
+    if not raw:
+        fragments.bump_post(instance.post_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_group_index(sender, instance, raw=False, **kwargs):
+    # Каталог групп показывает их число постов и последнюю активность.
+    if not raw:
+        fragments.bump(fragments.GROUPS)
+
+
+@receiver(post_save, sender=Group)
+def refresh_group_title(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        fragments.bump(fragments.SITE)
+
+
+@receiver(post_save, sender=User)
+def refresh_author_name(sender, instance, created, raw=False,
+                        update_fields=None, **kwargs):
+    if created or raw:
+        return
+    if update_fields is None or SHOWN_USER_FIELDS & set(update_fields):
+        fragments.bump(fragments.SITE)
+
+
+@receiver(post_save, sender=Post)
+def retain_image(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_image = getattr(instance, '_old_image', '')
+    if instance.image.name == old_image:
+        return
+    if instance.image and not getattr(instance, '_image_uploaded', False):
+        blobs.retain(instance.image.name)
+    if old_image:
+        blobs.release(old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance.image:
+        blobs.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.get_backend().remove_comment(instance.pk)
@@ -0,0 +1,80 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 его содержимого, который
+считается по ходу записи на диск. Повторная загрузка той же картинки
+не создаёт новый файл, а возвращает имя уже сохранённого, поэтому и
+миниатюры sorl (их ключ строится от имени) у копий общие. Сколько
+постов ссылается на файл, считает posts.blobs; ссылку на загруженный
+файл берёт само хранилище, до того как отдать его имя.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Имя вида posts/ab/ab…(64 шестнадцатеричных знака).jpg
+CONTENT_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.\w+)?$')
+
+
+def file_digest(file, chunk_size=64 * 1024):
+    """SHA-256 содержимого открытого файла."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_content_name(name):
+    """Сохранён ли файл name этим хранилищем."""
+    return bool(CONTENT_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хешем содержимого в _save.
+        return name
+
+    def content_name(self, directory, digest, extension):
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(
+            dir=full_directory, suffix='.upload'
+        )
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = self.content_name(
+                directory, digest.hexdigest(), extension
+            )
+            # Сначала ссылка, потом проверка файла: иначе последний
+            # release() успел бы удалить файл, чьё имя мы уже вернули.
+            from .blobs import retain
+            retain(name)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(temporary)
+                return name
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+post_images_storage = ContentAddressedStorage()
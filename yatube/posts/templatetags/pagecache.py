@@ -0,0 +1,10 @@
+from django import template
+
+from posts import pagecache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **arguments):
+    return pagecache.hole(context.get('request'), name, arguments)
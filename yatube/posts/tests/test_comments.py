@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..feeds import NUM_COMMENTS
+from ..models import Comment, Post
+
+User = get_user_model()
+
+NUM_TEST_COMMENTS = NUM_COMMENTS + 5
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for i in range(NUM_TEST_COMMENTS):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader_{i}'),
+                text=f'Комментарий_{i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': CommentPagesTests.post.id}
+        )
+        self.more = reverse(
+            'posts:post_comments',
+            kwargs={'post_id': CommentPagesTests.post.id},
+        )
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_first_page(self):
+        """Пост показывает первую страницу новых комментариев.
+        """
+        response = self.guest_client.get(self.detail)
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments),
+            [f'Комментарий_{i}' for i in range(NUM_TEST_COMMENTS - 1, 4, -1)],
+        )
+        self.assertContains(response, f'Комментарии: {NUM_TEST_COMMENTS}')
+        self.assertContains(response, f'hx-get="{self.more}?order=new')
+
+    def test_load_more(self):
+        """Следующая страница отдаётся фрагментом без страницы поста.
+        """
+        first = self.guest_client.get(self.detail).context['comments']
+        response = self.guest_client.get(
+            self.more, {'cursor': first.next_cursor}
+        )
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            [f'Комментарий_{i}' for i in range(4, -1, -1)],
+        )
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_oldest_first(self):
+        """?order=old листает комментарии от старых к новым.
+        """
+        first = self.guest_client.get(
+            self.detail, {'order': 'old'}
+        ).context['comments']
+        self.assertEqual(self.texts(first)[0], 'Комментарий_0')
+        rest = self.guest_client.get(
+            self.more, {'order': 'old', 'cursor': first.next_cursor}
+        ).context['comments']
+        self.assertEqual(
+            self.texts(first) + self.texts(rest),
+            [f'Комментарий_{i}' for i in range(NUM_TEST_COMMENTS)],
+        )
+
+    def test_constant_queries(self):
+        """Страница комментариев — один запрос вместе с авторами.
+        """
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(self.more)
+        with self.assertNumQueries(0):
+            for comment in response.context['comments']:
+                comment.author.username
+
+    def test_missing_post(self):
+        """Комментарии несуществующего поста — 404, пустого — 200.
+        """
+        empty = Post.objects.create(
+            author=CommentPagesTests.author, text='Без комментариев'
+        )
+        response = self.guest_client.get(reverse(
+            'posts:post_comments', kwargs={'post_id': empty.id}
+        ))
+        self.assertEqual(response.status_code, 200)
+        response = self.guest_client.get(reverse(
+            'posts:post_comments', kwargs={'post_id': empty.id + 1}
+        ))
+        self.assertEqual(response.status_code, 404)
+
+    def test_count_from_counter(self):
+        """Число комментариев берётся из счётчика, а не COUNT(*).
+        """
+        Post.objects.filter(id=CommentPagesTests.post.id).update(
+            comments_count=100
+        )
+        response = self.guest_client.get(self.detail)
+        self.assertContains(response, 'Комментарии: 100')
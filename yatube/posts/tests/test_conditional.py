@@ -0,0 +1,148 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import fragments
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.user)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': ConditionalGetTests.post.id},
+            ),
+        )
+
+    def revalidate(self, client, url, response):
+        return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_not_modified(self):
+        """Неизменившаяся страница отдаётся ответом 304 без рендера.
+        """
+        # Ленте хватает кеша, остальным — запроса группы, автора, поста.
+        for url, num_queries in zip(self.urls(), (0, 1, 1, 1)):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response['ETag'].startswith('W/"'))
+                with self.assertNumQueries(num_queries):
+                    revalidated = self.revalidate(
+                        self.guest_client, url, response
+                    )
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+                self.assertEqual(revalidated.content, b'')
+
+    def test_if_modified_since(self):
+        """Без ETag страница перепроверяется по Last-Modified.
+        """
+        url = reverse('posts:index')
+        self.assertFalse(
+            self.guest_client.get(url).has_header('Last-Modified'),
+            'Изменение в эту же секунду не даёт точного Last-Modified',
+        )
+        for scope in (fragments.SITE, fragments.INDEX):
+            cache.set(
+                fragments.GENERATION_KEY.format(scope),
+                time.time_ns() - 5 * 10 ** 9, None,
+            )
+        response = self.guest_client.get(url)
+        revalidated = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_changes_invalidate(self):
+        """Новый пост, комментарий и подписка меняют ETag своих страниц.
+        """
+        index, group, profile, detail = self.urls()
+        changes = (
+            (index, lambda: Post.objects.create(
+                author=ConditionalGetTests.user, text='Новый'
+            )),
+            (group, lambda: Post.objects.create(
+                author=ConditionalGetTests.user, text='В группе',
+                group=ConditionalGetTests.group,
+            )),
+            (profile, lambda: Follow.objects.create(
+                user=ConditionalGetTests.user,
+                author=ConditionalGetTests.author,
+            )),
+            (detail, lambda: Comment.objects.create(
+                post=ConditionalGetTests.post,
+                author=ConditionalGetTests.user, text='Комментарий',
+            )),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                change()
+                revalidated = self.revalidate(
+                    self.guest_client, url, response
+                )
+                self.assertEqual(revalidated.status_code, 200)
+
+    def test_other_group_keeps_etag(self):
+        """Пост в другой группе не сбрасывает ETag группы.
+        """
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        response = self.guest_client.get(url)
+        Post.objects.create(
+            author=ConditionalGetTests.author, text='Не сюда',
+            group=ConditionalGetTests.other_group,
+        )
+        revalidated = self.revalidate(self.guest_client, url, response)
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_cache_control(self):
+        """Анонимам страница public, пользователям — private.
+        """
+        url = reverse('posts:index')
+        guest = self.guest_client.get(url)
+        user = self.authorized_client.get(url)
+        self.assertIn('public', guest['Cache-Control'])
+        self.assertIn('must-revalidate', guest['Cache-Control'])
+        self.assertIn('private', user['Cache-Control'])
+        self.assertIn('no-cache', user['Cache-Control'])
+        self.assertNotEqual(guest['ETag'], user['ETag'])
+        revalidated = self.revalidate(self.authorized_client, url, guest)
+        self.assertEqual(revalidated.status_code, 200)
+
+    def test_missing_page(self):
+        """Несуществующая страница не получает валидаторов.
+        """
+        response = self.guest_client.get(
+            reverse('posts:group_list', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
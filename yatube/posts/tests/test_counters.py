@@ -0,0 +1,120 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, GroupStats, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_posts_count(self):
+        """Счётчик постов меняется при создании и удалении поста.
+        """
+        post = Post.objects.create(author=CountersTests.author, text='Ещё')
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 1)
+
+    def test_comments_count(self):
+        """Счётчик комментариев поста меняется вместе с комментариями.
+        """
+        comment = Comment.objects.create(
+            post=CountersTests.post, author=CountersTests.user, text='Да'
+        )
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 1)
+        comment.delete()
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 0)
+
+    def test_follow_counts(self):
+        """Счётчики подписчиков и подписок меняются вместе с подписками.
+        """
+        follow = Follow.objects.create(
+            user=CountersTests.user, author=CountersTests.author
+        )
+        self.assertEqual(self.counters(CountersTests.user).following_count, 1)
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 1
+        )
+        follow.delete()
+        self.assertEqual(self.counters(CountersTests.user).following_count, 0)
+        self.assertEqual(
+            self.counters(CountersTests.author).followers_count, 0
+        )
+
+    def test_group_stats(self):
+        """Сводка группы следит за её постами и комментариями, а
+        repair_counters её пересчитывает.
+        """
+        group = Group.objects.create(title='Группа', slug='group')
+        stats = GroupStats.objects.get(group=group)
+        self.assertEqual((stats.posts_count, stats.last_activity), (0, None))
+        post = Post.objects.create(
+            author=CountersTests.author, text='В группе', group=group
+        )
+        CountersTests.post.group = group
+        CountersTests.post.save()
+        comment = Comment.objects.create(
+            post=post, author=CountersTests.user, text='Да'
+        )
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.posts_count, stats.last_activity), (2, comment.pub_date)
+        )
+        post.delete()
+        CountersTests.post.group = None
+        CountersTests.post.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 0)
+        GroupStats.objects.all().delete()
+        call_command('repair_counters', stdout=StringIO())
+        stats = GroupStats.objects.get(group=group)
+        self.assertEqual((stats.posts_count, stats.last_activity), (0, None))
+
+    def test_repair_counters(self):
+        """repair_counters пересчитывает разошедшиеся счётчики.
+        """
+        Comment.objects.create(
+            post=CountersTests.post, author=CountersTests.user, text='Да'
+        )
+        UserCounters.objects.all().update(posts_count=7)
+        UserCounters.objects.filter(user=CountersTests.user).delete()
+        Post.objects.update(comments_count=0)
+        call_command('repair_counters', stdout=StringIO())
+        self.assertEqual(self.counters(CountersTests.author).posts_count, 1)
+        self.assertEqual(self.counters(CountersTests.user).posts_count, 0)
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 1)
+
+    def test_pages_use_counters(self):
+        """Профиль и пост показывают число постов без COUNT(*).
+        """
+        pages = (
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse(
+                'posts:post_detail', kwargs={'post_id': CountersTests.post.id}
+            ),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                with self.assertNumQueries(2):
+                    response = self.guest_client.get(url)
+                self.assertNotIn('COUNT(', str(response.content))
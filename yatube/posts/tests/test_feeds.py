@@ -0,0 +1,175 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..feeds import follow_feed
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+NUM_POSTS = 12
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая_группа',
+            slug='Тест_слаг',
+            description='Тестовое_описание',
+        )
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(NUM_POSTS):
+            cls.create_post(cls.author, f'Пост_автора_{i}')
+        # Свежие посты от разных авторов и с разными картинками:
+        # N+1 по авторам или миниатюрам сразу меняет число запросов.
+        for i in range(NUM_POSTS):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=cls.reader, author=author)
+            cls.create_post(author, f'Тестовый_пост_{i}')
+
+    @classmethod
+    def create_post(cls, author, text):
+        return Post.objects.create(
+            author=author,
+            text=text,
+            group=cls.group,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif',
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedQueriesTests.reader)
+
+    def warm_thumbnails(self, client, url):
+        """Первый показ строит миниатюры, затем кеш сбрасывается."""
+        client.get(url)
+        client.get(url + '?page=2')
+        cache.clear()
+
+    def test_feed_queries(self):
+        """Ленты загружаются за фиксированное число запросов.
+        """
+        author = FeedQueriesTests.author.username
+        feeds = (
+            # Сессия и пользователь, проверка авторов вне готовых лент,
+            # страница готовой ленты, миниатюры.
+            (self.authorized_client, reverse('posts:follow_index'), 5),
+            # Страница, миниатюры.
+            (self.guest_client, reverse('posts:index'), 2),
+            # Группа, страница, миниатюры.
+            (self.guest_client, reverse(
+                'posts:group_list', kwargs={'slug': 'Тест_слаг'}
+            ), 3),
+            # Автор со счётчиками, страница, миниатюры.
+            (self.guest_client, reverse(
+                'posts:profile', kwargs={'username': author}
+            ), 3),
+        )
+        for client, url, num_queries in feeds:
+            with self.subTest(url=url):
+                self.warm_thumbnails(client, url)
+                with self.assertNumQueries(num_queries):
+                    client.get(url)
+                cache.clear()
+                with self.assertNumQueries(num_queries):
+                    client.get(url + '?page=2')
+
+    def test_post_comments_queries(self):
+        """Авторы комментариев загружаются вместе с комментариями.
+        """
+        post = Post.objects.filter(author=FeedQueriesTests.author).first()
+        for i in range(NUM_POSTS):
+            Comment.objects.create(
+                post=post, author=User.objects.get(username=f'author_{i}'),
+                text=f'Комментарий_{i}',
+            )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        self.warm_thumbnails(self.guest_client, url)
+        # Пост с автором и группой, комментарии с авторами, миниатюра.
+        with self.assertNumQueries(3):
+            self.guest_client.get(url)
+
+    def test_feed_context_related(self):
+        """Автор и группа постов ленты уже загружены.
+        """
+        response = self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            for post in response.context['page_obj']:
+                post.author.username
+                post.group.slug
+
+
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_feed_queries_use_indexes(self):
+        """Ни одному запросу лент не нужна сортировка вне индекса.
+        """
+        out = StringIO()
+        call_command('explain_feeds', '--strict', stdout=out)
+        self.assertIn('post_author_date_idx', out.getvalue())
+        self.assertIn('post_group_date_idx', out.getvalue())
+
+    def test_follow_feed_reads_followed_authors(self):
+        """Лента подписок не обходит все посты сайта.
+        """
+        queryset = follow_feed(FeedIndexesTests.user)
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertFalse(
+            [line for line in plan if line.startswith('SCAN posts_post')]
+        )
+        self.assertFalse([line for line in plan if 'CORRELATED' in line])
+
+    def test_follow_constraints(self):
+        """Подписка уникальна, подписаться на себя нельзя.
+        """
+        pairs = (
+            (FeedIndexesTests.user, FeedIndexesTests.author),
+            (FeedIndexesTests.user, FeedIndexesTests.user),
+        )
+        for user, author in pairs:
+            with self.subTest(user=user, author=author):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        Follow.objects.create(user=user, author=author)
@@ -13,6 +13,11 @@ from ..models import Group, Post
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
 ADD_NEW_POST = 1
+# Картинка хранится под SHA-256 своего содержимого.
+IMAGE_NAME = (
+    'posts/c8/'
+    'c8b24ca8dcbfc94990deafdb184f07dced6cb8be3f70ac6562ba36d5d14b06a5.jpg'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -76,7 +81,7 @@ class СreatePostFormTests(TestCase):
             Post.objects.filter(
                 text='Тестовый пост_2',
                 group=СreatePostFormTests.group,
-                image='posts/small.jpg'
+                image=IMAGE_NAME
             ).exists()
         )
 
@@ -143,6 +148,6 @@ class EditPostFormTests(TestCase):
                 text='Тестовый пост_редактирование поста',
                 author=EditPostFormTests.user,
                 group=EditPostFormTests.group,
-                image='posts/small.jpg'
+                image=IMAGE_NAME
             ).exists()
         )
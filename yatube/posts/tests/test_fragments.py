@@ -0,0 +1,124 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+NUM_POSTS = 15
+
+
+# Фрагменты лежат под кешем целых страниц: он бы скрыл их работу.
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая_группа', slug='first', description='Описание'
+        )
+        cls.group_2 = Group.objects.create(
+            title='Вторая_группа', slug='second', description='Описание'
+        )
+        for i in range(NUM_POSTS):
+            Post.objects.create(
+                author=cls.user, text=f'Пост_{i}', group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.get(text='Пост_14')
+        self.feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'first'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+
+    def get(self, url, **params):
+        return self.guest_client.get(url, params).content.decode()
+
+    def test_pages_cached_separately(self):
+        """Разные страницы ленты не делят один фрагмент.
+        """
+        for url in self.feeds:
+            with self.subTest(url=url):
+                first = self.get(url)
+                next_cursor = self.guest_client.get(
+                    url
+                ).context['page_obj'].next_cursor
+                self.assertIn('Пост_14', first)
+                self.assertNotIn('Пост_4<', first)
+                self.assertIn('Пост_4<', self.get(url, page=2))
+                self.assertIn('Пост_4<', self.get(url, cursor=next_cursor))
+
+    def test_cached_until_post_changes(self):
+        """Фрагмент живёт, пока пост не сохранят или не удалят.
+        """
+        for url in self.feeds:
+            self.get(url)
+        Post.objects.filter(id=self.post.id).update(
+            text='Без_сигналов'
+        )
+        for url in self.feeds:
+            with self.subTest(url=url):
+                self.assertNotIn('Без_сигналов', self.get(url))
+        self.post.text = 'Отредактирован'
+        self.post.save()
+        for url in self.feeds:
+            with self.subTest(url=url):
+                self.assertIn('Отредактирован', self.get(url))
+        self.post.delete()
+        for url in self.feeds:
+            with self.subTest(url=url):
+                self.assertNotIn('Отредактирован', self.get(url))
+
+    def test_group_change_refreshes_both_groups(self):
+        """Перенос поста в другую группу обновляет ленты обеих групп.
+        """
+        second = reverse('posts:group_list', kwargs={'slug': 'second'})
+        self.get(self.feeds[1])
+        self.get(second)
+        self.post.group = FragmentCacheTests.group_2
+        self.post.save()
+        self.assertNotIn('Пост_14', self.get(self.feeds[1]))
+        self.assertIn('Пост_14', self.get(second))
+
+    def test_comment_refreshes_feeds(self):
+        """Новый комментарий обновляет их число в лентах.
+        """
+        for url in self.feeds:
+            self.get(url)
+        Comment.objects.create(
+            post=self.post,
+            author=FragmentCacheTests.user,
+            text='Комментарий',
+        )
+        for url in self.feeds:
+            with self.subTest(url=url):
+                self.assertIn('комментариев: 1', self.get(url))
+
+    def test_group_title_refreshes_feeds(self):
+        """Новое название группы видно в ленте без ожидания кеша.
+        """
+        self.get(self.feeds[0])
+        FragmentCacheTests.group.title = 'Новое_название'
+        FragmentCacheTests.group.save()
+        self.assertIn('Новое_название', self.get(self.feeds[0]))
+
+    def test_writes_scoped_to_group(self):
+        """Пост в одной группе не сбрасывает ленту другой, но
+        обновляет каталог групп.
+        """
+        directory = reverse('posts:group_index')
+        self.get(self.feeds[1])
+        self.assertIn('Постов: 0', self.get(directory))
+        Post.objects.filter(id=self.post.id).update(text='Без_сигналов')
+        Post.objects.create(
+            author=FragmentCacheTests.user, text='Во второй',
+            group=FragmentCacheTests.group_2,
+        )
+        self.assertNotIn('Без_сигналов', self.get(self.feeds[1]))
+        self.assertNotIn('Постов: 0', self.get(directory))
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import fragments, pagecache
+from ..conditional import Validators
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PageCacheTests.user)
+        self.detail = reverse(
+            'posts:post_detail', kwargs={'post_id': PageCacheTests.post.id}
+        )
+        self.profile = reverse('posts:profile', kwargs={'username': 'author'})
+
+    def test_cached_for_guests(self):
+        """Повторная анонимная страница отдаётся из кеша без рендера.
+        """
+        url = reverse('posts:index')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertNotIn('page_obj', second.context)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertNotIn(b'<!--hole', second.content)
+
+    def test_not_found_keeps_menu(self):
+        """404 из кешируемой ленты выходит с обычной шапкой, без меток.
+        """
+        response = self.guest_client.get(
+            reverse('posts:index'), {'page': 999}
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(b'hole:', response.content)
+        self.assertContains(response, 'Войти', status_code=404)
+
+    def test_users_render_pages(self):
+        """Пользователю страница рендерится, чужое в кеш не попадает.
+        """
+        self.guest_client.get(self.profile)
+        response = self.authorized_client.get(self.profile)
+        self.assertIn('page_obj', response.context)
+        self.assertContains(response, 'Пользователь: auth')
+        self.assertContains(response, 'Подписаться')
+        guest = self.guest_client.get(self.profile)
+        self.assertNotContains(guest, 'Пользователь:')
+        self.assertNotContains(guest, 'Подписаться')
+        self.assertContains(guest, 'Войти')
+
+    def test_holes_filled_per_request(self):
+        """Метки заготовки заполняются для того, кто её получает.
+        """
+        self.guest_client.get(self.detail)
+        request = RequestFactory().get(self.detail)
+        request.user = PageCacheTests.author
+        validators = Validators(
+            request, fragments.post_scope(PageCacheTests.post.id),
+            fragments.author_scope(PageCacheTests.author.id),
+        )
+        content, _ = cache.get(pagecache.page_key(request, validators))
+        self.assertIn('<!--hole:comment_form?post_id=', content)
+        filled = pagecache.fill(request, content)
+        self.assertIn('Пользователь: author', filled)
+        self.assertIn('редактировать запись', filled)
+        self.assertIn('csrfmiddlewaretoken', filled)
+
+    def test_changes_invalidate(self):
+        """Страница выпадает из кеша от тех же изменений, что и ETag.
+        """
+        self.guest_client.get(self.detail)
+        Comment.objects.create(
+            post=PageCacheTests.post, author=PageCacheTests.user,
+            text='Новый комментарий',
+        )
+        self.assertContains(
+            self.guest_client.get(self.detail), 'Новый комментарий'
+        )
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        """POSTS_PAGE_CACHE_TIMEOUT=0 выключает кеш страниц.
+        """
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.assertIn('page_obj', self.guest_client.get(url).context)
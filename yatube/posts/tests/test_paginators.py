@@ -0,0 +1,137 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..feeds import MAX_OFFSET_PAGE, NUM_POSTS
+from ..models import Comment, Group, Post
+from ..paginators import BACKWARD, encode_cursor
+
+User = get_user_model()
+NUM_ALL_POSTS = 25
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        for i in range(NUM_ALL_POSTS):
+            Post.objects.create(author=cls.user, text=f'Тестовый_пост_{i}')
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_page(self, **params):
+        response = self.guest_client.get(reverse('posts:index'), params)
+        return response.context['page_obj']
+
+    def test_cursor_walk(self):
+        """Курсоры обходят ленту вперёд и назад без пропусков и повторов.
+        """
+        pages = [self.get_page()]
+        while pages[-1].next_cursor:
+            pages.append(self.get_page(cursor=pages[-1].next_cursor))
+        walked = [post.id for page in pages for post in page]
+        self.assertEqual(walked, KeysetPaginatorTests.expected)
+        self.assertIsNone(pages[0].previous_cursor)
+        for previous, page in zip(pages, pages[1:]):
+            with self.subTest(page=page):
+                back = self.get_page(cursor=page.previous_cursor)
+                self.assertEqual(
+                    [post.id for post in back],
+                    [post.id for post in previous],
+                )
+
+    def test_no_count_query(self):
+        """Страницы ленты не выполняют COUNT(*) и OFFSET.
+        """
+        page = self.get_page()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(cursor=page.next_cursor)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_legacy_page_number(self):
+        """Ссылки ?page=N продолжают работать.
+        """
+        page = self.get_page(page=2)
+        self.assertEqual(
+            [post.id for post in page],
+            KeysetPaginatorTests.expected[NUM_POSTS:NUM_POSTS * 2],
+        )
+        self.assertIsNotNone(page.previous_cursor)
+        self.assertIsNotNone(page.next_cursor)
+
+    def test_legacy_page_bounded(self):
+        """Слишком глубокие ?page=N не выполняют OFFSET-запрос.
+        """
+        response = self.guest_client.get(
+            reverse('posts:index'), {'page': MAX_OFFSET_PAGE + 1}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_page_out_of_range(self):
+        """?page=N за концом ленты и ?page=0 — 404, а не пустая страница.
+        """
+        last = -(-NUM_ALL_POSTS // NUM_POSTS)
+        self.assertEqual(
+            [post.id for post in self.get_page(page=last)],
+            KeysetPaginatorTests.expected[NUM_POSTS * (last - 1):],
+        )
+        for number in (0, last + 1):
+            with self.subTest(page=number):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'page': number}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор ведёт на первую страницу.
+        """
+        first = [post.id for post in self.get_page()]
+        for cursor in ('мусор', 'bm90LWpzb24', encode_cursor(
+            BACKWARD, Post.objects.first().pub_date, 1
+        )[:-3]):
+            with self.subTest(cursor=cursor):
+                page = self.get_page(cursor=cursor)
+                self.assertEqual([post.id for post in page], first)
+
+    def test_cursor_with_bad_date(self):
+        """Курсор с несуществующей датой открывает первую страницу
+        любой ленты.
+        """
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        post = Post.objects.create(
+            author=KeysetPaginatorTests.user, group=group, text='В группе'
+        )
+        Comment.objects.create(
+            post=post, author=KeysetPaginatorTests.user, text='Комментарий'
+        )
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': post.id}),
+        )
+        for value in ('2020-13-45T00:00:00', 'не дата'):
+            cursor = encode_cursor(BACKWARD, value, 1)
+            for url in urls:
+                with self.subTest(url=url, value=value):
+                    first = self.guest_client.get(url)
+                    response = self.guest_client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertEqual(response.content, first.content)
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import ranking
+from ..feeds import POPULAR
+from ..models import Comment, Follow, Group, Post, PostRank
+from ..paginators import FORWARD, encode_cursor
+
+User = get_user_model()
+NUM_POSTS = 24
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}',
+                group=self.group if number % 2 else None,
+            )
+            for number in range(NUM_POSTS)
+        ]
+
+    def scores(self):
+        return dict(PostRank.objects.values_list('post_id', 'score'))
+
+    def popular(self, url, **params):
+        return self.client.get(
+            url, {'sort': POPULAR, **params}
+        ).context['page_obj']
+
+    def test_comment_raises_post(self):
+        """Комментарий сразу поднимает пост, и его вес совпадает с
+        пересчитанным.
+        """
+        oldest = self.posts[0]
+        Comment.objects.create(post=oldest, author=self.reader, text='Да')
+        page = self.popular(reverse('posts:index'))
+        self.assertEqual(page.object_list[0], oldest)
+        incremental = self.scores()
+        ranking.rebuild()
+        for post_id, score in self.scores().items():
+            with self.subTest(post_id=post_id):
+                self.assertAlmostEqual(incremental[post_id], score)
+
+    def test_reach_and_decay(self):
+        """Пост автора с подписчиками выше, чем более свежий пост без них;
+        старые посты выпадают из рейтинга при пересчёте.
+        """
+        newest = self.posts[-1]
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.filter(pk=newest.pk).update(
+            pub_date=timezone.now() - timedelta(hours=1)
+        )
+        old = Post.objects.filter(pk=self.posts[0].pk)
+        old.update(
+            pub_date=timezone.now() - timedelta(days=ranking.window() + 1)
+        )
+        late = Post.objects.create(author=self.reader, text='Без охвата')
+        out = StringIO()
+        call_command('rank_posts', stdout=out)
+        self.assertIn(f'В рейтинге постов: {NUM_POSTS}', out.getvalue())
+        scores = self.scores()
+        self.assertNotIn(self.posts[0].pk, scores)
+        self.assertGreater(scores[newest.pk], scores[late.pk])
+
+    def test_group_feed_and_pages(self):
+        """Популярная лента группы листается курсором и не теряет
+        порядок, пост уходит из неё вместе с группой.
+        """
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        page = self.popular(url)
+        posts = list(page)
+        while page.next_cursor:
+            page = self.popular(url, cursor=page.next_cursor)
+            self.assertEqual(page.sort, POPULAR)
+            posts.extend(page)
+        in_group = [post for post in self.posts if post.group_id]
+        self.assertEqual(posts, in_group[::-1])
+        moved = in_group[0]
+        moved.group = None
+        moved.save()
+        self.assertNotIn(moved, self.popular(url).object_list)
+        self.assertIsNone(PostRank.objects.get(post=moved).group)
+
+    def test_date_cursor_ignored(self):
+        """Курсор хронологической ленты открывает первую страницу
+        популярной.
+        """
+        url = reverse('posts:index')
+        first = self.popular(url).object_list
+        cursor = encode_cursor(FORWARD, timezone.now(), self.posts[5].pk)
+        self.assertEqual(self.popular(url, cursor=cursor).object_list, first)
@@ -0,0 +1,141 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import LikeBackend, search_page
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.rare = Post.objects.create(
+            author=cls.user, text='Лисица в лесу. Лисица и лисята.'
+        )
+        cls.common = Post.objects.create(
+            author=cls.user,
+            text='Длинный рассказ про лес, реку, горы, поля, и одна лисица.',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def post_ids(self, page):
+        return [hit['post'].id for hit in page.hits]
+
+    def test_ranking(self):
+        """Пост, где слово встречается чаще, выше в выдаче.
+        """
+        page = search_page('лисица')
+        self.assertEqual(
+            self.post_ids(page), [SearchTests.rare.id, SearchTests.common.id]
+        )
+
+    def test_prefix(self):
+        """Последнее слово запроса ищется как начало слова.
+        """
+        self.assertEqual(self.post_ids(search_page('рас')), [
+            SearchTests.common.id
+        ])
+
+    def test_highlight_escapes_text(self):
+        """Фрагмент экранирован, совпадения обёрнуты в <mark>.
+        """
+        Post.objects.create(author=SearchTests.user, text='<b>ёжик</b>')
+        snippet = search_page('ёжик').hits[0]['snippet']
+        self.assertEqual(snippet, '&lt;b&gt;<mark>ёжик</mark>&lt;/b&gt;')
+
+    def test_comment_hits(self):
+        """Находятся и комментарии, со ссылкой на пост.
+        """
+        comment = Comment.objects.create(
+            post=SearchTests.rare, author=SearchTests.user, text='Барсук'
+        )
+        hits = search_page('барсук').hits
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0]['post'], SearchTests.rare)
+        self.assertTrue(hits[0]['is_comment'])
+        comment.delete()
+        self.assertEqual(search_page('барсук').hits, [])
+
+    def test_index_follows_edits(self):
+        """Правка и удаление поста сразу видны в поиске.
+        """
+        post = Post.objects.create(author=SearchTests.user, text='Кабан')
+        post.text = 'Олень'
+        post.save()
+        self.assertEqual(search_page('кабан').hits, [])
+        self.assertEqual(self.post_ids(search_page('олень')), [post.id])
+        post.delete()
+        self.assertEqual(search_page('олень').hits, [])
+
+    def test_cursor_walk(self):
+        """Курсор проходит всю выдачу без повторов и пропусков.
+        """
+        Post.objects.bulk_create(
+            Post(author=SearchTests.user, text=f'Заяц номер {number}')
+            for number in range(7)
+        )
+        # bulk_create не шлёт сигналов: индекс пересобирается целиком.
+        call_command('rebuild_search_index', stdout=StringIO())
+        seen, cursor = [], None
+        while True:
+            page = search_page('заяц', cursor, limit=3)
+            seen += self.post_ids(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertCountEqual(seen, Post.objects.filter(
+            text__startswith='Заяц'
+        ).values_list('id', flat=True))
+
+    def test_empty_and_invalid_query(self):
+        """Пустой запрос, знаки препинания и синтаксис FTS5 не ломают поиск.
+        """
+        for query in ('', '  ', '"*(', 'лисица OR NEAR('):
+            with self.subTest(query=query):
+                search_page(query, cursor='не-курсор')
+
+    def test_search_page(self):
+        """Страница поиска показывает посты с подсветкой и курсор.
+        """
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'лисица'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertContains(response, '<mark>Лисица</mark>')
+        self.assertEqual(
+            self.post_ids(response.context['page']),
+            [SearchTests.rare.id, SearchTests.common.id],
+        )
+
+    def test_like_backend(self):
+        """Запасной движок LIKE находит то же и листается курсором.
+        """
+        backend = LikeBackend()
+        hits = backend.search('лес', limit=1)
+        self.assertEqual([hit.post_id for hit in hits], [
+            SearchTests.common.id
+        ])
+        after = (hits[0].rank, hits[0].rowid)
+        self.assertEqual(
+            [hit.post_id for hit in backend.search('лес', after)],
+            [SearchTests.rare.id],
+        )
+
+    def test_bench_search(self):
+        """bench_search сравнивает LIKE и FTS5 на синтетических постах.
+        """
+        out = StringIO()
+        call_command(
+            'bench_search', posts=200, vocabulary=50, repeat=1, stdout=out
+        )
+        self.assertIn('Постов: 200', out.getvalue())
@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..blobs import delete_files
+from ..models import ImageBlob, Post
+from ..storage import is_content_name, post_images_storage
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-1] + b'\x00\x3B'
+
+
+def uploaded(name, content=SMALL_GIF):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(
+            author=ContentAddressedStorageTests.user, text='Пост', image=image
+        )
+
+    def refcount(self, name):
+        blob = ImageBlob.objects.filter(name=name).first()
+        return blob.refcount if blob else 0
+
+    def test_same_content_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом со счётчиком ссылок.
+        """
+        first = self.create_post(uploaded('first.gif'))
+        second = self.create_post(uploaded('second.gif'))
+        other = self.create_post(uploaded('first.gif', OTHER_GIF))
+        self.assertTrue(is_content_name(first.image.name))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertEqual(self.refcount(first.image.name), 2)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется, только когда на него не ссылается ни один пост.
+        """
+        first = self.create_post(uploaded('first.gif'))
+        second = self.create_post(uploaded('second.gif'))
+        name = first.image.name
+        first.delete()
+        self.assertEqual(self.refcount(name), 1)
+        second.image = uploaded('other.gif', OTHER_GIF)
+        second.save()
+        self.assertEqual(self.refcount(name), 0)
+        self.assertEqual(self.refcount(second.image.name), 1)
+        # В тестах транзакция не фиксируется: удаляем, как это
+        # сделал бы on_commit.
+        delete_files(name)
+        self.assertFalse(post_images_storage.exists(name))
+        self.assertTrue(post_images_storage.exists(second.image.name))
+
+    def test_upload_during_release_keeps_file(self):
+        """Картинка, загруженная снова до удаления файла, не теряется.
+        """
+        first = self.create_post(uploaded('first.gif'))
+        name = first.image.name
+        first.delete()
+        self.assertEqual(self.refcount(name), 0)
+        second = self.create_post(uploaded('second.gif'))
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(self.refcount(name), 1)
+        delete_files(name)
+        self.assertTrue(post_images_storage.exists(name))
+        second.delete()
+        delete_files(name)
+        self.assertFalse(post_images_storage.exists(name))
+        third = self.create_post(uploaded('third.gif'))
+        self.assertEqual(self.refcount(name), 1)
+        self.assertTrue(post_images_storage.exists(third.image.name))
+
+    def test_dedupe_images(self):
+        """dedupe_images переносит старые файлы и склеивает повторы.
+        """
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        posts = []
+        for name in ('a.gif', 'b.gif'):
+            with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', name), 'wb') as f:
+                f.write(SMALL_GIF)
+            posts.append(self.create_post(f'posts/{name}'))
+        out = StringIO()
+        call_command('dedupe_images', '--dry-run', stdout=out)
+        self.assertIn('повторов: 1', out.getvalue())
+        self.assertTrue(post_images_storage.exists('posts/a.gif'))
+        call_command('dedupe_images', stdout=StringIO())
+        for post in posts:
+            post.refresh_from_db()
+        name = posts[0].image.name
+        self.assertTrue(is_content_name(name))
+        self.assertEqual(posts[1].image.name, name)
+        self.assertTrue(post_images_storage.exists(name))
+        self.assertFalse(post_images_storage.exists('posts/a.gif'))
+        self.assertFalse(post_images_storage.exists('posts/b.gif'))
+        self.assertEqual(self.refcount(name), 2)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'блокировка строк есть в СУБД')
+class ReleaseLockTests(TransactionTestCase):
+    def test_transaction_takes_write_lock(self):
+        """Транзакция delete_files() сразу берёт блокировку записи:
+        select_for_update() в SQLite ничего не блокирует.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                ImageBlob.objects.select_for_update().filter(
+                    name='posts/missing.gif'
+                ).first()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
@@ -0,0 +1,126 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..images import VARIANT_WIDTHS
+from ..models import Post
+from ..thumbnails import generate
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ThumbnailsTests.user)
+        self.post = Post.objects.create(
+            author=ThumbnailsTests.user, text='Пост', image=uploaded()
+        )
+
+    def test_generate_stores_url(self):
+        """Построенная миниатюра попадает в пост и в шаблон.
+        """
+        url = generate(self.post.id)
+        self.post.refresh_from_db()
+        self.assertTrue(url)
+        self.assertEqual(self.post.thumbnail_url, url)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertContains(response, f'src="{url}"')
+        self.assertContains(response, 'width="960" height="339"')
+
+    def test_generate_builds_variants(self):
+        """Для картинки строятся варианты всех ширин для srcset.
+        """
+        generate(self.post.id)
+        self.post.refresh_from_db()
+        picture = self.post.picture
+        for width in VARIANT_WIDTHS:
+            self.assertIn(f' {width}w', picture['srcset'])
+        for source in picture['sources']:
+            self.assertEqual(source['srcset'].count('w,'), 2)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, f'srcset="{picture["srcset"]}"')
+
+    def test_views_schedule_new_images(self):
+        """Миниатюра ставится в очередь только для новой картинки.
+        """
+        with mock.patch('posts.views.thumbnails.schedule') as schedule:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'С картинкой', 'image': uploaded('new.gif')},
+            )
+            post = Post.objects.get(text='С картинкой')
+            schedule.assert_called_once_with(post.id)
+            schedule.reset_mock()
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                {'text': 'Только текст'},
+            )
+            schedule.assert_not_called()
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                {'text': 'Новая картинка', 'image': uploaded('other.gif')},
+            )
+            schedule.assert_called_once_with(post.id)
+
+    def test_warm_thumbnails(self):
+        """warm_thumbnails строит только недостающие миниатюры.
+        """
+        out = StringIO()
+        call_command('warm_thumbnails', '--processes', '1', stdout=out)
+        self.assertIn('1 из 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnail_url)
+        out = StringIO()
+        call_command('warm_thumbnails', '--processes', '1', stdout=out)
+        self.assertIn('0 из 0', out.getvalue())
+
+    def test_bench_images(self):
+        """bench_images сравнивает варианты с базовой миниатюрой.
+        """
+        out = StringIO()
+        call_command('bench_images', '--json', stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(results['images'], 1)
+        self.assertGreater(results['baseline_bytes'], 0)
+        self.assertTrue(results['variants'])
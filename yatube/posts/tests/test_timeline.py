@@ -0,0 +1,171 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, PulledAuthor, TimelineEntry
+
+User = get_user_model()
+NUM_POSTS = 15
+TIMELINE_LENGTH = 12
+
+
+@override_settings(
+    POSTS_TIMELINE=True,
+    POSTS_TIMELINE_LENGTH=TIMELINE_LENGTH,
+    POSTS_TIMELINE_FANOUT_LIMIT=2,
+)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.author_2 = User.objects.create_user(username='author_2')
+        for i in range(NUM_POSTS):
+            Post.objects.create(author=cls.author, text=f'Пост_{i}')
+            Post.objects.create(author=cls.author_2, text=f'Пост_2_{i}')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TimelineTests.user)
+
+    def timeline(self, user):
+        return list(
+            TimelineEntry.objects.filter(user=user)
+            .order_by('-pub_date', '-post_id')
+            .values_list('post_id', flat=True)
+        )
+
+    def walk_follow_feed(self):
+        url = reverse('posts:follow_index')
+        page = self.authorized_client.get(url).context['page_obj']
+        posts = list(page)
+        while page.next_cursor:
+            page = self.authorized_client.get(
+                url, {'cursor': page.next_cursor}
+            ).context['page_obj']
+            posts.extend(page)
+        return [post.id for post in posts]
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка заполняет ленту, отписка очищает её.
+        """
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'author'}
+        ))
+        expected = list(
+            TimelineTests.author.posts.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)[:TIMELINE_LENGTH]
+        )
+        self.assertEqual(self.timeline(TimelineTests.user), expected)
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}
+        ))
+        self.assertEqual(self.timeline(TimelineTests.user), [])
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков, длина ленты ограничена.
+        """
+        Follow.objects.create(
+            user=TimelineTests.user, author=TimelineTests.author
+        )
+        post = Post.objects.create(
+            author=TimelineTests.author, text='Новый_пост'
+        )
+        timeline = self.timeline(TimelineTests.user)
+        self.assertEqual(timeline[0], post.id)
+        self.assertEqual(len(timeline), TIMELINE_LENGTH)
+
+    def test_feed_same_in_both_modes(self):
+        """Готовая лента и выборка из подписок отдают одни и те же посты.
+        """
+        for author in (TimelineTests.author, TimelineTests.author_2):
+            Follow.objects.create(user=TimelineTests.user, author=author)
+        from_timeline = self.walk_follow_feed()
+        with self.settings(POSTS_TIMELINE=False):
+            from_follows = self.walk_follow_feed()
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(from_follows, expected)
+        self.assertEqual(from_timeline, expected)
+
+    def test_short_timeline_not_read_from_follows(self):
+        """Короткая и пустая ленты читаются только из готовой ленты,
+        без выборки из подписок.
+        """
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='quiet')
+        Follow.objects.create(user=reader, author=author)
+        posts = [
+            Post.objects.create(author=author, text=f'Тихий_{i}')
+            for i in range(3)
+        ]
+        request = RequestFactory().get(reverse('posts:follow_index'))
+        # Подписки на читаемых при показе авторов и страница ленты.
+        with self.assertNumQueries(2):
+            page_obj = timeline.load_timeline(request, reader)
+        self.assertEqual(page_obj.object_list, posts[::-1])
+        loner = User.objects.create_user(username='loner')
+        with self.assertNumQueries(2):
+            page_obj = timeline.load_timeline(request, loner)
+        self.assertEqual(page_obj.object_list, [])
+
+    def test_popular_author_read_on_demand(self):
+        """Посты автора с множеством подписчиков читаются при показе.
+        """
+        for username in ('reader_1', 'reader_2'):
+            Follow.objects.create(
+                user=User.objects.create_user(username=username),
+                author=TimelineTests.author,
+            )
+        Follow.objects.create(
+            user=TimelineTests.user, author=TimelineTests.author
+        )
+        post = Post.objects.create(
+            author=TimelineTests.author, text='Новый_пост'
+        )
+        self.assertTrue(
+            PulledAuthor.objects.filter(author=TimelineTests.author).exists()
+        )
+        self.assertNotIn(post.id, self.timeline(TimelineTests.user))
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_check_timeline(self):
+        """check_timeline находит и пересобирает разошедшиеся ленты.
+        """
+        Follow.objects.create(
+            user=TimelineTests.user, author=TimelineTests.author
+        )
+        call_command('check_timeline', stdout=StringIO())
+        TimelineEntry.objects.filter(
+            post=TimelineTests.author.posts.latest('pub_date')
+        ).delete()
+        with self.assertRaises(CommandError):
+            call_command('check_timeline', stdout=StringIO())
+        call_command('check_timeline', '--repair', stdout=StringIO())
+        call_command('check_timeline', stdout=StringIO())
+
+    def test_rebuild_all(self):
+        """rebuild_all собирает те же ленты, что и rebuild.
+        """
+        reader = User.objects.create_user(username='reader')
+        for author in (TimelineTests.author, TimelineTests.author_2):
+            Follow.objects.create(user=TimelineTests.user, author=author)
+        Follow.objects.create(user=reader, author=TimelineTests.author_2)
+        expected = {}
+        for user in (TimelineTests.user, reader):
+            timeline.rebuild(user)
+            expected[user] = self.timeline(user)
+        TimelineEntry.objects.filter(user=reader).delete()
+        timeline.rebuild_all()
+        for user, entries in expected.items():
+            self.assertEqual(self.timeline(user), entries)
+        self.assertEqual(len(expected[reader]), TIMELINE_LENGTH)
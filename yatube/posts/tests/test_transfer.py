@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from .. import transfer
+from ..models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Первый пост'
+        )
+        Post.objects.create(author=self.reader, text='Второй пост')
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def export(self, kind, name):
+        call_command(
+            'export_posts', kind=kind, output=self.path(name),
+            stderr=StringIO(),
+        )
+        return self.path(name)
+
+    def load(self, path, kind, **options):
+        out = StringIO()
+        call_command(
+            'import_posts', path, kind=kind, stdout=out, stderr=StringIO(),
+            **options
+        )
+        return out.getvalue()
+
+    def write(self, name, records):
+        with open(self.path(name), 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return self.path(name)
+
+    def test_round_trip(self):
+        """Выгруженные данные загружаются обратно с id, датами и
+        счётчиками, недостающие пользователи создаются.
+        """
+        files = {
+            kind: self.export(kind, f'{kind}.ndjson')
+            for kind in ('posts', 'comments', 'follows')
+        }
+        original = list(Post.objects.order_by('id').values_list(
+            'id', 'author__username', 'group__slug', 'text', 'pub_date'
+        ))
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        self.reader.delete()
+        for kind, path in files.items():
+            self.load(path, kind)
+        self.assertEqual(list(Post.objects.order_by('id').values_list(
+            'id', 'author__username', 'group__slug', 'text', 'pub_date'
+        )), original)
+        reader = User.objects.get(username='reader')
+        self.assertFalse(reader.has_usable_password())
+        self.assertEqual(Comment.objects.get().author, reader)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comments_count, 1)
+        self.assertTrue(
+            Follow.objects.filter(user=reader, author=self.author).exists()
+        )
+        counters = UserCounters.objects.get(user=self.author)
+        self.assertEqual(
+            (counters.posts_count, counters.followers_count), (1, 1)
+        )
+
+    def test_csv(self):
+        """CSV выгружается с заголовком и загружается как NDJSON.
+        """
+        path = self.export('posts', 'posts.csv')
+        with open(path, encoding='utf-8') as file:
+            self.assertEqual(
+                file.readline().strip(), 'id,author,group,text,pub_date'
+            )
+        Post.objects.all().delete()
+        self.load(path, 'posts')
+        self.assertEqual(Post.objects.get(pk=self.post.pk).group, self.group)
+        self.assertIsNone(Post.objects.get(text='Второй пост').group)
+
+    def test_resume(self):
+        """Прерванная загрузка продолжается с контрольной точки.
+        """
+        path = self.write('posts.ndjson', [
+            {'id': 100 + number, 'author': 'author', 'text': f'Пост {number}'}
+            for number in range(5)
+        ])
+        save = transfer.Importer.save
+        calls = []
+
+        def failing(importer, batch):
+            calls.append(len(batch))
+            if len(calls) == 2:
+                raise RuntimeError('сбой')
+            save(importer, batch)
+
+        with mock.patch.object(transfer.Importer, 'save', failing):
+            with self.assertRaises(RuntimeError):
+                self.load(path, 'posts', batch_size=2)
+        self.assertEqual(Post.objects.filter(id__gte=100).count(), 2)
+        with mock.patch.object(transfer.Importer, 'save', failing):
+            self.load(path, 'posts', batch_size=2)
+        self.assertEqual(calls, [2, 2, 2, 1])
+        self.assertEqual(Post.objects.filter(id__gte=100).count(), 5)
+        with open(f'{path}.checkpoint') as file:
+            self.assertEqual(json.load(file), {'kind': 'posts', 'done': 5})
+        self.assertIn('Загружено записей posts: 0', self.load(path, 'posts'))
+
+    def test_skipped(self):
+        """Комментарии к несуществующим постам и подписки на себя
+        пропускаются, запись без обязательного поля — ошибка.
+        """
+        comments = self.write('comments.ndjson', [
+            {'post': self.post.pk, 'author': 'author', 'text': 'Есть'},
+            {'post': 999, 'author': 'author', 'text': 'Нет поста'},
+        ])
+        self.assertIn('пропущено: 1', self.load(comments, 'comments'))
+        self.assertTrue(Comment.objects.filter(text='Есть').exists())
+        follows = self.write('follows.ndjson', [
+            {'user': 'author', 'author': 'author'},
+        ])
+        self.assertIn('пропущено: 1', self.load(follows, 'follows'))
+        broken = self.write('broken.ndjson', [{'author': 'author'}])
+        with self.assertRaisesMessage(CommandError, 'Нет поля text'):
+            self.load(broken, 'posts')
+
+    def test_non_empty_database(self):
+        """Повтор выгрузки в ту же базу ничего не удваивает, а занятый
+        чужой записью id останавливает загрузку.
+        """
+        path = self.export('posts', 'posts.ndjson')
+        self.load(path, 'posts', restart=True)
+        self.assertEqual(Post.objects.count(), 2)
+        other = self.write('other.ndjson', [
+            {'id': self.post.pk + 100, 'author': 'reader', 'text': 'Новый'},
+            {'id': self.post.pk, 'author': 'reader', 'text': 'Чужой пост'},
+        ])
+        with self.assertRaisesMessage(CommandError, f'id {self.post.pk}'):
+            self.load(other, 'posts')
+        self.assertEqual(Post.objects.get(pk=self.post.pk).text, 'Первый пост')
+        self.assertFalse(Post.objects.filter(text='Новый').exists())
+        comments = self.write('comments.ndjson', [
+            {'id': Comment.objects.get().pk, 'post': self.post.pk,
+             'author': 'author', 'text': 'Другой комментарий'},
+        ])
+        with self.assertRaises(CommandError):
+            self.load(comments, 'comments')
+        self.assertEqual(Comment.objects.get().text, 'Комментарий')
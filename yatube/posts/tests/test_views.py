@@ -78,6 +78,8 @@ class ViewsTests(TestCase):
         self.authorized_client_2.force_login(ViewsTests.user_2)
         self.authorized_client_3 = Client()
         self.authorized_client_3.force_login(ViewsTests.user_3)
+        # Откат транзакции после теста не сбрасывает поколения лент.
+        cache.clear()
 
     def test_templates_pages(self):
         """URL-адрес использует соответствующий HTML-шаблоны.
@@ -108,7 +110,7 @@ class ViewsTests(TestCase):
         self.assertEqual(first_object.text, ViewsTests.post.text)
         self.assertEqual(first_object.author, ViewsTests.user)
         self.assertEqual(first_object.group, ViewsTests.group)
-        self.assertIn(uploaded.name, first_object.image.name)
+        self.assertEqual(first_object.image, ViewsTests.post.image)
 
     def test_correct_context_index(self):
         """В страницу index передан пост с картинкой в context.
@@ -143,7 +145,9 @@ class ViewsTests(TestCase):
         self.assertEqual(
             response.context['post'].group, ViewsTests.group
         )
-        self.assertIn(uploaded.name, response.context['post'].image.name)
+        self.assertEqual(
+            response.context['post'].image, ViewsTests.post.image
+        )
 
     def test_type_fields(self):
         """Типы полей формы в словаре context соответствуют ожиданиям
@@ -264,10 +268,11 @@ class ViewsTests(TestCase):
         """
         response = self.guest_client.get(reverse('posts:index'))
         page_before_del_post = response.content
-        ViewsTests.post.delete()
+        # Изменение в обход модели не сбрасывает кеш.
+        Post.objects.filter(id=ViewsTests.post.id).update(text='Другой')
         response = self.guest_client.get(reverse('posts:index'))
         self.assertEqual(page_before_del_post, response.content)
-        cache.clear()
+        ViewsTests.post.delete()
         response = self.guest_client.get(reverse('posts:index'))
         self.assertNotEqual(page_before_del_post, response.content)
 
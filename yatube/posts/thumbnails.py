@@ -0,0 +1,49 @@
+"""Построение миниатюр вне запроса.
+
+После сохранения поста с новой картинкой миниатюра строится фоновой
+задачей (core.tasks), а её адрес записывается в Post.thumbnail_url.
+Вместе с ней строятся адаптивные варианты (posts.images). Шаблон
+берёт готовые адреса и не вызывает Pillow при показе. Для
+уже загруженных картинок есть команда warm_thumbnails.
+"""
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import task
+
+from .feeds import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from .images import build_variants
+from .models import Post
+
+
+def generate(post_id):
+    """Строит миниатюру и варианты картинки поста и запоминает их."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return None
+    url = get_thumbnail(
+        post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+    ).url
+    if not url:
+        return None
+    variants = build_variants(post.image)
+    # Пока строили, картинку могли заменить: её миниатюру построит
+    # следующая задача.
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail_url=url, image_variants=variants
+    )
+    return url
+
+
+@task(max_attempts=3)
+def build_thumbnail(post_id):
+    generate(post_id)
+
+
+def schedule(post_id):
+    """Ставит миниатюру в очередь фоновых задач."""
+    build_thumbnail.delay(post_id)
+
+
+def warm(post_ids):
+    """Строит миниатюры постов post_ids; для пула процессов."""
+    return sum(generate(post_id) is not None for post_id in post_ids)
@@ -0,0 +1,179 @@
+"""Готовые ленты подписок (fan-out при записи).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, и
+страница /follow/ читается по индексу (user, pub_date) без JOIN
+с подписками. Посты авторов с очень большим числом подписчиков не
+раскладываются: их подписчики читают ленту по-старому, через
+follow_feed.
+"""
+from django.conf import settings
+from django.db import connection
+
+from .feeds import (follow_feed, load_feed, paginator_post,
+                    prefetch_thumbnails)
+from .models import Follow, Post, PulledAuthor, TimelineEntry
+
+TIMELINE_KEYS = ('pub_date', 'post_id')
+# Не больше параметров в одном запросе, чем позволяет SQLite.
+TRIM_BATCH = 500
+
+
+def timeline_enabled():
+    return getattr(settings, 'POSTS_TIMELINE', False)
+
+
+def timeline_length():
+    return getattr(settings, 'POSTS_TIMELINE_LENGTH', 500)
+
+
+def fanout_limit():
+    return getattr(settings, 'POSTS_TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def reads_on_demand(user):
+    """Подписан ли user на автора, чьи посты не раскладываются."""
+    return Follow.objects.filter(
+        user=user, author__pulled__isnull=False
+    ).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if PulledAuthor.objects.filter(author_id=post.author_id).exists():
+        return
+    limit = fanout_limit()
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)[:limit + 1]
+    )
+    if len(followers) > limit:
+        PulledAuthor.objects.get_or_create(author_id=post.author_id)
+        return
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+    trim(followers)
+
+
+def backfill(user, author):
+    """Добавляет в ленту user последние посты нового автора."""
+    if PulledAuthor.objects.filter(author=author).exists():
+        return
+    posts = Post.objects.filter(author=author).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:timeline_length()]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim([user.pk])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__in=Post.objects.filter(author_id=author_id),
+    ).delete()
+
+
+def rebuild(user):
+    """Собирает ленту user заново из подписок."""
+    TimelineEntry.objects.filter(user=user).delete()
+    posts = follow_feed(user).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:timeline_length()]
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    ])
+
+
+def rebuild_all():
+    """Собирает заново ленты всех подписчиков, например после импорта.
+
+    Строки ленты не проходят через Python: на каждого подписчика один
+    INSERT ... SELECT по индексу постов автора.
+    """
+    TimelineEntry.objects.all().delete()
+    entries = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    posts = connection.ops.quote_name(Post._meta.db_table)
+    follows = connection.ops.quote_name(Follow._meta.db_table)
+    user_ids = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct()
+    with connection.cursor() as cursor:
+        for user_id in user_ids.iterator():
+            cursor.execute(
+                f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+                f'SELECT %s, id, pub_date FROM {posts} WHERE author_id IN ('
+                f'SELECT author_id FROM {follows} WHERE user_id = %s'
+                f') ORDER BY pub_date DESC, id DESC LIMIT %s',
+                [user_id, user_id, timeline_length()],
+            )
+
+
+def trim(user_ids):
+    """Оставляет в лентах пользователей не больше timeline_length()."""
+    if not user_ids:
+        return
+    if not connection.features.supports_over_clause:
+        for user_id in user_ids:
+            stale = TimelineEntry.objects.filter(user_id=user_id).order_by(
+                '-pub_date', '-post_id'
+            ).values_list('id', flat=True)[timeline_length():]
+            TimelineEntry.objects.filter(id__in=list(stale)).delete()
+        return
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    for start in range(0, len(user_ids), TRIM_BATCH):
+        batch = user_ids[start:start + TRIM_BATCH]
+        placeholders = ', '.join(['%s'] * len(batch))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+                f') AS position FROM {table} WHERE user_id IN ({placeholders})'
+                f') ranked WHERE position > %s)',
+                [*batch, timeline_length()],
+            )
+
+
+def truncated(user, page_obj):
+    """Мог ли у готовой ленты user быть обрезан хвост.
+
+    page_obj — её последняя страница. Лента короче timeline_length()
+    полная: обрезка оставляет ровно timeline_length() постов.
+    """
+    length = timeline_length()
+    if page_obj.number == 1 and len(page_obj.object_list) < length:
+        return False
+    return TimelineEntry.objects.filter(user=user)[length - 1:].exists()
+
+
+def load_timeline(request, user):
+    """Страница ленты подписок: из готовой ленты или из подписок.
+
+    Курсоры обоих способов совпадают, поэтому страницы, для которых
+    готовой ленты не хватает (её хвост обрезан), читаются из
+    подписок без разрыва в навигации. Короткая лента целиком
+    читается из готовой.
+    """
+    if not timeline_enabled() or reads_on_demand(user):
+        return load_feed(request, follow_feed(user))
+    entries = TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+    page_obj = paginator_post(request, entries, keys=TIMELINE_KEYS)
+    if page_obj.next_cursor is None and truncated(user, page_obj):
+        return load_feed(request, follow_feed(user))
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
+    prefetch_thumbnails(page_obj.object_list)
+    return page_obj
@@ -0,0 +1,310 @@
+"""Перенос постов, комментариев и подписок пачками.
+
+Каждый файл содержит записи одного вида из KINDS, в NDJSON (объект
+на строку) или CSV с заголовком. Авторы и группы записаны по
+username и slug. Посты и комментарии сохраняют свои id, поэтому
+комментарии ссылаются на посты из того же переноса. Недостающие
+пользователи и группы создаются: пользователи без пароля, а у групп
+адрес вместо названия. Картинки не переносятся.
+
+Записи читаются и пишутся потоком, в памяти только текущая пачка и
+словари username → id и slug → id. Пачка сохраняется через
+bulk_create в одной транзакции. Строка с тем же id, автором и
+текстом уже загружена, её пропускает ignore_conflicts, поэтому
+повтор пачки после сбоя ничего не удваивает. Если id занят другой
+строкой, импорт останавливается: иначе запись молча потерялась бы,
+а комментарии из файла попали бы к чужому посту.
+
+bulk_create не вызывает сигналы posts: счётчики, поисковый индекс,
+ленты подписок, рейтинг популярной ленты и кеш страниц обновляет
+rebuild_derived после импорта.
+"""
+import csv
+import json
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, fragments, ranking, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('ndjson', 'csv')
+BATCH_SIZE = 2000
+
+Kind = namedtuple('Kind', ('model', 'fields', 'columns'))
+# fields — поля записи в файле, columns — откуда они берутся при
+# выгрузке.
+KINDS = {
+    'posts': Kind(
+        Post, ('id', 'author', 'group', 'text', 'pub_date'),
+        ('id', 'author__username', 'group__slug', 'text', 'pub_date'),
+    ),
+    'comments': Kind(
+        Comment, ('id', 'post', 'author', 'text', 'pub_date'),
+        ('id', 'post_id', 'author__username', 'text', 'pub_date'),
+    ),
+    'follows': Kind(
+        Follow, ('user', 'author'),
+        ('user__username', 'author__username'),
+    ),
+}
+# По этим полям строка с тем же id считается уже загруженной записью.
+SAME_ROW = {
+    'posts': ('author_id', 'text'),
+    'comments': ('post_id', 'author_id', 'text'),
+}
+
+
+def guess_format(path):
+    return 'csv' if str(path).lower().endswith('.csv') else 'ndjson'
+
+
+def read(file, file_format):
+    """Записи файла по одной, словарями."""
+    if file_format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def export(kind, file, file_format, chunk_size=BATCH_SIZE, progress=None):
+    """Пишет все записи вида kind в file; возвращает их число.
+
+    progress(число) вызывается после каждых chunk_size записей.
+    """
+    fields, columns = KINDS[kind].fields, KINDS[kind].columns
+    rows = KINDS[kind].model.objects.order_by('id').values_list(
+        *columns
+    ).iterator(chunk_size=chunk_size)
+    if file_format == 'csv':
+        writer = csv.writer(file)
+        writer.writerow(fields)
+    total = 0
+    for row in rows:
+        # Даты — в ISO 8601 с микросекундами, как их читает date().
+        row = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row
+        ]
+        if file_format == 'csv':
+            writer.writerow(row)
+        else:
+            file.write(json.dumps(
+                dict(zip(fields, row)), ensure_ascii=False
+            ) + '\n')
+        total += 1
+        if progress and total % chunk_size == 0:
+            progress(total)
+    return total
+
+
+def load_checkpoint(path, kind):
+    """Сколько записей вида kind уже сохранено по контрольной точке."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except FileNotFoundError:
+        return 0
+    if checkpoint.get('kind') != kind:
+        raise ValueError(
+            f'Контрольная точка {path} записана для '
+            f'{checkpoint.get("kind")}, а не для {kind}'
+        )
+    return checkpoint['done']
+
+
+def save_checkpoint(path, kind, done):
+    # Через временный файл: прерванная запись не портит точку.
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({'kind': kind, 'done': done}, file)
+    os.replace(temporary, path)
+
+
+def batches(records, size, skip=0):
+    records = islice(records, skip, None)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def keep_dates():
+    """Даты публикации берутся из файла, а не ставятся текущими."""
+    # Команда работает в своём процессе, другим потокам это не мешает.
+    fields = [
+        model._meta.get_field('pub_date') for model in (Post, Comment)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Сохраняет пачки записей вида kind."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.skipped = 0
+
+    def save(self, batch):
+        with transaction.atomic():
+            self.resolve(batch)
+            objects = [
+                obj for obj in map(getattr(self, self.kind), batch)
+                if obj is not None
+            ]
+            if self.kind == 'comments':
+                objects = self.with_posts(objects)
+            if self.kind in SAME_ROW:
+                self.check_ids(objects)
+            KINDS[self.kind].model.objects.bulk_create(
+                objects, ignore_conflicts=True
+            )
+
+    def resolve(self, batch):
+        """Создаёт недостающих пользователей и группы пачки."""
+        usernames = {
+            record.get(field) for record in batch
+            for field in ('author', 'user')
+        } - set(self.users) - {None, ''}
+        if usernames:
+            User.objects.bulk_create([
+                User(username=username, password=make_password(None))
+                for username in sorted(usernames)
+            ], ignore_conflicts=True)
+            self.users.update(User.objects.filter(
+                username__in=usernames
+            ).values_list('username', 'id'))
+        slugs = {
+            record.get('group') for record in batch
+        } - set(self.groups) - {None, ''}
+        if slugs:
+            Group.objects.bulk_create([
+                Group(slug=slug, title=slug, description='')
+                for slug in sorted(slugs)
+            ], ignore_conflicts=True)
+            self.groups.update(Group.objects.filter(
+                slug__in=slugs
+            ).values_list('slug', 'id'))
+
+    def posts(self, record):
+        return Post(
+            id=integer(record.get('id')),
+            author_id=self.users[required(record, 'author')],
+            group_id=self.groups.get(record.get('group')),
+            text=required(record, 'text'),
+            pub_date=date(record.get('pub_date')),
+        )
+
+    def comments(self, record):
+        return Comment(
+            id=integer(record.get('id')),
+            post_id=integer(required(record, 'post')),
+            author_id=self.users[required(record, 'author')],
+            text=required(record, 'text'),
+            pub_date=date(record.get('pub_date')),
+        )
+
+    def follows(self, record):
+        user = self.users[required(record, 'user')]
+        author = self.users[required(record, 'author')]
+        if user == author:
+            self.skipped += 1
+            return None
+        return Follow(user_id=user, author_id=author)
+
+    def check_ids(self, objects):
+        """Ошибка, если id записи занят строкой с другим содержимым."""
+        fields = SAME_ROW[self.kind]
+        model = KINDS[self.kind].model
+        loaded = {obj.pk: obj for obj in objects if obj.pk is not None}
+        existing = model.objects.filter(pk__in=loaded).values_list(
+            'pk', *fields
+        )
+        for pk, *values in existing:
+            obj = loaded[pk]
+            if [getattr(obj, field) for field in fields] != values:
+                raise ValueError(
+                    f'Запись {self.kind} с id {pk} не совпадает с уже '
+                    f'сохранённой: переносите в базу, где эти id свободны'
+                )
+
+    def with_posts(self, comments):
+        """Комментарии только к существующим постам."""
+        existing = set(Post.objects.filter(
+            id__in={comment.post_id for comment in comments}
+        ).values_list('id', flat=True))
+        kept = [
+            comment for comment in comments if comment.post_id in existing
+        ]
+        self.skipped += len(comments) - len(kept)
+        return kept
+
+
+def required(record, field):
+    value = record.get(field)
+    if value in (None, ''):
+        raise ValueError(f'Нет поля {field}: {record}')
+    return value
+
+
+def integer(value):
+    return int(value) if value not in (None, '') else None
+
+
+def date(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def reset_sequences(kind):
+    """Продвигает последовательность id за загруженные id.
+
+    В SQLite она и так идёт от наибольшего id, а в PostgreSQL иначе
+    новый пост получил бы уже занятый id.
+    """
+    if kind not in SAME_ROW:
+        return
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [KINDS[kind].model]
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Обновляет то, что при обычной записи обновляют сигналы."""
+    with transaction.atomic():
+        counters.recount_all()
+        counters.recount_groups(Group.objects.all())
+        search.get_backend().rebuild()
+        if timeline.timeline_enabled():
+            timeline.rebuild_all()
+        ranking.rebuild()
+    fragments.bump(fragments.SITE)
@@ -1,63 +1,146 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.routers import get_fresh_or_404
+
+from . import fragments, pagecache, thumbnails
+from .conditional import Validators
+from .feeds import (POPULAR, feed_sort, load_comments, load_feed,
+                    load_groups)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-
-NUM_POSTS = 10
-
-
-def paginator_post(request, post_list):
-    paginator = Paginator(post_list, NUM_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+from .ranking import load_popular
+from .search import search_page
+from .timeline import load_timeline
 
 
 def index(request):
+    sort = feed_sort(request)
+    scopes = fragments.feed_scopes(fragments.INDEX, sort == POPULAR)
+    validators = Validators(request, *scopes)
+    cached = pagecache.lookup(request, validators)
+    if cached is not None:
+        return cached
+    if sort == POPULAR:
+        page_obj = load_popular(request)
+    else:
+        page_obj = load_feed(request, Post.objects.all())
     context = {
-        'page_obj': paginator_post(request,
-                                   Post.objects.all().
-                                   select_related('group')),
+        'page_obj': page_obj,
+        'sort': sort,
+        'feed_cache': fragments.feed_cache(request, page_obj, *scopes),
     }
-    return render(request, 'posts/index.html', context)
+    return pagecache.render(
+        request, validators, 'posts/index.html', context
+    )
+
+
+def group_index(request):
+    validators = Validators(request, fragments.GROUPS)
+    cached = pagecache.lookup(request, validators)
+    if cached is not None:
+        return cached
+    context = {'page_obj': load_groups(request)}
+    return pagecache.render(
+        request, validators, 'posts/group_index.html', context
+    )
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    groups = Group.objects.select_related('stats')
+    group = get_fresh_or_404(groups, slug=slug)
+    sort = feed_sort(request)
+    scopes = fragments.feed_scopes(
+        fragments.group_scope(group.id), sort == POPULAR
+    )
+    validators = Validators(request, *scopes)
+    if validators.recent:
+        group = get_fresh_or_404(groups, slug=slug)
+    cached = pagecache.lookup(request, validators)
+    if cached is not None:
+        return cached
+    if sort == POPULAR:
+        page_obj = load_popular(request, group)
+    else:
+        page_obj = load_feed(request, group.posts.all())
     context = {
         'group': group,
-        'page_obj': paginator_post(request, group.posts.all()),
+        'page_obj': page_obj,
+        'sort': sort,
+        'feed_cache': fragments.feed_cache(request, page_obj, *scopes),
     }
-    return render(request, 'posts/group_list.html', context)
+    return pagecache.render(
+        request, validators, 'posts/group_list.html', context
+    )
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author
-        ).exists()
+    authors = User.objects.select_related('counters')
+    author = get_fresh_or_404(authors, username=username)
+    validators = Validators(
+        request, fragments.author_scope(author.id),
+        fragments.counters_scope(author.id),
+    )
+    if validators.recent:
+        author = get_fresh_or_404(authors, username=username)
+    cached = pagecache.lookup(request, validators)
+    if cached is not None:
+        return cached
+    page_obj = load_feed(request, author.posts.all())
     context = {
         'author': author,
-        'page_obj': paginator_post(request, author.posts.all()),
-        'following': following,
+        'page_obj': page_obj,
+        'feed_cache': fragments.feed_cache(
+            request, page_obj, fragments.author_scope(author.id)
+        ),
     }
-    return render(request, 'posts/profile.html', context)
+    return pagecache.render(
+        request, validators, 'posts/profile.html', context
+    )
 
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    posts = Post.objects.select_related('author__counters', 'group')
+    post = get_fresh_or_404(posts, id=post_id)
+    # Страница показывает и счётчик постов автора.
+    validators = Validators(
+        request, fragments.post_scope(post.id),
+        fragments.author_scope(post.author_id),
+    )
+    if validators.recent:
+        post = get_fresh_or_404(posts, id=post_id)
+    cached = pagecache.lookup(request, validators)
+    if cached is not None:
+        return cached
+    comments = load_comments(request, post.id)
     form = CommentForm()
     context = {
         'form': form,
         'post': post,
         'comments': comments,
     }
-    return render(request, 'posts/post_detail.html', context)
+    return pagecache.render(
+        request, validators, 'posts/post_detail.html', context
+    )
+
+
+def post_comments(request, post_id):
+    validators = Validators(request, fragments.post_scope(post_id))
+    not_modified = validators.not_modified()
+    if not_modified is not None:
+        return not_modified
+    comments = load_comments(request, post_id)
+    if not comments.object_list:
+        # У поста с комментариями он точно есть, лишний запрос только
+        # для пустой страницы.
+        get_fresh_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return validators.apply(
+        render(request, 'posts/includes/comments.html', context)
+    )
 
 
 @login_required
@@ -67,6 +150,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            thumbnails.schedule(post.id)
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -90,7 +175,12 @@ def post_edit(request, post_id):
         'is_edit': is_edit,
     }
     if form.is_valid():
+        if 'image' in form.changed_data:
+            post.thumbnail_url = ''
+            post.image_variants = ''
         form.save()
+        if 'image' in form.changed_data and post.image:
+            thumbnails.schedule(post.id)
         is_edit = False
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', context)
@@ -108,13 +198,19 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page': search_page(query, request.GET.get('cursor')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.all().select_related('group').filter(
-        author__following__user=request.user
-    )
     context = {
-        'page_obj': paginator_post(request, posts)
+        'page_obj': load_timeline(request, request.user)
     }
     return render(request, 'posts/follow.html', context)
 
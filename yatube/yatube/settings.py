@@ -45,10 +45,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'benchmarks.apps.BenchmarksConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.routers.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -87,12 +91,36 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.backends.sqlite3 — SQLite в режиме WAL с повтором записи при
+# занятой базе. Соединение живёт CONN_MAX_AGE секунд, а не один запрос.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
     }
 }
+# Реплики для чтения страниц posts (core.routers): пути к копиям
+# db.sqlite3 через запятую в DATABASE_REPLICAS. Копии обновляет внешний
+# инструмент репликации, сайт открывает их только на чтение.
+REPLICA_PATHS = [
+    path for path in os.getenv('DATABASE_REPLICAS', '').split(',') if path
+]
+CORE_DATABASE_REPLICAS = []
+for number, path in enumerate(REPLICA_PATHS):
+    CORE_DATABASE_REPLICAS.append(f'replica_{number}')
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': f'file:{path}?mode=ro',
+        'CONN_MAX_AGE': 600,
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Страницы каких пространств имён читаются с реплик.
+CORE_REPLICA_NAMESPACES = ('posts',)
+# Сколько секунд после записи зритель читает основную базу. Столько
+# же считается недавним изменение страницы: реплика должна отставать
+# меньше.
+CORE_REPLICA_PIN_SECONDS = 5
 
 
 # Password validation
@@ -135,14 +163,128 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма отправляет CORE_EMAIL_BACKEND. С EMAIL_QUEUE=1 запрос только
+# ставит их в очередь core.tasks, а отправляет воркер run_tasks.
+CORE_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = (
+    'core.mail.TaskEmailBackend' if os.getenv('EMAIL_QUEUE') == '1'
+    else CORE_EMAIL_BACKEND
+)
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Лента подписок: True — готовые ленты, которые заполняются при
+# публикации поста, False — JOIN с подписками при каждом показе.
+POSTS_TIMELINE = True
+# Сколько последних постов хранится в ленте одного пользователя.
+POSTS_TIMELINE_LENGTH = 500
+# Посты авторов с большим числом подписчиков не раскладываются
+# по лентам, а читаются при показе.
+POSTS_TIMELINE_FANOUT_LIMIT = 1000
+
+# Время жизни фрагментов лент в кеше. Устаревшими они не показываются:
+# при изменении постов ключи фрагментов меняются.
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Страницы лент и постов отдают ETag и Last-Modified. Сколько секунд
+# анонимная страница считается свежей без перепроверки; страницы
+# пользователей перепроверяются всегда.
+POSTS_ANONYMOUS_MAX_AGE = 0
+# Время жизни анонимных страниц в кеше целиком (posts.pagecache), 0 —
+# не кешировать. Как и фрагменты, устаревшими они не показываются.
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Поисковый движок: индекс SQLite FTS5 или posts.search.LikeBackend.
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+# Популярная лента (posts.ranking): за сколько секунд вклад поста и
+# комментария падает вдвое, сколько дней пост остаётся в рейтинге и
+# веса комментария и охвата автора. Рейтинг пересчитывает команда
+# rank_posts, её нужно запускать по расписанию.
+POSTS_RANKING_HALF_LIFE = 6 * 60 * 60
+POSTS_RANKING_WINDOW = 7
+POSTS_RANKING_COMMENT_WEIGHT = 1.0
+POSTS_RANKING_REACH_WEIGHT = 1.0
+
+# Общий для всех процессов кеш. Без REDIS_URL используется Redis
+# в памяти процесса: тестам и разработке сервер не нужен.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'memory://'),
+        'OPTIONS': {
+            'MAX_CONNECTIONS': 50,
+            'SOCKET_TIMEOUT': 1,
+            # Фрагменты страниц длиннее этого сжимаются.
+            'COMPRESS_MIN_LENGTH': 1024,
+        },
     }
 }
+
+# Фоновые задачи (core.tasks) выполняет manage.py run_tasks. С
+# TASKS_EAGER=1 они выполняются в процессе сайта после фиксации
+# транзакции, и воркер не нужен.
+CORE_TASKS_EAGER = os.getenv('TASKS_EAGER') == '1'
+
+# Профилирование запросов: разбивка времени по SQL, шаблонам, кешу и
+# миниатюрам в заголовке Server-Timing и JSON в логе core.profiling.
+# Выключенное ничего не стоит; включается переменной PROFILING=1.
+CORE_PROFILING = os.getenv('PROFILING') == '1'
+# Доля запросов, которые пишутся в лог, и порог, после которого
+# в лог пишется любой запрос.
+CORE_PROFILING_SAMPLE_RATE = 0.01
+CORE_PROFILING_SLOW_MS = 500
+
+# Бюджеты SQL-запросов страниц, которые проверяются в тестах
+# (core.querybudget): наибольшее число запросов страницы в тестах
+# (в комментарии) плюс один.
+CORE_QUERY_BUDGETS = {
+    'posts:index': 7,  # 6
+    'posts:group_index': 3,  # 2
+    'posts:group_list': 5,  # 4
+    'posts:profile': 6,  # 5
+    'posts:post_detail': 6,  # 5
+    'posts:follow_index': 7,  # 6
+    'posts:search': 3,  # 2
+    'posts:post_create': 20,  # 19
+    'posts:post_edit': 17,  # 16
+    'posts:add_comment': 10,  # 9
+    'posts:post_comments': 3,  # 2
+    'posts:profile_follow': 14,  # 13
+    'posts:profile_unfollow': 11,  # 10
+    'api:v1:post_list': 2,  # 1
+    'api:v1:group_posts': 3,  # 2
+    'api:v1:profile_posts': 2,  # 1
+    'api:v1:follow_posts': 4,  # 3
+    'api:v1:post_detail': 3,  # 2
+    'api:v1:post_comments': 3,  # 2
+}
+# Не входят в бюджет: управление транзакцией и хранилище ключей sorl,
+# которое страница читает, только пока миниатюра не построена (в
+# тестах — всегда).
+CORE_QUERY_BUDGET_EXCLUDE = (
+    r'^(RELEASE |ROLLBACK TO )?SAVEPOINT ',
+    r'"thumbnail_kvstore"',
+)
+# Запрос одной формы, повторённый больше раз, считается N+1. Лента из
+# десяти постов с запросом в цикле превысит предел, а построение одной
+# миниатюры (sorl читает thumbnail_kvstore до шести раз) — нет.
+CORE_QUERY_REPEAT_LIMIT = 6
+TEST_RUNNER = 'core.querybudget.BudgetTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}